@@ -25,6 +25,24 @@ const QueueItem = ({ job, onRetry }) => {
           icon: <Clock size={16} />,
           loading: false
         };
+      case 'WAITING_FOR_RESOLVE':
+        return { 
+          text: 'ממתין לפענוח לינק', 
+          color: 'bg-slate-500', 
+          lightColor: 'bg-slate-100',
+          textColor: 'text-slate-600',
+          icon: <Clock size={16} />,
+          loading: false
+        };
+      case 'RESOLVING':
+        return { 
+          text: 'מפענח לינק...', 
+          color: 'bg-sky-500', 
+          lightColor: 'bg-sky-50',
+          textColor: 'text-sky-600',
+          icon: <Search size={16} className="animate-pulse" />,
+          loading: true
+        };
       case 'SCRAPING': 
       case 'SCANNING':
         return { 
@@ -1,9 +1,64 @@
-import React from 'react';
-import { Lightbulb, FileText, ChevronDown, Sparkles } from 'lucide-react';
+import React, { useEffect, useState } from 'react';
+import { Lightbulb, FileText, ChevronDown, Sparkles, Filter, Loader2 } from 'lucide-react';
+import { taskService } from '../../services/taskService';
 
 const JobAnalysisSection = ({ job, showFullSummary, setShowFullSummary, showFullAnalysis, setShowFullAnalysis }) => {
+  const [isForcing, setIsForcing] = useState(false);
+  const [forced, setForced] = useState(false);
+
+  const handleForceAnalysis = async () => {
+    setIsForcing(true);
+    try {
+      await taskService.forceAnalysis(job.url);
+      setForced(true);
+    } catch (error) {
+      alert('לא ניתן לשלוח את המשרה לניתוח');
+    } finally {
+      setIsForcing(false);
+    }
+  };
+
+  // Cascade: משרה שנעצרה בטריאז' מקבלת ניתוח מלא ברגע שפותחים אותה (פעם אחת -
+  // אחרי השליחה הסטטוס כבר לא COMPLETED עד שהניתוח המלא מגיע)
+  const awaitingFullAnalysis = job.triage_only && job.status !== 'COMPLETED';
+  useEffect(() => {
+    if (job.status === 'COMPLETED' && job.triage_only && !job.prescreened) {
+      handleForceAnalysis();
+    }
+  }, [job.url, job.status]);
+
   return (
     <>
+      {/* TRIAGE ONLY - הניתוח המלא נשלח אוטומטית בפתיחה */}
+      {job.triage_only && (
+        <div className="bg-indigo-50 border border-indigo-200 rounded-3xl p-5 flex items-center gap-3">
+          {isForcing ? <Loader2 size={20} className="text-indigo-500 animate-spin shrink-0" /> : <Sparkles size={20} className="text-indigo-500 shrink-0" />}
+          <p className="text-sm font-bold text-indigo-700">
+            {forced || awaitingFullAnalysis ? 'ניתוח מלא נשלח - התוצאה תופיע כאן בקרוב' : 'ציון ראשוני בלבד - מריץ ניתוח מלא...'}
+          </p>
+        </div>
+      )}
+
+      {/* PRE-SCREENED OUT - לא נשלח ל-AI */}
+      {job.prescreened && (
+        <div className="bg-slate-100 border border-slate-200 rounded-3xl p-5 flex items-center justify-between gap-4">
+          <div className="flex items-center gap-3">
+            <Filter size={20} className="text-slate-500 shrink-0" />
+            <p className="text-sm font-bold text-slate-600">
+              המשרה סוננה מקומית ולא נותחה ע"י AI
+            </p>
+          </div>
+          <button
+            onClick={handleForceAnalysis}
+            disabled={isForcing || forced}
+            className="px-4 py-2 bg-slate-900 hover:bg-black text-white rounded-full text-sm font-bold flex items-center gap-2 transition-all disabled:opacity-50 shrink-0"
+          >
+            {isForcing ? <Loader2 size={14} className="animate-spin" /> : <Sparkles size={14} />}
+            {forced ? 'נשלח לניתוח' : 'נתח בכל זאת'}
+          </button>
+        </div>
+      )}
+
       {/* RECOMMENDATION HERO */}
       <div className="bg-gradient-to-br from-amber-400 via-amber-500 to-amber-600 rounded-3xl p-6 md:p-8 flex items-center gap-6 shadow-xl relative overflow-hidden">
         <div className="absolute top-0 right-0 w-40 h-40 bg-white/10 rounded-full -translate-y-20 translate-x-20 blur-2xl"></div>
@@ -8,6 +8,17 @@ const StatusBadge = ({ status }) => {
       label: "בטעינה",
       icon: Clock
     },
+    WAITING_FOR_RESOLVE: { 
+      style: "bg-gray-100 text-gray-500",
+      label: "ממתין לפענוח לינק",
+      icon: Clock
+    },
+    RESOLVING: { 
+      style: "bg-sky-50 text-sky-600",
+      label: "מפענח לינק",
+      icon: Loader2,
+      animate: "animate-spin"
+    },
     WAITING_FOR_SCRAPE: { 
       style: "bg-gray-100 text-gray-500",
       label: "ממתין לסריקה",
@@ -79,6 +79,12 @@ export const taskService = {
     return response.data;
   },
 
+  // ניתוח AI מלא למשרה שסוננה מקומית (Pre-screen)
+  forceAnalysis: async (url) => {
+    const response = await apiClient.post('/jobs/force-analysis', null, { params: { url } });
+    return response.data;
+  },
+
   // עדכון פעולה (User Action) - לוגיקה ישנה
   updateJobAction: async (url, action) => {
     const response = await apiClient.post('/jobs/action', { url, action });
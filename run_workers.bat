@@ -0,0 +1,3 @@
+@echo off
+cd src
+python -m workers %*
@@ -0,0 +1,189 @@
+# bench_near_duplicates.py
+"""
+Benchmark: near-duplicate lookup cost as the jobs table grows.
+
+Inserts synthetic analyzed jobs into the real `jobs` table inside a
+transaction, times find_near_duplicate at each size, and rolls everything
+back at the end - the database is left untouched.
+
+Real postings share boilerplate (company blurb, benefits, EEO text), so
+their 16-bit bands collide far more often than random fingerprints do. The
+default "clustered" mode fingerprints synthetic descriptions built from a
+few shared boilerplate blocks; "random" uses uniform fingerprints. Half of
+the lookups are edited copies of stored jobs (within the max distance), and
+"recall" shows how many of those were found.
+
+    cd src
+    python bench_near_duplicates.py                 # 1k, 10k, 100k rows, clustered
+    python bench_near_duplicates.py --sizes 1000 50000 --lookups 500 --mode random
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from tabulate import tabulate
+
+from db.jobs_repository import find_near_duplicate
+from db.postgres import close_pool, get_pool
+from services.near_duplicates import (
+    NEAR_DUPLICATE_MAX_DISTANCE,
+    SIMHASH_BITS,
+    bands,
+    simhash,
+    to_signed,
+)
+
+INSERT_BATCH = 10_000
+BENCH_PROFILE_HASH = "bench-near-dup"
+# כמה תיאורים סינתטיים באמת עוברים SimHash (יקר בפייתון); מעבר לזה - וריאציות שלהם
+DESCRIPTION_POOL = 5_000
+
+# קטעי Boilerplate משותפים - מה שגורם לרצועות של משרות אמיתיות להתנגש
+_BOILERPLATE = [
+    "we are a fast growing company building products used by millions of people "
+    "around the world our teams work in small autonomous squads and ship every day",
+    "what we offer competitive salary stock options hybrid work model flexible hours "
+    "a modern office in tel aviv private health insurance and a learning budget",
+    "we are an equal opportunity employer and value diversity we do not discriminate "
+    "on the basis of race religion color national origin gender or disability",
+    "how to apply send us your resume and a short note about a project you are proud "
+    "of our recruiting team reviews every application and replies within a week",
+    "about the team you will join a cross functional group of engineers product "
+    "managers and designers who own the full lifecycle of the services they build",
+]
+_ROLES = ["backend", "frontend", "fullstack", "data", "devops", "mobile", "qa", "ml"]
+_SKILLS = (
+    "python go java kotlin typescript react node postgres redis kafka kubernetes "
+    "docker aws gcp terraform spark airflow pytorch graphql grpc linux ci cd"
+).split()
+
+
+def _synthetic_description() -> str:
+    blocks = random.sample(_BOILERPLATE, 3)
+    role = random.choice(_ROLES)
+    skills = " ".join(random.sample(_SKILLS, 8))
+    years = random.randint(1, 8)
+    return (
+        f"{blocks[0]} we are looking for a {role} engineer with {years} years of "
+        f"experience in {skills} {blocks[1]} {blocks[2]} req {random.randint(1, 10**6)}"
+    )
+
+
+def _new_fingerprint(mode: str, pool: list) -> int:
+    if mode == "random":
+        return random.getrandbits(SIMHASH_BITS)
+    if len(pool) < DESCRIPTION_POOL:
+        pool.append(simhash(_synthetic_description()))
+        return pool[-1]
+    # מעבר ל-Pool: משרות שונות (יותר מהמרחק המקסימלי) שחולקות את אותו Boilerplate
+    return _flip_bits(
+        random.choice(pool), random.randint(NEAR_DUPLICATE_MAX_DISTANCE + 1, 12)
+    )
+
+
+def _flip_bits(fingerprint: int, count: int) -> int:
+    for bit in random.sample(range(SIMHASH_BITS), count):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+async def _insert_jobs(conn, fingerprints, offset: int):
+    for start in range(0, len(fingerprints), INSERT_BATCH):
+        batch = fingerprints[start : start + INSERT_BATCH]
+        columns = list(zip(*(bands(fp) for fp in batch)))
+        await conn.execute(
+            """
+            INSERT INTO jobs (url, status, analysis_result, profile_hash, simhash,
+                              simhash_b0, simhash_b1, simhash_b2, simhash_b3)
+            SELECT 'bench-near-dup-' || ($1 + n), 'COMPLETED'::job_status, '{}'::jsonb, $7, h, b0, b1, b2, b3
+            FROM unnest($2::bigint[], $3::int[], $4::int[], $5::int[], $6::int[])
+                 WITH ORDINALITY AS t(h, b0, b1, b2, b3, n)
+            """,
+            offset + start,
+            [to_signed(fp) for fp in batch],
+            *(list(column) for column in columns),
+            BENCH_PROFILE_HASH,
+        )
+
+
+async def run(sizes, lookups: int, mode: str):
+    pool = await get_pool()
+    rows = []
+    descriptions = []
+    async with pool.acquire() as conn:
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            stored = []
+            for size in sorted(sizes):
+                new = [
+                    _new_fingerprint(mode, descriptions)
+                    for _ in range(size - len(stored))
+                ]
+                await _insert_jobs(conn, new, len(stored))
+                stored.extend(new)
+                await conn.execute("ANALYZE jobs")
+
+                # חצי מהחיפושים - גרסה "ערוכה" של משרה קיימת (חייבת להימצא),
+                # חצי - משרה חדשה (באותו Boilerplate במצב clustered)
+                queries = [
+                    (
+                        True,
+                        _flip_bits(
+                            random.choice(stored),
+                            random.randint(0, NEAR_DUPLICATE_MAX_DISTANCE),
+                        ),
+                    )
+                    if i % 2 == 0
+                    else (False, _new_fingerprint(mode, []))
+                    for i in range(lookups)
+                ]
+                found = edited_found = 0
+                timings = []
+                for edited, query in queries:
+                    started = time.perf_counter()
+                    match = await find_near_duplicate(
+                        -1, query, NEAR_DUPLICATE_MAX_DISTANCE, BENCH_PROFILE_HASH, conn
+                    )
+                    timings.append((time.perf_counter() - started) * 1000)
+                    found += bool(match)
+                    edited_found += bool(match) and edited
+                timings.sort()
+                rows.append(
+                    [
+                        f"{size:,}",
+                        f"{sum(timings) / len(timings):.2f}",
+                        f"{timings[len(timings) // 2]:.2f}",
+                        f"{timings[int(len(timings) * 0.95)]:.2f}",
+                        f"{found}/{lookups}",
+                        f"{edited_found}/{(lookups + 1) // 2}",
+                    ]
+                )
+        finally:
+            await transaction.rollback()
+
+    print(
+        tabulate(
+            rows,
+            headers=["jobs", "avg ms", "p50 ms", "p95 ms", "matches", "recall"],
+            tablefmt="github",
+        )
+    )
+    await close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Near-duplicate lookup benchmark")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument(
+        "--mode",
+        choices=["clustered", "random"],
+        default="clustered",
+        help="fingerprints of boilerplate-sharing descriptions, or uniform random ones",
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.lookups, args.mode))
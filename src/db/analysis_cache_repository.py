@@ -0,0 +1,38 @@
+# src/db/analysis_cache_repository.py
+import json
+import logging
+from typing import Optional
+
+from db.postgres import get_pool
+
+logger = logging.getLogger("Repository")
+
+# תוצאות Gemini לפי Hash של (קו"ח, הקשר, תיאור, מודל, גרסת פרומפט) - JobAnalyzer.cache_key
+
+
+async def get_cached_analysis(cache_key: str) -> Optional[dict]:
+    pool = await get_pool()
+    row = await pool.fetchrow(
+        """
+        UPDATE analysis_cache SET hits = hits + 1, last_hit_at = NOW()
+        WHERE cache_key = $1
+        RETURNING result
+        """,
+        cache_key,
+    )
+    return json.loads(row["result"]) if row else None
+
+
+async def save_analysis(cache_key: str, model: str, prompt_version: str, result: dict):
+    pool = await get_pool()
+    await pool.execute(
+        """
+        INSERT INTO analysis_cache (cache_key, model, prompt_version, result)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (cache_key) DO UPDATE SET result = EXCLUDED.result
+        """,
+        cache_key,
+        model,
+        prompt_version,
+        json.dumps(result),
+    )
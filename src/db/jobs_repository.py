@@ -1,40 +1,71 @@
 # src/db/jobs_repository.py
 import json
 import logging
-from enum import Enum
-from typing import List, Optional
+from enum import Enum, IntEnum
+from typing import List, Optional, Tuple
 
+import asyncpg
+
+from db.notifications import notify_stage
 from db.postgres import get_pool
+from scraper_service.canonical import canonical_key, canonical_url
+from scraper_service.utils import needs_resolution
+from services.near_duplicates import bands, to_signed
 
 logger = logging.getLogger("Repository")
 
+
+class JobPriority(IntEnum):
+    LOW = 0  # ייבוא בכמויות (תוסף / רשימת לינקים)
+    NORMAL = 5  # ברירת מחדל
+    HIGH = 10  # פעולה שהמשתמש מחכה לה בדשבורד (ידני / תיקון / ניסיון חוזר)
+
+
 # --- כתיבה / עדכון (עבור Workers & Intake) ---
 
 
+def _intake_status(url: str) -> str:
+    """השלב הראשון בתור ללינק: רזולוציה (HireMeTech וכו') או ישר לסריקה"""
+    return "WAITING_FOR_RESOLVE" if needs_resolution(url) else "WAITING_FOR_SCRAPE"
+
+
 async def add_new_job(
-    url: str, source: str = "web", manual_text: str = None, manual_meta: dict = None
+    url: str,
+    source: str = "web",
+    manual_text: str = None,
+    manual_meta: dict = None,
+    priority: JobPriority = JobPriority.NORMAL,
 ) -> bool:
     pool = await get_pool()
-    status = "WAITING_FOR_AI" if manual_text else "WAITING_FOR_SCRAPE"
+    # אותה משרה עם פרמטרי מעקב שונים = אותו canonical_key = כפילות
+    url = canonical_url(url)
+    status = "WAITING_FOR_AI" if manual_text else _intake_status(url)
     company = manual_meta.get("company", url) if manual_meta else url
     title = manual_meta.get("title", url) if manual_meta else url
 
     async with pool.acquire() as conn:
-        result = await conn.execute(
-            """
-            INSERT INTO jobs (url, status, source, full_description, company, job_title)
-            VALUES ($1, $2, $3, $4, $5, $6)
-            ON CONFLICT (url) DO NOTHING
-            """,
-            url,
-            status,
-            source,
-            manual_text,
-            company,
-            title,
-        )
-        # conn.execute מחזיר מחרוזת כמו "INSERT 0 1" אם נוספה שורה, או "INSERT 0 0" אם לא
-        return " 1" in result
+        async with conn.transaction():
+            # בלי יעד ל-ON CONFLICT - מכסה גם את url וגם את canonical_key
+            result = await conn.execute(
+                """
+                INSERT INTO jobs (url, status, source, full_description, company, job_title, priority, intake_priority, canonical_key)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $7, $8)
+                ON CONFLICT DO NOTHING
+                """,
+                url,
+                status,
+                source,
+                manual_text,
+                company,
+                title,
+                int(priority),
+                canonical_key(url),
+            )
+            # conn.execute מחזיר מחרוזת כמו "INSERT 0 1" אם נוספה שורה, או "INSERT 0 0" אם לא
+            added = " 1" in result
+            if added:
+                await notify_stage(conn, status)
+        return added
 
 
 async def get_job_by_url(url: str) -> Optional[dict]:
@@ -43,65 +74,433 @@ async def get_job_by_url(url: str) -> Optional[dict]:
     return dict(row) if row else None
 
 
-async def fetch_next_job(current_status: str, next_status: str) -> Optional[dict]:
+async def find_existing_job(url: str) -> Optional[dict]:
+    """המשרה שכבר קיימת עבור הלינק - לפי המפתח הקנוני (או הלינק עצמו, לשורות ישנות)"""
+    pool = await get_pool()
+    row = await pool.fetchrow(
+        "SELECT * FROM jobs WHERE canonical_key = $1 OR url = $2 LIMIT 1",
+        canonical_key(url),
+        url,
+    )
+    return dict(row) if row else None
+
+
+# שלבי "בעבודה" ולאן מחזירים אותם כשה-Lease פג
+IN_FLIGHT_STATUSES = {
+    "RESOLVING": "WAITING_FOR_RESOLVE",
+    "SCRAPING": "WAITING_FOR_SCRAPE",
+    "ANALYZING": "WAITING_FOR_AI",
+}
+# לאן עוברת משרה שה-Lease שלה פג יותר מדי פעמים (כנראה היא זו שמפילה את הוורקר)
+IN_FLIGHT_FAILED_STATUSES = {
+    "RESOLVING": "FAILED_SCRAPE",
+    "SCRAPING": "FAILED_SCRAPE",
+    "ANALYZING": "FAILED_ANALYSIS",
+}
+
+
+def _updated(result: str) -> bool:
+    # conn.execute מחזיר מחרוזת כמו "UPDATE 1"
+    return int(result.split()[-1]) > 0
+
+
+# השאילתה קבועה (הסטטוסים עוברים כפרמטרים) כך ש-asyncpg מכין אותה פעם אחת לכל חיבור
+CLAIM_JOBS_SQL = """
+    UPDATE jobs 
+    SET status = $2,
+        claimed_by = $4,
+        lease_expires_at = NOW() + make_interval(secs => $5)
+    WHERE id IN (
+        SELECT id FROM jobs 
+        WHERE status = $1 
+        AND (next_attempt_at IS NULL OR next_attempt_at <= NOW())
+        ORDER BY priority DESC, created_at ASC 
+        LIMIT $3 
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *
+"""
+
+
+async def claim_jobs(
+    current_status: str,
+    next_status: str,
+    limit: int,
+    claimed_by: str,
+    lease_seconds: float,
+) -> List[dict]:
+    """
+    Claims up to `limit` waiting jobs in a single UPDATE ... RETURNING.
+    SKIP LOCKED lets several workers claim concurrently without overlap.
+    Each claimed row carries a lease (`claimed_by`, `lease_expires_at`) that the
+    owner must keep extending with `extend_leases`.
+    """
+    pool = await get_pool()
+    rows = await pool.fetch(
+        CLAIM_JOBS_SQL, current_status, next_status, limit, claimed_by, lease_seconds
+    )
+    # RETURNING לא מבטיח סדר - שומרים על סדר העדיפויות גם בתוך ה-Batch
+    return sorted(
+        (dict(row) for row in rows),
+        key=lambda job: (-job["priority"], job["created_at"]),
+    )
+
+
+async def count_ready_jobs(status: str, limit: int) -> int:
+    """כמה משרות מוכנות לתפיסה בשלב (עד limit - לא סופרים את כל התור בשביל השוואה לסף)"""
+    pool = await get_pool()
+    return await pool.fetchval(
+        """
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM jobs
+            WHERE status = $1
+            AND (next_attempt_at IS NULL OR next_attempt_at <= NOW())
+            LIMIT $2
+        ) AS ready
+        """,
+        status,
+        limit,
+    )
+
+
+async def extend_leases(job_ids: List[int], claimed_by: str, lease_seconds: float) -> int:
+    """Heartbeat: מאריך את ה-Lease של המשרות שעדיין בבעלות הוורקר. מחזיר כמה הוארכו."""
+    pool = await get_pool()
+    result = await pool.execute(
+        """
+        UPDATE jobs 
+        SET lease_expires_at = NOW() + make_interval(secs => $3)
+        WHERE id = ANY($1::int[]) AND claimed_by = $2
+        """,
+        job_ids,
+        claimed_by,
+        lease_seconds,
+    )
+    return int(result.split()[-1])
+
+
+async def release_jobs(job_ids: List[int], claimed_by: str) -> int:
+    """מחזיר לתור משרות שהוורקר מחזיק (כיבוי מסודר) בלי לחכות שה-Lease יפוג"""
     pool = await get_pool()
     async with pool.acquire() as conn:
         async with conn.transaction():
-            row = await conn.fetchrow(
-                f"""
-                UPDATE jobs 
-                SET status = '{next_status}'
-                WHERE id = (
-                    SELECT id FROM jobs 
-                    WHERE status = '{current_status}' 
-                    ORDER BY created_at ASC 
-                    LIMIT 1 
-                    FOR UPDATE SKIP LOCKED
+            released = 0
+            for in_flight, waiting in IN_FLIGHT_STATUSES.items():
+                result = await conn.execute(
+                    """
+                    UPDATE jobs 
+                    SET status = $3, claimed_by = NULL, lease_expires_at = NULL
+                    WHERE id = ANY($1::int[]) AND claimed_by = $2 AND status = $4
+                    """,
+                    job_ids,
+                    claimed_by,
+                    waiting,
+                    in_flight,
                 )
-                RETURNING *
+                count = int(result.split()[-1])
+                if count:
+                    await notify_stage(conn, waiting)
+                    released += count
+            return released
+
+
+async def age_waiting_jobs(after_seconds: float) -> int:
+    """
+    Aging: כל משרה שממתינה יותר מ-after_seconds (מאז היצירה או ההעלאה האחרונה)
+    עולה דרגת עדיפות אחת, עד HIGH - 1 - כך שייבוא בכמויות לעולם לא מורעב, אבל גם
+    לא עוקף משרות אינטראקטיביות (HIGH) שהמשתמש מחכה להן.
+    בטוח להריץ מכמה תהליכים במקביל: priority_aged_at מונע העלאה כפולה.
+    """
+    pool = await get_pool()
+    result = await pool.execute(
+        """
+        UPDATE jobs 
+        SET priority = priority + 1, priority_aged_at = NOW()
+        WHERE status IN ('WAITING_FOR_RESOLVE', 'WAITING_FOR_SCRAPE', 'WAITING_FOR_AI')
+        AND priority < $2
+        AND COALESCE(priority_aged_at, created_at) < NOW() - make_interval(secs => $1)
+        """,
+        after_seconds,
+        int(JobPriority.HIGH) - 1,
+    )
+    return int(result.split()[-1])
+
+
+async def requeue_expired_leases(max_attempts: int) -> Tuple[int, int]:
+    """
+    מחזיר לתור רק משרות שה-Lease שלהן פג (הוורקר שתפס אותן קרס או נתקע).
+    משרות בעבודה אצל שרת אחר שעדיין שולח Heartbeat לא נוגעים בהן.
+    Lease שפג נספר כניסיון: משרה שמפילה את הוורקר שוב ושוב עוברת ל-Dead-letter
+    של השלב אחרי max_attempts, במקום להפיל את כל ה-Pool בלולאה.
+    מחזיר (כמה חזרו לתור, כמה עברו ל-Dead-letter).
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            requeued = failed = 0
+            for in_flight, waiting in IN_FLIGHT_STATUSES.items():
+                row = await conn.fetchrow(
+                    """
+                    WITH expired AS (
+                        UPDATE jobs
+                        SET status = CASE WHEN attempts + 1 >= $4
+                                THEN $3::job_status ELSE $2::job_status END,
+                            error_log = CASE WHEN attempts + 1 >= $4
+                                THEN 'Lease expired ' || (attempts + 1) || ' times (worker crashed or hung)'
+                                ELSE error_log END,
+                            last_error_class = CASE WHEN attempts + 1 >= $4
+                                THEN 'LeaseExpired' ELSE last_error_class END,
+                            attempts = attempts + 1,
+                            claimed_by = NULL,
+                            lease_expires_at = NULL
+                        WHERE status = $1
+                        AND (lease_expires_at IS NULL OR lease_expires_at < NOW())
+                        RETURNING status
+                    )
+                    SELECT COUNT(*) FILTER (WHERE status = $2::job_status) AS requeued,
+                           COUNT(*) FILTER (WHERE status = $3::job_status) AS failed
+                    FROM expired
+                    """,
+                    in_flight,
+                    waiting,
+                    IN_FLIGHT_FAILED_STATUSES[in_flight],
+                    max_attempts,
+                )
+                if row["requeued"]:
+                    await notify_stage(conn, waiting)
+                    requeued += row["requeued"]
+                failed += row["failed"]
+            return requeued, failed
+
+
+# כל כתיבה של תוצאת שלב בודקת שהוורקר עדיין מחזיק ב-Lease: אם ה-Lease פג והמשרה
+# נתפסה מחדש, התוצאה של הוורקר הישן נזרקת (הפונקציות מחזירות False)
+async def finish_scrape(
+    job_id: int, claimed_by: str, company: str, title: str, description: str
+) -> bool:
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            result = await conn.execute(
                 """
+                UPDATE jobs SET 
+                    status = 'WAITING_FOR_AI',
+                    company = $2,
+                    job_title = $3,
+                    full_description = $4,
+                    scraped_at = NOW(),
+                    claimed_by = NULL,
+                    lease_expires_at = NULL,
+                    attempts = 0,
+                    next_attempt_at = NULL
+                WHERE id = $1 AND claimed_by = $5 AND status = 'SCRAPING'
+                """,
+                job_id,
+                company,
+                title,
+                description,
+                claimed_by,
             )
-            return dict(row) if row else None
+            if not _updated(result):
+                return False
+            await notify_stage(conn, "WAITING_FOR_AI")
+            return True
+
 
+def _fingerprint_params(fingerprint: Optional[int]) -> list:
+    """[simhash, b0, b1, b2, b3] עבור ה-DB (או NULLים)"""
+    if fingerprint is None:
+        return [None] * 5
+    return [to_signed(fingerprint), *bands(fingerprint)]
 
-async def finish_scrape(job_id: int, company: str, title: str, description: str):
+
+async def finish_analysis(
+    job_id: int,
+    claimed_by: str,
+    result: dict,
+    fingerprint: Optional[int] = None,
+    profile_hash: Optional[str] = None,
+) -> bool:
+    """
+    fingerprint + profile_hash (JobAnalyzer.profile_key) הופכים את המשרה למקור
+    לכפילויות קרובות - רק עבור ניתוח מלא שנעשה מול הפרופיל הזה.
+    """
     pool = await get_pool()
-    await pool.execute(
+    # המרת dict ל-json string עבור ה-DB
+    json_result = json.dumps(result)
+    updated = await pool.execute(
         """
         UPDATE jobs SET 
-            status = 'WAITING_FOR_AI',
-            company = $2,
-            job_title = $3,
-            full_description = $4,
-            scraped_at = NOW()
-        WHERE id = $1
+            status = 'COMPLETED',
+            analysis_result = $2,
+            analyzed_at = NOW(),
+            claimed_by = NULL,
+            lease_expires_at = NULL,
+            attempts = 0,
+            next_attempt_at = NULL,
+            duplicate_of = NULL,
+            force_analysis = FALSE,
+            simhash = $3,
+            simhash_b0 = $4,
+            simhash_b1 = $5,
+            simhash_b2 = $6,
+            simhash_b3 = $7,
+            profile_hash = $9
+        WHERE id = $1 AND claimed_by = $8 AND status = 'ANALYZING'
         """,
         job_id,
-        company,
-        title,
-        description,
+        json_result,
+        *_fingerprint_params(fingerprint),
+        claimed_by,
+        profile_hash,
+    )
+    return _updated(updated)
+
+
+async def find_near_duplicate(
+    job_id: int, fingerprint: int, max_distance: int, profile_hash: str, conn=None
+) -> Optional[int]:
+    """
+    Returns the id of the closest job analyzed against the same profile
+    (profile_hash) whose SimHash is within max_distance bits, or None.
+    Candidates come from the per-band indexes (any equal 16-bit band) and the
+    Hamming distance is computed in SQL over all of them, so a band shared by
+    many postings (common boilerplate) can't push the real match out.
+    """
+    executor = conn or await get_pool()
+    # popcount של ה-XOR דרך bit(64)::text - עובד גם לפני bit_count (PG14)
+    return await executor.fetchval(
+        """
+        SELECT id FROM (
+            SELECT id, length(replace(((simhash # $6)::bit(64))::text, '0', '')) AS distance
+            FROM jobs
+            WHERE (simhash_b0 = $2 OR simhash_b1 = $3 OR simhash_b2 = $4 OR simhash_b3 = $5)
+            AND id <> $1
+            AND status = 'COMPLETED'
+            AND duplicate_of IS NULL
+            AND analysis_result IS NOT NULL
+            AND profile_hash = $7
+        ) candidates
+        WHERE distance <= $8
+        ORDER BY distance, id
+        LIMIT 1
+        """,
+        job_id,
+        *bands(fingerprint),
+        to_signed(fingerprint),
+        profile_hash,
+        max_distance,
     )
 
 
-async def finish_analysis(job_id: int, result: dict):
+async def link_duplicate(
+    job_id: int, claimed_by: str, original_id: int, fingerprint: int
+) -> bool:
+    """
+    משלים משרה ככפילות של משרה שכבר נותחה: מעתיק את הניתוח בלי לקרוא ל-Gemini.
+    מחזיר False אם המקור כבר לא קיים / לא נותח (ואז מנתחים כרגיל), או אם ה-Lease אבד.
+    """
     pool = await get_pool()
-    # המרת dict ל-json string עבור ה-DB
-    json_result = json.dumps(result)
-    await pool.execute(
-        "UPDATE jobs SET status = 'COMPLETED', analysis_result = $2, analyzed_at = NOW() WHERE id = $1",
+    result = await pool.execute(
+        """
+        UPDATE jobs j SET 
+            status = 'COMPLETED',
+            -- הניתוח של המקור, אבל עם הלינק/החברה/התפקיד של המשרה הזו
+            analysis_result = o.analysis_result || jsonb_build_object(
+                'url', j.url, 'company', j.company, 'job_title', j.job_title
+            ),
+            analyzed_at = NOW(),
+            duplicate_of = o.id,
+            profile_hash = o.profile_hash,
+            force_analysis = FALSE,
+            claimed_by = NULL,
+            lease_expires_at = NULL,
+            attempts = 0,
+            next_attempt_at = NULL,
+            simhash = $3,
+            simhash_b0 = $4,
+            simhash_b1 = $5,
+            simhash_b2 = $6,
+            simhash_b3 = $7
+        FROM jobs o
+        WHERE j.id = $1 AND o.id = $2 AND o.analysis_result IS NOT NULL
+        AND j.claimed_by = $8 AND j.status = 'ANALYZING'
+        """,
         job_id,
-        json_result,
+        original_id,
+        *_fingerprint_params(fingerprint),
+        claimed_by,
     )
+    return _updated(result)
 
 
-async def mark_failed(job_id: int, status: str, error: str):
+async def mark_failed(
+    job_id: int,
+    claimed_by: str,
+    status: str,
+    error: str,
+    error_class: Optional[str] = None,
+) -> bool:
+    """כישלון סופי (Dead-letter): המשרה יוצאת מהתור ומחכה לטיפול של המשתמש"""
     pool = await get_pool()
-    await pool.execute(
-        "UPDATE jobs SET status = $2, error_log = $3 WHERE id = $1",
+    result = await pool.execute(
+        """
+        UPDATE jobs 
+        SET status = $2,
+            error_log = $3,
+            last_error_class = $4,
+            attempts = attempts + 1,
+            next_attempt_at = NULL,
+            claimed_by = NULL,
+            lease_expires_at = NULL
+        WHERE id = $1 AND claimed_by = $5 AND status::text = ANY($6::text[])
+        """,
         job_id,
         status,
         error,
+        error_class,
+        claimed_by,
+        list(IN_FLIGHT_STATUSES),
+    )
+    return _updated(result)
+
+
+async def schedule_retry(
+    job_id: int,
+    claimed_by: str,
+    waiting_status: str,
+    error: str,
+    error_class: Optional[str],
+    delay_seconds: float,
+    count_attempt: bool = True,
+) -> bool:
+    """
+    מחזיר משרה שנכשלה לתור של השלב, עם השהייה עד הניסיון הבא (Backoff).
+    count_attempt=False - תקלה של ה-upstream ולא של המשרה: לא נספר לקראת Dead-letter.
+    """
+    pool = await get_pool()
+    result = await pool.execute(
+        """
+        UPDATE jobs 
+        SET status = $2,
+            error_log = $3,
+            last_error_class = $4,
+            attempts = attempts + $8,
+            next_attempt_at = NOW() + make_interval(secs => $5),
+            claimed_by = NULL,
+            lease_expires_at = NULL
+        WHERE id = $1 AND claimed_by = $6 AND status::text = ANY($7::text[])
+        """,
+        job_id,
+        waiting_status,
+        error,
+        error_class,
+        delay_seconds,
+        claimed_by,
+        list(IN_FLIGHT_STATUSES),
+        1 if count_attempt else 0,
     )
+    return _updated(result)
 
 
 # --- קריאה (עבור API) ---
@@ -130,6 +529,56 @@ async def get_all_jobs() -> List[dict]:
         return results
 
 
+async def get_recent_descriptions(limit: int) -> List[str]:
+    """תיאורי המשרות האחרונים - קורפוס הייחוס ל-IDF של ה-Pre-screen"""
+    pool = await get_pool()
+    rows = await pool.fetch(
+        """
+        SELECT full_description FROM jobs
+        WHERE full_description IS NOT NULL AND full_description <> ''
+        ORDER BY created_at DESC
+        LIMIT $1
+        """,
+        limit,
+    )
+    return [row["full_description"] for row in rows]
+
+
+async def force_analysis(url: str) -> bool:
+    """
+    The user asked for a full AI analysis of a pre-screened or triage-only
+    job: marks it so the pre-screen and the triage tier are skipped and puts
+    it back in the AI queue at HIGH priority.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            result = await conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'WAITING_FOR_AI',
+                    force_analysis = TRUE,
+                    error_log = NULL,
+                    claimed_by = NULL,
+                    lease_expires_at = NULL,
+                    attempts = 0,
+                    next_attempt_at = NULL,
+                    last_error_class = NULL,
+                    priority = $2,
+                    intake_priority = $2
+                WHERE url = $1
+                AND full_description IS NOT NULL
+                AND status NOT IN ('WAITING_FOR_AI', 'ANALYZING')
+                """,
+                url,
+                int(JobPriority.HIGH),
+            )
+            updated = int(result.split()[-1]) > 0
+            if updated:
+                await notify_stage(conn, "WAITING_FOR_AI")
+            return updated
+
+
 async def delete_job_by_url(url: str):
     pool = await get_pool()
     await pool.execute("DELETE FROM jobs WHERE url = $1", url)
@@ -141,21 +590,73 @@ async def delete_job_by_id(job_id: int):
     await pool.execute("DELETE FROM jobs WHERE id = $1", job_id)
 
 
-async def update_job_url(job_id: int, new_url: str):
+async def complete_resolution(
+    job_id: int, claimed_by: str, resolved_url: str
+) -> Tuple[bool, Optional[int]]:
     """
-    Update the URL for a job (e.g., when HireMeTech URL resolves to company URL).
-    Also resets status to WAITING_FOR_SCRAPE so the worker picks it up again.
+    Stores the resolved company URL and moves the job straight to WAITING_FOR_SCRAPE.
+    The duplicate check runs in the same transaction: if another job already has
+    the same canonical key, this job is deleted and the existing job's id is returned.
+    Returns (owned, duplicate_of); owned is False when the lease was lost and
+    nothing was written.
     """
     pool = await get_pool()
-    await pool.execute(
-        """
-        UPDATE jobs 
-        SET url = $1, status = 'WAITING_FOR_SCRAPE'
-        WHERE id = $2
-        """,
-        new_url,
-        job_id,
-    )
+    resolved_url = canonical_url(resolved_url)
+    resolved_key = canonical_key(resolved_url)
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            # נועלים את השורה - רק אם היא עדיין שלנו
+            owned = await conn.fetchval(
+                """
+                SELECT id FROM jobs
+                WHERE id = $1 AND claimed_by = $2 AND status = 'RESOLVING'
+                FOR UPDATE
+                """,
+                job_id,
+                claimed_by,
+            )
+            if owned is None:
+                return False, None
+            existing_id = await conn.fetchval(
+                """
+                SELECT id FROM jobs
+                WHERE (canonical_key = $1 OR url = $2) AND id <> $3
+                LIMIT 1
+                """,
+                resolved_key,
+                resolved_url,
+                job_id,
+            )
+            if existing_id is None:
+                try:
+                    # Savepoint - משרה אחרת עלולה לקבל את אותו לינק במקביל (UNIQUE)
+                    async with conn.transaction():
+                        await conn.execute(
+                            """
+                            UPDATE jobs 
+                            SET url = $1,
+                                canonical_key = $3,
+                                status = 'WAITING_FOR_SCRAPE',
+                                claimed_by = NULL,
+                                lease_expires_at = NULL,
+                                attempts = 0,
+                                next_attempt_at = NULL
+                            WHERE id = $2
+                            """,
+                            resolved_url,
+                            job_id,
+                            resolved_key,
+                        )
+                    await notify_stage(conn, "WAITING_FOR_SCRAPE")
+                    return True, None
+                except asyncpg.UniqueViolationError:
+                    existing_id = await conn.fetchval(
+                        "SELECT id FROM jobs WHERE canonical_key = $1 OR url = $2 LIMIT 1",
+                        resolved_key,
+                        resolved_url,
+                    )
+            await conn.execute("DELETE FROM jobs WHERE id = $1", job_id)
+            return True, existing_id
 
 
 async def update_user_action(url: str, action: str):
@@ -189,23 +690,34 @@ async def update_user_action(url: str, action: str):
 async def update_manual_job(url: str, company: str, title: str, description: str):
     """מעדכן פרטי משרה באופן ידני ומעביר אותה לתור ה-AI"""
     pool = await get_pool()
-    await pool.execute(
-        """
-        UPDATE jobs SET 
-            status = 'WAITING_FOR_AI',
-            company = $2,
-            job_title = $3,
-            full_description = $4,
-            scraped_at = NOW(),
-            is_archived = FALSE,
-            error_log = NULL
-        WHERE url = $1
-        """,
-        url,
-        company,
-        title,
-        description,
-    )
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                """
+                UPDATE jobs SET 
+                    status = 'WAITING_FOR_AI',
+                    company = $2,
+                    job_title = $3,
+                    full_description = $4,
+                    scraped_at = NOW(),
+                    is_archived = FALSE,
+                    error_log = NULL,
+                    claimed_by = NULL,
+                    lease_expires_at = NULL,
+                    attempts = 0,
+                    next_attempt_at = NULL,
+                    last_error_class = NULL,
+                    priority = $5,
+                    intake_priority = $5
+                WHERE url = $1
+                """,
+                url,
+                company,
+                title,
+                description,
+                int(JobPriority.HIGH),
+            )
+            await notify_stage(conn, "WAITING_FOR_AI")
 
 
 class ApplicationStatus(str, Enum):
@@ -272,26 +784,28 @@ async def clear_archived_jobs():
 
 
 async def retry_job(url: str):
-    """מאתחל משרה חזרה לתחילת התור (סריקה) ומנקה שגיאות"""
-    pool = await get_pool()
-    await pool.execute(
-        """
-        UPDATE jobs 
-        SET status = 'WAITING_FOR_SCRAPE', 
-            error_log = NULL,
-            is_archived = FALSE
-        WHERE url = $1
-        """,
-        url,
-    )
-
-
-async def reset_stuck_jobs():
-    """מאפס משרות שנתקעו במצב 'בסריקה' או 'בניתוח' חזרה לתור (למקרה של קריסת שרת)"""
+    """מאתחל משרה חזרה לתחילת התור (רזולוציה/סריקה) ומנקה שגיאות"""
     pool = await get_pool()
-    await pool.execute(
-        "UPDATE jobs SET status = 'WAITING_FOR_SCRAPE' WHERE status = 'SCRAPING'"
-    )
-    await pool.execute(
-        "UPDATE jobs SET status = 'WAITING_FOR_AI' WHERE status = 'ANALYZING'"
-    )
+    status = _intake_status(url)
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                """
+                UPDATE jobs 
+                SET status = $3, 
+                    error_log = NULL,
+                    is_archived = FALSE,
+                    claimed_by = NULL,
+                    lease_expires_at = NULL,
+                    attempts = 0,
+                    next_attempt_at = NULL,
+                    last_error_class = NULL,
+                    priority = $2,
+                    intake_priority = $2
+                WHERE url = $1
+                """,
+                url,
+                int(JobPriority.HIGH),
+                status,
+            )
+            await notify_stage(conn, status)
@@ -0,0 +1,159 @@
+# src/db/limits_repository.py
+import logging
+from typing import Optional, Tuple
+
+from db.postgres import get_pool
+
+logger = logging.getLogger("Repository")
+
+# State של ה-Rate limiter וה-Circuit breaker נשמר ב-Postgres, כך שכל ה-Pools
+# וכל התהליכים/השרתים חולקים אותו. נעילת השורה (FOR UPDATE) מסדרת בין המבקשים.
+
+
+async def try_acquire(
+    upstream: str,
+    requests_per_minute: float,
+    tokens_per_minute: float,
+    tokens: float,
+) -> float:
+    """
+    Token bucket: מנסה לקחת בקשה אחת (+ `tokens` טוקנים) מהדלי של ה-upstream.
+    מחזיר 0 אם הצליח, אחרת כמה שניות כדאי לחכות לפני ניסיון נוסף.
+    קצב 0 = ללא הגבלה באותו מימד.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            select_state = """
+                SELECT request_tokens,
+                       token_tokens,
+                       EXTRACT(EPOCH FROM NOW() - refilled_at)::float AS elapsed,
+                       COALESCE(EXTRACT(EPOCH FROM blocked_until - NOW())::float, 0) AS blocked_for
+                FROM upstream_limits
+                WHERE upstream = $1
+                FOR UPDATE
+            """
+            row = await conn.fetchrow(select_state, upstream)
+            if row is None:
+                # פעם ראשונה ל-upstream הזה - מתחילים עם דלי מלא
+                await conn.execute(
+                    """
+                    INSERT INTO upstream_limits (upstream, request_tokens, token_tokens)
+                    VALUES ($1, $2, $3)
+                    ON CONFLICT (upstream) DO NOTHING
+                    """,
+                    upstream,
+                    float(requests_per_minute),
+                    float(tokens_per_minute),
+                )
+                row = await conn.fetchrow(select_state, upstream)
+
+            if row["blocked_for"] > 0:
+                return row["blocked_for"]
+
+            # מילוי הדלי לפי הזמן שעבר, עד הקיבולת (דקה אחת של קצב)
+            request_tokens = row["request_tokens"]
+            token_tokens = row["token_tokens"]
+            wait = 0.0
+            if requests_per_minute > 0:
+                request_tokens = min(
+                    requests_per_minute,
+                    request_tokens + row["elapsed"] * requests_per_minute / 60,
+                )
+                if request_tokens < 1:
+                    wait = (1 - request_tokens) * 60 / requests_per_minute
+            if tokens_per_minute > 0:
+                # בקשה גדולה מהקיבולת לעולם לא תעבור - מגבילים אותה לקיבולת
+                tokens = min(tokens, tokens_per_minute)
+                token_tokens = min(
+                    tokens_per_minute,
+                    token_tokens + row["elapsed"] * tokens_per_minute / 60,
+                )
+                if token_tokens < tokens:
+                    wait = max(wait, (tokens - token_tokens) * 60 / tokens_per_minute)
+
+            if wait > 0:
+                return wait
+
+            await conn.execute(
+                """
+                UPDATE upstream_limits
+                SET request_tokens = $2, token_tokens = $3, refilled_at = NOW()
+                WHERE upstream = $1
+                """,
+                upstream,
+                request_tokens - 1 if requests_per_minute > 0 else 0,
+                token_tokens - tokens if tokens_per_minute > 0 else 0,
+            )
+            return 0.0
+
+
+async def record_failure(
+    upstream: str,
+    retry_after: Optional[float],
+    failure_threshold: int,
+    cooldown_seconds: float,
+) -> Tuple[int, float]:
+    """
+    רושם כישלון של ה-upstream. חוסם אותו לפי Retry-After, ואחרי
+    failure_threshold כישלונות רצופים פותח את ה-Circuit breaker ל-cooldown_seconds.
+    מחזיר (כישלונות רצופים, שניות חסימה שנותרו).
+    """
+    pool = await get_pool()
+    row = await pool.fetchrow(
+        """
+        INSERT INTO upstream_limits AS u (upstream, consecutive_failures, blocked_until)
+        VALUES (
+            $1,
+            1,
+            NOW() + make_interval(
+                secs => GREATEST($2::float8, CASE WHEN $3::int <= 1 THEN $4::float8 ELSE 0 END)
+            )
+        )
+        ON CONFLICT (upstream) DO UPDATE SET
+            consecutive_failures = u.consecutive_failures + 1,
+            blocked_until = GREATEST(
+                COALESCE(u.blocked_until, NOW()),
+                NOW() + make_interval(secs => $2::float8),
+                CASE WHEN u.consecutive_failures + 1 >= $3::int
+                     THEN NOW() + make_interval(secs => $4::float8)
+                     ELSE NOW() END
+            )
+        RETURNING consecutive_failures,
+                  EXTRACT(EPOCH FROM blocked_until - NOW())::float AS blocked_for
+        """,
+        upstream,
+        float(retry_after or 0),
+        failure_threshold,
+        float(cooldown_seconds),
+    )
+    return row["consecutive_failures"], max(0.0, row["blocked_for"])
+
+
+async def record_success(upstream: str):
+    """בקשה הצליחה - סוגר את ה-Circuit breaker"""
+    pool = await get_pool()
+    await pool.execute(
+        """
+        UPDATE upstream_limits SET consecutive_failures = 0
+        WHERE upstream = $1 AND consecutive_failures > 0
+        """,
+        upstream,
+    )
+
+
+async def get_block_status(upstream: str) -> Tuple[int, float]:
+    """מחזיר (כישלונות רצופים, שניות חסימה שנותרו) עבור ה-upstream"""
+    pool = await get_pool()
+    row = await pool.fetchrow(
+        """
+        SELECT consecutive_failures,
+               COALESCE(EXTRACT(EPOCH FROM blocked_until - NOW())::float, 0) AS blocked_for
+        FROM upstream_limits
+        WHERE upstream = $1
+        """,
+        upstream,
+    )
+    if not row:
+        return 0, 0.0
+    return row["consecutive_failures"], max(0.0, row["blocked_for"])
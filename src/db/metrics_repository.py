@@ -0,0 +1,40 @@
+# src/db/metrics_repository.py
+import logging
+from typing import List, Tuple
+
+from db.postgres import get_pool
+
+logger = logging.getLogger("Repository")
+
+# מונים מצטברים לכל התהליכים (API + וורקרים נפרדים). כל תהליך מוסיף את הדלתא שלו.
+
+
+async def add_metrics(rows: List[Tuple[str, int, float]]):
+    """rows = [(metric, count, total)] - מתווסף לערכים הקיימים"""
+    if not rows:
+        return
+    pool = await get_pool()
+    await pool.executemany(
+        """
+        INSERT INTO pipeline_stats (metric, count, total, updated_at)
+        VALUES ($1, $2, $3, NOW())
+        ON CONFLICT (metric) DO UPDATE SET
+            count = pipeline_stats.count + EXCLUDED.count,
+            total = pipeline_stats.total + EXCLUDED.total,
+            updated_at = NOW()
+        """,
+        rows,
+    )
+
+
+async def get_metrics() -> List[dict]:
+    pool = await get_pool()
+    rows = await pool.fetch(
+        "SELECT metric, count, total, updated_at FROM pipeline_stats ORDER BY metric"
+    )
+    return [dict(row) for row in rows]
+
+
+async def reset_metrics(prefix: str = ""):
+    pool = await get_pool()
+    await pool.execute("DELETE FROM pipeline_stats WHERE metric LIKE $1", prefix + "%")
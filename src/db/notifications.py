@@ -0,0 +1,115 @@
+# src/db/notifications.py
+import asyncio
+import logging
+from typing import Dict, Optional
+
+import asyncpg
+
+from db.postgres import DB_CONFIG
+
+logger = logging.getLogger("Notifications")
+
+# ערוץ NOTIFY נפרד לכל שלב בתור - הוורקרים מאזינים רק לערוץ של השלב שלהם
+STAGE_CHANNELS = {
+    "WAITING_FOR_RESOLVE": "jobs_waiting_for_resolve",
+    "WAITING_FOR_SCRAPE": "jobs_waiting_for_scrape",
+    "WAITING_FOR_AI": "jobs_waiting_for_ai",
+}
+
+LISTENER_RECONNECT_SECONDS = 5
+
+
+async def notify_stage(conn, status: str):
+    """
+    Emit a wakeup on the channel of the given queue status.
+    Call inside the writing transaction - Postgres delivers it on commit.
+    """
+    channel = STAGE_CHANNELS.get(status)
+    if channel:
+        await conn.execute("SELECT pg_notify($1, '')", channel)
+
+
+class StageSignal:
+    """
+    In-process wakeup for the workers of a single stage.
+    `generation` lets a worker detect a notification that arrived between
+    its (empty) claim and the moment it started waiting.
+    """
+
+    def __init__(self):
+        self.generation = 0
+        self._event = asyncio.Event()
+
+    def fire(self):
+        self.generation += 1
+        self._event.set()
+        self._event = asyncio.Event()
+
+    async def wait(self, since: int, timeout: float) -> bool:
+        """Returns True if woken by a notification, False on timeout."""
+        if self.generation != since:
+            return True
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+_signals: Dict[str, StageSignal] = {}
+_channel_to_status = {channel: status for status, channel in STAGE_CHANNELS.items()}
+_listener_conn: Optional[asyncpg.Connection] = None
+_reconnect_task: Optional[asyncio.Task] = None
+
+
+def get_stage_signal(status: str) -> StageSignal:
+    if status not in _signals:
+        _signals[status] = StageSignal()
+    return _signals[status]
+
+
+def _on_notify(conn, pid, channel, payload):
+    status = _channel_to_status.get(channel)
+    if status:
+        get_stage_signal(status).fire()
+
+
+def _on_terminated(conn):
+    global _reconnect_task
+    logger.warning("⚠️ Queue listener connection lost, reconnecting...")
+    _reconnect_task = asyncio.get_running_loop().create_task(_reconnect())
+
+
+async def _reconnect():
+    while True:
+        await asyncio.sleep(LISTENER_RECONNECT_SECONDS)
+        try:
+            await start_listener()
+            return
+        except Exception as e:
+            logger.error(f"❌ Queue listener reconnect failed: {e}")
+
+
+async def start_listener():
+    """פותח חיבור ייעודי (מחוץ ל-Pool) שמאזין לכל ערוצי התור"""
+    global _listener_conn
+    conn = await asyncpg.connect(**DB_CONFIG)
+    for channel in STAGE_CHANNELS.values():
+        await conn.add_listener(channel, _on_notify)
+    conn.add_termination_listener(_on_terminated)
+    _listener_conn = conn
+
+    # ייתכן שפספסנו התראות בזמן שלא היינו מחוברים - מעירים את כולם לבדיקה
+    for status in STAGE_CHANNELS:
+        get_stage_signal(status).fire()
+    logger.info("👂 Queue listener connected")
+
+
+async def stop_listener():
+    global _listener_conn
+    if _reconnect_task:
+        _reconnect_task.cancel()
+    if _listener_conn is not None:
+        conn, _listener_conn = _listener_conn, None
+        conn.remove_termination_listener(_on_terminated)
+        await conn.close()
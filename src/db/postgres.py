@@ -5,6 +5,8 @@ import os
 import asyncpg
 from dotenv import load_dotenv
 
+from scraper_service.canonical import canonical_key
+
 logger = logging.getLogger("JobMatchServer")
 
 load_dotenv()
@@ -18,6 +20,9 @@ DB_CONFIG = {
 }
 _pool = None
 
+# מפתח קבוע ל-pg_advisory_lock: כמה תהליכים (API + וורקרים) עולים יחד ורק אחד מריץ מיגרציות
+INIT_DB_LOCK_KEY = 7_284_519_301
+
 
 async def get_pool():
     global _pool
@@ -32,13 +37,25 @@ async def get_pool():
         _pool = await asyncpg.create_pool(**DB_CONFIG, setup=setup_connection)
 
         # --- אתחול חד פעמי של הטבלאות ---
-        # אנחנו לוקחים חיבור אחד באופן יזום ומריצים עליו את ההקמה
+        # אנחנו לוקחים חיבור אחד באופן יזום ומריצים עליו את ההקמה.
+        # הנעילה מסדרת את התהליכים בתור - השאר מחכים ואז רואים שהכל כבר קיים
         async with _pool.acquire() as conn:
-            await init_db(conn)
+            await conn.execute("SELECT pg_advisory_lock($1)", INIT_DB_LOCK_KEY)
+            try:
+                await init_db(conn)
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", INIT_DB_LOCK_KEY)
 
     return _pool
 
 
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+
+
 async def init_db(conn):
     """יוצר את הטיפוסים והטבלאות אם הם לא קיימים"""
     # בדיקה מהירה אם הטבלה קיימת כדי לא להציף את הלוגים סתם
@@ -55,8 +72,8 @@ async def init_db(conn):
             BEGIN
                 IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'job_status') THEN
                     CREATE TYPE job_status AS ENUM (
-                        'NEW', 'WAITING_FOR_SCRAPE', 'SCRAPING', 'WAITING_FOR_AI', 
-                        'ANALYZING', 'COMPLETED', 'FAILED_SCRAPE', 'FAILED_ANALYSIS', 'NO_DATA'
+                        'NEW', 'WAITING_FOR_RESOLVE', 'RESOLVING', 'WAITING_FOR_SCRAPE', 'SCRAPING',
+                        'WAITING_FOR_AI', 'ANALYZING', 'COMPLETED', 'FAILED_SCRAPE', 'FAILED_ANALYSIS', 'NO_DATA'
                     );
                 END IF;
             END $$;
@@ -87,3 +104,176 @@ async def init_db(conn):
             "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);"
         )
         logger.info("✅ Database schema is ready.")
+
+    # --- מיגרציות: עמודות שנוספו אחרי ההקמה הראשונית (בטוח להריץ כל פעם) ---
+    # Leases: מי תפס את המשרה ועד מתי - הבסיס להרצת כמה שרתים על אותו DB
+    await conn.execute("""
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS claimed_by TEXT;
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE;
+    """)
+    # עדיפות בתור: אינטראקטיבי גבוה, ייבוא בכמויות נמוך. האינדקס תואם לשאילתת ה-Claim
+    await conn.execute("""
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS priority SMALLINT NOT NULL DEFAULT 5;
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS priority_aged_at TIMESTAMP WITH TIME ZONE;
+        CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, priority DESC, created_at);
+    """)
+    # העדיפות שבה המשרה נכנסה לתור (priority עולה עם Aging) - לפיה מחליטים על מסלול ה-Batch
+    has_intake_priority = await conn.fetchval("""
+        SELECT EXISTS (
+            SELECT FROM information_schema.columns
+            WHERE table_name = 'jobs' AND column_name = 'intake_priority'
+        )
+    """)
+    if not has_intake_priority:
+        await conn.execute("""
+            ALTER TABLE jobs ADD COLUMN intake_priority SMALLINT NOT NULL DEFAULT 5;
+            UPDATE jobs SET intake_priority = priority WHERE priority <> 5;
+        """)
+    # ניסיונות חוזרים ברמת השלב: כמה ניסיונות, מתי מותר לנסות שוב ומה סוג השגיאה האחרונה
+    await conn.execute("""
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP WITH TIME ZONE;
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS last_error_class TEXT;
+    """)
+    # מצב משותף של Rate limiter / Circuit breaker לכל upstream (Gemini, Jina)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS upstream_limits (
+            upstream TEXT PRIMARY KEY,
+            request_tokens DOUBLE PRECISION NOT NULL DEFAULT 0,
+            token_tokens DOUBLE PRECISION NOT NULL DEFAULT 0,
+            refilled_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+            consecutive_failures INTEGER NOT NULL DEFAULT 0,
+            blocked_until TIMESTAMP WITH TIME ZONE
+        );
+    """)
+    # שלב רזולוציה נפרד. ADD VALUE לא יכול לרוץ באותה טרנזקציה שמשתמשת בערך,
+    # ולכן כל פקודה נשלחת לבד (כל execute הוא טרנזקציה משלו)
+    await conn.execute(
+        "ALTER TYPE job_status ADD VALUE IF NOT EXISTS 'WAITING_FOR_RESOLVE' BEFORE 'WAITING_FOR_SCRAPE'"
+    )
+    await conn.execute(
+        "ALTER TYPE job_status ADD VALUE IF NOT EXISTS 'RESOLVING' BEFORE 'WAITING_FOR_SCRAPE'"
+    )
+    # לינקים שעוד ממתינים לסריקה אבל צריכים רזולוציה עוברים לשלב החדש
+    await conn.execute("""
+        UPDATE jobs SET status = 'WAITING_FOR_RESOLVE'
+        WHERE status = 'WAITING_FOR_SCRAPE' AND url LIKE '%hiremetech.com%'
+    """)
+
+    # מטמון סריקות לפי הלינק הסופי - ניסיון חוזר לא עולה קרדיטים של Jina
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS scrape_cache (
+            url TEXT PRIMARY KEY,
+            full_description TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            source TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+            validated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+        );
+        ALTER TABLE scrape_cache ADD COLUMN IF NOT EXISTS company TEXT;
+        ALTER TABLE scrape_cache ADD COLUMN IF NOT EXISTS job_title TEXT;
+    """)
+
+    # מונים מצטברים (services/metrics.py) - משותפים ל-API ולתהליכי הוורקרים
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_stats (
+            metric TEXT PRIMARY KEY,
+            count BIGINT NOT NULL DEFAULT 0,
+            total DOUBLE PRECISION NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+        );
+    """)
+
+    # מטמון רזולוציות לינקים (HireMeTech -> לינק החברה)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS url_resolutions (
+            original_url TEXT PRIMARY KEY,
+            resolved_url TEXT NOT NULL,
+            resolved_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+            expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+        );
+    """)
+
+    # מפתח קנוני (scraper_service/canonical.py) - כפילויות לפי המשרה ולא לפי מחרוזת הלינק
+    await conn.execute("""
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS canonical_key TEXT;
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS canonical_key_checked BOOLEAN NOT NULL DEFAULT FALSE;
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_canonical_key ON jobs(canonical_key);
+    """)
+    await _backfill_canonical_keys(conn)
+
+    # מטמון ניתוחים - JobAnalyzer.cache_key (פרופיל + תיאור + מודל + גרסת פרומפט)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            cache_key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            result JSONB NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+            last_hit_at TIMESTAMP WITH TIME ZONE
+        );
+    """)
+
+    # המשתמש ביקש ניתוח מלא למשרה שסוננה ב-Pre-screen (services/prescreen.py)
+    await conn.execute("""
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS force_analysis BOOLEAN NOT NULL DEFAULT FALSE;
+    """)
+
+    # כפילויות קרובות (services/near_duplicates.py): SimHash + אינדקס לכל רצועה של 16 ביט
+    await conn.execute("""
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS simhash BIGINT;
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS simhash_b0 INTEGER;
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS simhash_b1 INTEGER;
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS simhash_b2 INTEGER;
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS simhash_b3 INTEGER;
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS duplicate_of INTEGER
+            REFERENCES jobs(id) ON DELETE SET NULL;
+        -- הפרופיל שמולו נותחה המשרה - ניתוח של פרופיל אחר לא משוכפל לכפילויות
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS profile_hash TEXT;
+        CREATE INDEX IF NOT EXISTS idx_jobs_simhash_b0 ON jobs(simhash_b0);
+        CREATE INDEX IF NOT EXISTS idx_jobs_simhash_b1 ON jobs(simhash_b1);
+        CREATE INDEX IF NOT EXISTS idx_jobs_simhash_b2 ON jobs(simhash_b2);
+        CREATE INDEX IF NOT EXISTS idx_jobs_simhash_b3 ON jobs(simhash_b3);
+    """)
+
+
+async def _backfill_canonical_keys(conn):
+    """
+    ממלא canonical_key לשורות ישנות. אם כמה שורות ישנות הן אותה משרה, רק הראשונה
+    מקבלת את המפתח (האינדקס ייחודי) והשאר נשארות NULL - ומסומנות כדי שלא ייסרקו
+    שוב בכל עלייה.
+    """
+    rows = await conn.fetch(
+        """
+        SELECT id, url FROM jobs
+        WHERE canonical_key IS NULL AND NOT canonical_key_checked
+        ORDER BY created_at
+        """
+    )
+    if not rows:
+        return
+    # executemany רץ שורה אחרי שורה - כל UPDATE רואה את המפתחות שכבר נקבעו
+    await conn.executemany(
+        """
+        UPDATE jobs SET canonical_key = $2
+        WHERE id = $1
+        AND NOT EXISTS (SELECT 1 FROM jobs WHERE canonical_key = $2)
+        """,
+        [(row["id"], canonical_key(row["url"])) for row in rows],
+    )
+    remaining = await conn.fetchval(
+        """
+        WITH marked AS (
+            UPDATE jobs SET canonical_key_checked = TRUE
+            WHERE id = ANY($1::int[]) AND canonical_key IS NULL
+            RETURNING id
+        )
+        SELECT COUNT(*) FROM marked
+        """,
+        [row["id"] for row in rows],
+    )
+    if remaining < len(rows):
+        logger.info(f"🔑 Backfilled canonical keys for {len(rows) - remaining} job(s)")
@@ -0,0 +1,53 @@
+# src/db/resolutions_repository.py
+import logging
+from typing import Dict, List, Optional
+
+from db.postgres import get_pool
+
+logger = logging.getLogger("Repository")
+
+# מיפוי לינק מקורי (למשל HireMeTech) -> לינק החברה, כדי לא להריץ דפדפן פעמיים לאותו לינק
+
+
+async def get_resolution(original_url: str) -> Optional[str]:
+    """מחזיר את הלינק המפוענח אם קיים ועוד לא פג תוקפו"""
+    pool = await get_pool()
+    return await pool.fetchval(
+        """
+        SELECT resolved_url FROM url_resolutions
+        WHERE original_url = $1 AND expires_at > NOW()
+        """,
+        original_url,
+    )
+
+
+async def get_resolutions(original_urls: List[str]) -> Dict[str, str]:
+    """גרסת Bulk - שאילתה אחת לכל הלינקים (ייבוא בכמויות)"""
+    if not original_urls:
+        return {}
+    pool = await get_pool()
+    rows = await pool.fetch(
+        """
+        SELECT original_url, resolved_url FROM url_resolutions
+        WHERE original_url = ANY($1::text[]) AND expires_at > NOW()
+        """,
+        original_urls,
+    )
+    return {row["original_url"]: row["resolved_url"] for row in rows}
+
+
+async def save_resolution(original_url: str, resolved_url: str, ttl_seconds: float):
+    pool = await get_pool()
+    await pool.execute(
+        """
+        INSERT INTO url_resolutions (original_url, resolved_url, resolved_at, expires_at)
+        VALUES ($1, $2, NOW(), NOW() + make_interval(secs => $3::float8))
+        ON CONFLICT (original_url) DO UPDATE SET
+            resolved_url = EXCLUDED.resolved_url,
+            resolved_at = EXCLUDED.resolved_at,
+            expires_at = EXCLUDED.expires_at
+        """,
+        original_url,
+        resolved_url,
+        float(ttl_seconds),
+    )
@@ -0,0 +1,90 @@
+# src/db/scrape_cache_repository.py
+import logging
+from typing import Optional
+
+from db.postgres import get_pool
+
+logger = logging.getLogger("Repository")
+
+# תוכן סרוק לפי הלינק הסופי (אחרי רזולוציה) + ETag/Last-Modified של האתר לאימות מחדש
+
+
+async def get_cached_scrape(url: str) -> Optional[dict]:
+    """מחזיר את רשומת המטמון של הלינק + גילה בשניות (age) מאז האימות האחרון"""
+    pool = await get_pool()
+    row = await pool.fetchrow(
+        """
+        SELECT url, full_description, content_hash, source, etag, last_modified,
+               company, job_title, fetched_at,
+               EXTRACT(EPOCH FROM NOW() - validated_at)::float AS age,
+               EXTRACT(EPOCH FROM NOW() - fetched_at)::float AS fetched_age
+        FROM scrape_cache
+        WHERE url = $1
+        """,
+        url,
+    )
+    return dict(row) if row else None
+
+
+async def save_scrape(
+    url: str,
+    full_description: str,
+    content_hash: str,
+    source: str,
+    etag: Optional[str],
+    last_modified: Optional[str],
+    company: Optional[str] = None,
+    job_title: Optional[str] = None,
+):
+    pool = await get_pool()
+    await pool.execute(
+        """
+        INSERT INTO scrape_cache
+            (url, full_description, content_hash, source, etag, last_modified,
+             company, job_title, fetched_at, validated_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, NOW(), NOW())
+        ON CONFLICT (url) DO UPDATE SET
+            full_description = EXCLUDED.full_description,
+            content_hash = EXCLUDED.content_hash,
+            source = EXCLUDED.source,
+            etag = EXCLUDED.etag,
+            last_modified = EXCLUDED.last_modified,
+            company = EXCLUDED.company,
+            job_title = EXCLUDED.job_title,
+            fetched_at = EXCLUDED.fetched_at,
+            validated_at = EXCLUDED.validated_at
+        """,
+        url,
+        full_description,
+        content_hash,
+        source,
+        etag,
+        last_modified,
+        company,
+        job_title,
+    )
+
+
+async def mark_scrape_validated(url: str):
+    """האתר אישר שהדף לא השתנה (304) - מאפס את גיל הרשומה"""
+    pool = await get_pool()
+    await pool.execute(
+        "UPDATE scrape_cache SET validated_at = NOW() WHERE url = $1", url
+    )
+
+
+async def save_scrape_validators(
+    url: str, content_hash: str, etag: Optional[str], last_modified: Optional[str]
+):
+    """Validators שהגיעו ברקע - רק אם הרשומה עדיין מחזיקה את אותו תוכן"""
+    pool = await get_pool()
+    await pool.execute(
+        """
+        UPDATE scrape_cache SET etag = $3, last_modified = $4
+        WHERE url = $1 AND content_hash = $2
+        """,
+        url,
+        content_hash,
+        etag,
+        last_modified,
+    )
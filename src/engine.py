@@ -1,14 +1,128 @@
 # jobMatch/src/engine.py
+import asyncio
+import hashlib
 import json
+import logging
 import os
+import re
 import time
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
-import requests
+import httpx
 from dotenv import load_dotenv
 
+from services import metrics
+from services.http_client import get_http_client, new_http_client
+from services.upstream_errors import (
+    UPSTREAM_FAILURE_STATUSES,
+    UpstreamError,
+    parse_retry_after,
+)
+
 load_dotenv()
 
+logger = logging.getLogger("Engine")
+
+# להעלות בכל שינוי בפרומפט או במבנה ה-JSON - מבטל את מטמון הניתוחים הקודם
+PROMPT_VERSION = "2"
+
+# כתובת ה-API - ניתן להפנות לשרת מקומי (fake_gemini.py) לבדיקות
+GEMINI_API_BASE = os.getenv(
+    "GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta"
+).rstrip("/")
+
+# קו"ח + הקשר נשמרים פעם אחת ב-cachedContents של Gemini, וכל קריאה שולחת רק את המשרה
+GEMINI_CONTEXT_CACHE_ENABLED = (
+    os.getenv("GEMINI_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+)
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = int(
+    os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", 3600)
+)
+# לא משתמשים במטמון שעומד לפוג, וכשיצירה נכשלה (למשל פרופיל קצר מהמינימום) לא מנסים בכל משרה
+_CACHE_REFRESH_MARGIN_SECONDS = 120
+_CACHE_RETRY_SECONDS = 300
+# תשובות Gemini כשה-cachedContent כבר לא קיים (פג / נמחק)
+_STALE_CACHE_STATUSES = (400, 403, 404)
+
+# Cascade: טריאז' זול (ציון + חוסמים בלבד) ואז ניתוח מלא, אפשר על מודל חזק יותר
+FULL_MODEL = os.getenv("FULL_MODEL", "gemini-2.5-flash-lite")
+TRIAGE_MODEL = os.getenv("TRIAGE_MODEL", "gemini-2.5-flash-lite")
+
+# מבנה התשובה של ניתוח משרה (analyze_batch_async אוכף אותו דרך responseSchema)
+_ANALYSIS_FIELDS = {
+    "company": {"type": "STRING"},
+    "job_title": {"type": "STRING"},
+    "suitability_score": {"type": "INTEGER"},
+    "acceptance_probability": {"type": "INTEGER"},
+    "job_summary_hebrew": {"type": "STRING"},
+    "showstoppers": {"type": "ARRAY", "items": {"type": "STRING"}},
+    "gap_analysis": {"type": "ARRAY", "items": {"type": "STRING"}},
+    "recommendation": {"type": "STRING"},
+    "formatted_message": {"type": "STRING"},
+}
+_TRIAGE_FIELDS = {
+    "suitability_score": {"type": "INTEGER"},
+    "showstoppers": {"type": "ARRAY", "items": {"type": "STRING"}},
+}
+
+
+def _batch_schema(fields: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {"job_index": {"type": "INTEGER"}, **fields},
+            "required": ["job_index", *fields],
+        },
+    }
+
+
+BATCH_RESPONSE_SCHEMA = _batch_schema(_ANALYSIS_FIELDS)
+TRIAGE_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": _TRIAGE_FIELDS,
+    "required": list(_TRIAGE_FIELDS),
+}
+TRIAGE_BATCH_RESPONSE_SCHEMA = _batch_schema(_TRIAGE_FIELDS)
+
+_FULL_TEMPLATE = """{{
+  "company": "{company}",
+  "job_title": "{job_title}",
+  "suitability_score": 0-100,
+  "acceptance_probability": 0-100,
+  "job_summary_hebrew": "סיכום המשרה בעברית",
+  "showstoppers": ["רשימת חוסמים"],
+  "gap_analysis": ["רשימת פערים"],
+  "recommendation": "להגיש / לא להגיש",
+  "formatted_message": "פנייה ישירה ליניב"
+}}"""
+_TRIAGE_TEMPLATE = """{{
+  "suitability_score": 0-100,
+  "showstoppers": ["חוסמים מובהקים בלבד"]
+}}"""
+
+
+def triage_result(job_data: Dict[str, Any], triage: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A triage answer stored as the job's analysis (cascade stopped before the
+    full analysis). Same shape as a full result so the dashboard renders it;
+    `triage_only` tells the dashboard to request the full analysis on open.
+    """
+    return {
+        "company": job_data.get("company"),
+        "job_title": job_data.get("job_title"),
+        "suitability_score": triage.get("suitability_score", 0),
+        "acceptance_probability": 0,
+        "job_summary_hebrew": "ניתוח מקוצר בלבד (ציון נמוך בסינון הראשוני). "
+        "ניתוח מלא ירוץ בפתיחת המשרה.",
+        "showstoppers": triage.get("showstoppers") or [],
+        "gap_analysis": [],
+        "recommendation": "לא להגיש",
+        "formatted_message": "",
+        "triage_only": True,
+        "url": job_data.get("url"),
+    }
+
 
 class JobAnalyzer:
     def __init__(self):
@@ -16,86 +130,391 @@ class JobAnalyzer:
         if not self.api_key:
             raise RuntimeError("❌ GEMINI_API_KEY missing in .env file")
 
-        # המודל שבחרת - יציב ומהיר ל-2026
-        self.model_name = "gemini-2.5-flash-lite"
-        self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:generateContent?key={self.api_key}"
+        # מודל הניתוח המלא ומודל הטריאז' (FULL_MODEL / TRIAGE_MODEL)
+        self.model_name = FULL_MODEL
+        self.triage_model = TRIAGE_MODEL
+        self.api_url = self._api_url(self.model_name)
+        self.cache_url = f"{GEMINI_API_BASE}/cachedContents"
         self.headers = {"Content-Type": "application/json"}
+        # לכל מודל מטמון משלו (cachedContents קשור למודל):
+        # {"profile_key", "name", "expires_at"} - name=None אם היצירה נכשלה
+        self._profile_caches: Dict[str, Dict[str, Any]] = {}
+        self._profile_cache_lock = asyncio.Lock()
 
-    def analyze(
-        self, resume: str, context: str, job_data: Dict[str, Any]
-    ) -> Dict[str, Any]:
+    def _api_url(self, model: str) -> str:
+        return f"{GEMINI_API_BASE}/models/{model}:generateContent?key={self.api_key}"
+
+    def cache_key(self, resume: str, context: str, job_data: Dict[str, Any]) -> str:
         """
-        מנתח את המשרה ומוודא שהמזהה המקורי (URL או None) חוזר בסוף התהליך
-        כדי למנוע איבוד נתונים בעדכון ה-DB.
+        Hash of everything that determines the analysis: profile, normalized
+        description, the company/title echoed into the prompt, model and
+        prompt version. Same key = the stored result can be reused.
         """
+        description = re.sub(r"\s+", " ", job_data.get("full_description") or "").strip()
+        material = json.dumps(
+            [
+                PROMPT_VERSION,
+                self.model_name,
+                resume or "",
+                context or "",
+                job_data.get("company"),
+                job_data.get("job_title"),
+                description,
+            ],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
 
-        # 1. שמירת ה-URL המקורי (או None) - זה העוגן שלנו
-        original_url = job_data.get("url")
-        raw_company = job_data.get("company", "לא זוהה")
-        raw_title = job_data.get("job_title", "לא זוהה")
-        description = job_data.get("full_description", "אין תיאור משרה")
+    def profile_key(self, resume: str, context: str, model: Optional[str] = None) -> str:
+        """Identifies the cached profile prefix - changes with the resume, context, model or prompt."""
+        material = json.dumps(
+            [PROMPT_VERSION, model or self.model_name, resume or "", context or ""],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
 
-        prompt = f"""
-נתח התאמה למשרה על בסיס עובדות בלבד. 
+    def _build_profile_prompt(self, resume: str, context: str) -> str:
+        # חלק קבוע לכל המשרות - זה מה שנשמר ב-cachedContents
+        return f"""
+נתח התאמה למשרות על בסיס עובדות בלבד. 
 
-### נתונים:
+### פרופיל המועמד:
 1. קורות חיים:
 {resume}
 
 2. הקשר נוסף:
 {context}
+"""
 
-3. תיאור המשרה:
+    def _build_job_prompt(self, job_data: Dict[str, Any]) -> str:
+        raw_company = job_data.get("company", "לא זוהה")
+        raw_title = job_data.get("job_title", "לא זוהה")
+        description = job_data.get("full_description", "אין תיאור משרה")
+
+        return f"""
+### תיאור המשרה:
 {description}
 
 ### החזר JSON במבנה הבא:
-{{
-  "company": "{raw_company}",
-  "job_title": "{raw_title}",
-  "suitability_score": 0-100,
-  "acceptance_probability": 0-100,
-  "job_summary_hebrew": "סיכום המשרה בעברית",
-  "showstoppers": ["רשימת חוסמים"],
-  "gap_analysis": ["רשימת פערים"],
-  "recommendation": "להגיש / לא להגיש",
-  "formatted_message": "פנייה ישירה ליניב"
-}}
+{_FULL_TEMPLATE.format(company=raw_company, job_title=raw_title)}
 """
 
+    def _build_triage_prompt(self, job_data: Dict[str, Any]) -> str:
+        # סינון ראשוני זול - רק ציון וחוסמים, בלי סיכום/פערים/פנייה
+        description = job_data.get("full_description", "אין תיאור משרה")
+        return f"""
+### תיאור המשרה:
+{description}
+
+### סינון ראשוני בלבד. החזר JSON במבנה הבא:
+{_TRIAGE_TEMPLATE.format()}
+"""
+
+    def _build_batch_prompt(self, jobs: List[Dict[str, Any]], triage: bool = False) -> str:
+        # כמה משרות בקריאה אחת - כל משרה מזוהה לפי job_index והמבנה נאכף ב-responseSchema
+        sections = "\n".join(
+            f"""
+--- משרה job_index={index} ---
+חברה: {job.get("company", "לא זוהה")}
+תפקיד: {job.get("job_title", "לא זוהה")}
+{job.get("full_description", "אין תיאור משרה")}
+"""
+            for index, job in enumerate(jobs)
+        )
+        if triage:
+            template = _TRIAGE_TEMPLATE.format()
+        else:
+            template = _FULL_TEMPLATE.format(company="שם החברה", job_title="שם התפקיד")
+        template = template.replace("{\n", '{\n  "job_index": 0,\n', 1)
+        return f"""
+### {len(jobs)} תיאורי משרות:
+{sections}
+### {"סינון ראשוני בלבד. " if triage else ""}החזר מערך JSON עם אובייקט אחד לכל משרה (job_index תואם למשרה), במבנה הבא:
+{template}
+כל משרה מנותחת בנפרד - אין להעביר מידע בין משרות.
+"""
+
+    def _build_payload(
+        self,
+        resume: str,
+        context: str,
+        job_prompt: str,
+        cached_content: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         payload = {
-            "contents": [{"parts": [{"text": prompt}]}],
             "generationConfig": {
                 "responseMimeType": "application/json",
                 "temperature": 0.1,
             },
         }
+        if response_schema:
+            payload["generationConfig"]["responseSchema"] = response_schema
+        if cached_content:
+            payload["cachedContent"] = cached_content
+            payload["contents"] = [{"role": "user", "parts": [{"text": job_prompt}]}]
+        else:
+            prompt = self._build_profile_prompt(resume, context) + job_prompt
+            payload["contents"] = [{"role": "user", "parts": [{"text": prompt}]}]
+        return payload
+
+    async def _get_cached_profile(
+        self, client: httpx.AsyncClient, resume: str, context: str, model: str
+    ) -> Optional[str]:
+        """
+        Returns the cachedContents name holding the resume + context prefix,
+        creating it on first use and again whenever the profile changes
+        (a new profile hash) or the cache is about to expire. None means
+        send the full prompt inline.
+        """
+        if not GEMINI_CONTEXT_CACHE_ENABLED:
+            return None
+        profile_key = self.profile_key(resume, context, model)
+        async with self._profile_cache_lock:
+            entry = self._profile_caches.get(model)
+            now = time.monotonic()
+            if (
+                entry
+                and entry["profile_key"] == profile_key
+                and entry["expires_at"] - now > _CACHE_REFRESH_MARGIN_SECONDS
+            ):
+                return entry["name"]
+
+            # הפרופיל השתנה - המטמון הישן כבר לא רלוונטי
+            if entry and entry["name"] and entry["profile_key"] != profile_key:
+                await self._delete_cached_content(client, entry["name"])
+
+            name = await self._create_cached_content(client, resume, context, model)
+            ttl = GEMINI_CONTEXT_CACHE_TTL_SECONDS if name else _CACHE_RETRY_SECONDS
+            self._profile_caches[model] = {
+                "profile_key": profile_key,
+                "name": name,
+                "expires_at": now + ttl,
+            }
+            return name
+
+    async def _create_cached_content(
+        self, client: httpx.AsyncClient, resume: str, context: str, model: str
+    ) -> Optional[str]:
+        body = {
+            "model": f"models/{model}",
+            "contents": [
+                {
+                    "role": "user",
+                    "parts": [{"text": self._build_profile_prompt(resume, context)}],
+                }
+            ],
+            "ttl": f"{GEMINI_CONTEXT_CACHE_TTL_SECONDS}s",
+        }
+        try:
+            response = await client.post(
+                self.cache_url,
+                params={"key": self.api_key},
+                headers=self.headers,
+                json=body,
+            )
+            response.raise_for_status()
+            name = response.json()["name"]
+        except Exception as e:
+            # למשל פרופיל קצר ממינימום הטוקנים של המודל - ממשיכים עם פרומפט מלא
+            logger.warning(f"⚠️ Could not cache the profile prompt, sending it inline: {e}")
+            metrics.incr("gemini.context_cache.create_failed")
+            return None
+        logger.info(f"🗂️ Cached profile prompt as {name}")
+        metrics.incr("gemini.context_cache.created")
+        return name
+
+    async def _delete_cached_content(self, client: httpx.AsyncClient, name: str):
+        try:
+            await client.delete(
+                f"{GEMINI_API_BASE}/{name}", params={"key": self.api_key}
+            )
+        except Exception as e:
+            # best-effort - ה-TTL ינקה אותו בכל מקרה
+            logger.debug(f"Could not delete cached content {name}: {e}")
+
+    def _drop_cached_profile(self, model: str, name: str):
+        entry = self._profile_caches.get(model)
+        if entry and entry["name"] == name:
+            del self._profile_caches[model]
+
+    async def _generate(
+        self,
+        client: httpx.AsyncClient,
+        resume: str,
+        context: str,
+        job_prompt: str,
+        response_schema: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None,
+        tier: str = "full",
+    ) -> Any:
+        """
+        One generateContent call (cached profile prefix when available);
+        returns the parsed JSON. `tier` ("triage" / "full") labels the token
+        counters so GET /api/stats can show what the cascade saves.
+        """
+        model = model or self.model_name
+        api_url = self._api_url(model)
+        cached_content = await self._get_cached_profile(client, resume, context, model)
+        payload = self._build_payload(
+            resume, context, job_prompt, cached_content, response_schema
+        )
+        response = await client.post(api_url, headers=self.headers, json=payload)
+        if cached_content and response.status_code in _STALE_CACHE_STATUSES:
+            # המטמון פג או נמחק בצד של Gemini - שולחים הפעם את הפרופיל במלואו
+            logger.info(f"🗂️ Cached profile {cached_content} is gone, sending inline")
+            metrics.incr("gemini.context_cache.stale")
+            self._drop_cached_profile(model, cached_content)
+            payload = self._build_payload(
+                resume, context, job_prompt, response_schema=response_schema
+            )
+            response = await client.post(api_url, headers=self.headers, json=payload)
+        # עומס / מכסה - מסמנים כדי שה-Rate limiter וה-Circuit breaker יגיבו
+        if response.status_code in UPSTREAM_FAILURE_STATUSES:
+            raise UpstreamError(
+                "gemini",
+                response.status_code,
+                parse_retry_after(response.headers.get("Retry-After")),
+            )
+        response.raise_for_status()
+        data = response.json()
+        usage = data.get("usageMetadata") or {}
+        metrics.incr("gemini.tokens.prompt", usage.get("promptTokenCount", 0))
+        metrics.incr("gemini.tokens.cached", usage.get("cachedContentTokenCount", 0))
+        # לפי שכבה - כדי לראות כמה עולה כל שכבה ב-Cascade
+        metrics.incr(f"gemini.calls.{tier}")
+        metrics.incr(f"gemini.tokens.{tier}", usage.get("totalTokenCount", 0))
+
+        text_output = data["candidates"][0]["content"]["parts"][0]["text"]
+        return json.loads(text_output)
+
+    async def analyze_async(
+        self,
+        resume: str,
+        context: str,
+        job_data: Dict[str, Any],
+        attempts: int = 3,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> Dict[str, Any]:
+        """
+        מנתח את המשרה ומוודא שהמזהה המקורי (URL או None) חוזר בסוף התהליך
+        כדי למנוע איבוד נתונים בעדכון ה-DB.
+        רץ ישירות על ה-Event loop מעל Client משותף (keep-alive / HTTP/2), בלי Threads.
+        הוורקרים מריצים עם attempts=1 - הניסיונות החוזרים מתוזמנים דרך התור.
+        """
+
+        # 1. שמירת ה-URL המקורי (או None) - זה העוגן שלנו
+        original_url = job_data.get("url")
+        client = client or get_http_client("gemini")
+        job_prompt = self._build_job_prompt(job_data)
 
         # לוגיקת ה-Retry
-        for attempt in range(3):
+        last_error = None
+        for attempt in range(attempts):
             try:
-                response = requests.post(
-                    self.api_url,
-                    headers=self.headers,
-                    json=payload,
-                    timeout=60,
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                text_output = data["candidates"][0]["content"]["parts"][0]["text"]
-                result = json.loads(text_output)
+                result = await self._generate(client, resume, context, job_prompt)
 
                 # 2. הזרקה מחדש של ה-URL המקורי לתוצאה (גם אם הוא None)
                 result["url"] = original_url
                 return result
 
             except Exception as e:
+                if isinstance(e, httpx.TransportError):
+                    e = UpstreamError("gemini", message=str(e))
+                last_error = e
                 print(f"⚠️ Attempt {attempt + 1} failed: {e}")
-                if attempt < 2:
-                    time.sleep(2)
+                if attempt < attempts - 1:
+                    await asyncio.sleep(max(2, getattr(e, "retry_after", None) or 0))
 
         # 3. במקרה של כישלון סופי - זורקים שגיאה כדי שהוורקר יסמן ככישלון
-        raise RuntimeError("Analysis failed after 3 attempts")
+        raise RuntimeError(f"Analysis failed after {attempts} attempts") from last_error
+
+    async def analyze_batch_async(
+        self,
+        resume: str,
+        context: str,
+        jobs: List[Dict[str, Any]],
+        client: Optional[httpx.AsyncClient] = None,
+        triage: bool = False,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analyzes several jobs in one request (one shared profile prefix, one
+        round trip). Returns a result per job in input order; None where the
+        model skipped a job or returned an invalid entry, so the caller can
+        fall back to a single-job call for just those. Single attempt - request
+        errors propagate like in the workers' analyze_async(attempts=1).
+        With triage=True the items are triage answers (see triage_async).
+        """
+        client = client or get_http_client("gemini")
+        fields = _TRIAGE_FIELDS if triage else _ANALYSIS_FIELDS
+        try:
+            items = await self._generate(
+                client,
+                resume,
+                context,
+                self._build_batch_prompt(jobs, triage),
+                response_schema=(
+                    TRIAGE_BATCH_RESPONSE_SCHEMA if triage else BATCH_RESPONSE_SCHEMA
+                ),
+                model=self.triage_model if triage else self.model_name,
+                tier="triage" if triage else "full",
+            )
+        except httpx.TransportError as e:
+            raise UpstreamError("gemini", message=str(e)) from e
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            index = item.pop("job_index", None)
+            if not isinstance(index, int) or not 0 <= index < len(jobs):
+                continue
+            if results[index] is not None or any(field not in item for field in fields):
+                continue
+            if not triage:
+                item["url"] = jobs[index].get("url")
+            results[index] = item
+        return results
+
+    async def triage_async(
+        self,
+        resume: str,
+        context: str,
+        job_data: Dict[str, Any],
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> Dict[str, Any]:
+        """
+        First tier of the cascade: only {"suitability_score", "showstoppers"},
+        on TRIAGE_MODEL with a tiny output. The caller decides whether the
+        full analysis is worth running. Single attempt.
+        """
+        client = client or get_http_client("gemini")
+        try:
+            return await self._generate(
+                client,
+                resume,
+                context,
+                self._build_triage_prompt(job_data),
+                response_schema=TRIAGE_RESPONSE_SCHEMA,
+                model=self.triage_model,
+                tier="triage",
+            )
+        except httpx.TransportError as e:
+            raise UpstreamError("gemini", message=str(e)) from e
+
+    def analyze(
+        self, resume: str, context: str, job_data: Dict[str, Any], attempts: int = 3
+    ) -> Dict[str, Any]:
+        """עטיפה סינכרונית ל-analyze_async (עבור main.py והרצה ישירה)"""
+
+        async def _run():
+            # Client זמני - Client משותף קשור ל-Event loop שבו נוצר
+            async with new_http_client("gemini") as client:
+                return await self.analyze_async(
+                    resume, context, job_data, attempts, client
+                )
+
+        return asyncio.run(_run())
 
 
 # --- בלוק בדיקה להרצה ישירה ---
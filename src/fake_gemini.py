@@ -0,0 +1,181 @@
+# fake_gemini.py
+"""
+Local stand-in for the Gemini REST API: generateContent plus the
+cachedContents endpoints JobAnalyzer uses. Returns a fixed analysis and
+reports how many prompt tokens were sent vs. served from a cached prefix,
+so the context cache can be exercised without a key or quota.
+
+    cd src
+    python fake_gemini.py --port 8090
+    GEMINI_API_BASE=http://localhost:8090/v1beta GEMINI_API_KEY=test python -m workers
+
+    curl localhost:8090/stats
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+import uuid
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+
+app = FastAPI(title="Fake Gemini")
+
+# הגדרות ההרצה (ממולאות מה-CLI)
+settings = {"min_cache_tokens": 0, "latency_ms": 0.0, "latency_ms_per_1k": 0.0}
+_cached_contents = {}
+_stats = Counter()
+
+
+def _tokens(contents) -> int:
+    # ~4 תווים לטוקן, כמו ההערכה של הוורקר
+    text = "".join(
+        part.get("text", "")
+        for content in contents or []
+        for part in content.get("parts", [])
+    )
+    return len(text) // 4
+
+
+def _get_live_cache(name: str) -> dict:
+    entry = _cached_contents.get(name)
+    if not entry or entry["expires_at"] < time.time():
+        _cached_contents.pop(name, None)
+        raise HTTPException(status_code=404, detail=f"CachedContent not found: {name}")
+    return entry
+
+
+@app.post("/v1beta/cachedContents")
+async def create_cached_content(request: Request):
+    body = await request.json()
+    tokens = _tokens(body.get("contents"))
+    # כמו ב-Gemini: פרפיקס קצר מהמינימום נדחה
+    if tokens < settings["min_cache_tokens"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cached content is too small: {tokens} < {settings['min_cache_tokens']}",
+        )
+    ttl = float(str(body.get("ttl", "3600s")).rstrip("s"))
+    name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+    _cached_contents[name] = {
+        "model": body.get("model"),
+        "tokens": tokens,
+        "expires_at": time.time() + ttl,
+    }
+    _stats["caches_created"] += 1
+    return {
+        "name": name,
+        "model": body.get("model"),
+        "usageMetadata": {"totalTokenCount": tokens},
+    }
+
+
+@app.delete("/v1beta/cachedContents/{cache_id}")
+async def delete_cached_content(cache_id: str):
+    _cached_contents.pop(f"cachedContents/{cache_id}", None)
+    _stats["caches_deleted"] += 1
+    return {}
+
+
+@app.post("/v1beta/models/{model_action}")
+async def generate_content(model_action: str, request: Request):
+    model, _, action = model_action.partition(":")
+    if action != "generateContent":
+        raise HTTPException(status_code=404, detail=f"Unknown action: {action}")
+    body = await request.json()
+
+    cached_tokens = 0
+    if body.get("cachedContent"):
+        entry = _get_live_cache(body["cachedContent"])
+        if entry["model"] != f"models/{model}":
+            raise HTTPException(status_code=400, detail="Model does not match cache")
+        cached_tokens = entry["tokens"]
+        _stats["requests_cached"] += 1
+    else:
+        _stats["requests_inline"] += 1
+
+    prompt_tokens = _tokens(body.get("contents"))
+    _stats["requests"] += 1
+    _stats["prompt_tokens"] += prompt_tokens
+    _stats["cached_tokens"] += cached_tokens
+
+    # זמן תגובה שתלוי רק בטוקנים שלא הגיעו מהמטמון
+    delay = settings["latency_ms"] + settings["latency_ms_per_1k"] * prompt_tokens / 1000
+    if delay:
+        await asyncio.sleep(delay / 1000)
+
+    analysis = {
+        "company": "Fake Company",
+        "job_title": "Fake Role",
+        "suitability_score": 70,
+        "acceptance_probability": 50,
+        "job_summary_hebrew": "תשובה קבועה משרת הבדיקה",
+        "showstoppers": [],
+        "gap_analysis": [],
+        "recommendation": "להגיש",
+        "formatted_message": "",
+    }
+    # פרומפט של כמה משרות (analyze_batch_async) - מערך עם job_index לכל משרה
+    schema = body.get("generationConfig", {}).get("responseSchema") or {}
+    if schema.get("type") == "ARRAY":
+        text = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        indexes = [int(i) for i in re.findall(r"job_index=(\d+)", text)]
+        fields = schema.get("items", {}).get("properties") or analysis
+        result = [
+            {"job_index": index, **{k: v for k, v in analysis.items() if k in fields}}
+            for index in indexes
+        ]
+        _stats["batch_requests"] += 1
+        _stats["batch_jobs"] += len(indexes)
+    elif schema.get("properties"):
+        # סכמה חלקית (טריאז') - רק השדות שביקשו
+        result = {k: v for k, v in analysis.items() if k in schema["properties"]}
+    else:
+        result = analysis
+    text = json.dumps(result)
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}]}}],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens + cached_tokens,
+            "cachedContentTokenCount": cached_tokens,
+            "candidatesTokenCount": len(text) // 4,
+            "totalTokenCount": prompt_tokens + cached_tokens + len(text) // 4,
+        },
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return {**_stats, "live_caches": len(_cached_contents)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Gemini stand-in")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument(
+        "--min-cache-tokens",
+        type=int,
+        default=1024,
+        help="reject cachedContents smaller than this (Gemini's per-model minimum)",
+    )
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument(
+        "--latency-ms-per-1k",
+        type=float,
+        default=0,
+        help="extra delay per 1k uncached prompt tokens",
+    )
+    args = parser.parse_args()
+    settings.update(
+        min_cache_tokens=args.min_cache_tokens,
+        latency_ms=args.latency_ms,
+        latency_ms_per_1k=args.latency_ms_per_1k,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
@@ -5,8 +5,11 @@ from fastapi import APIRouter, HTTPException
 
 from db.jobs_repository import (
     ApplicationStatus,
+    JobPriority,
     add_new_job,
     delete_job_by_url,
+    find_existing_job,
+    force_analysis,
     get_all_jobs,
     get_job_by_url,
     update_application_status,
@@ -21,6 +24,9 @@ from models.job_models import (
     ManualUpdate,
     TextSubmission,
 )
+from scraper_service.canonical import canonical_url
+from scraper_service.resolvers import URLResolver
+from services.resolution_cache import get_resolution_cache
 
 logger = logging.getLogger("JobMatchServer")
 router = APIRouter(tags=["jobs"])
@@ -39,10 +45,18 @@ async def add_url_jobs(submission: JobSubmission):
     skipped = 0
     skipped_urls = []  # רשימת לינקים שדולגו
 
+    # לינקים קנוניים (בלי פרמטרי מעקב), בלי כפילויות בתוך אותה הגשה
+    urls = list(
+        dict.fromkeys(canonical_url(url) for url in submission.urls if url.strip())
+    )
+    # לינקים שכבר פוענחו בעבר (HireMeTech) נכנסים ישר עם לינק החברה - בלי דפדפן
+    to_resolve = [url for url in urls if URLResolver.needs_resolution(url)]
+    resolved_urls = await get_resolution_cache().get_many(to_resolve)
+
     # בדיקת כפילות ללינקים בודדים - דרישת משתמש
-    if len(submission.urls) == 1:
-        url = submission.urls[0].strip()
-        existing = await get_job_by_url(url)
+    if len(submission.urls) == 1 and urls:
+        url = resolved_urls.get(urls[0], urls[0])
+        existing = await find_existing_job(url)
         if existing:
             original_date = existing.get("analyzed_at") or existing.get("created_at")
             date_str = (
@@ -57,38 +71,43 @@ async def add_url_jobs(submission: JobSubmission):
                 },
             )
 
-    for url in submission.urls:
-        clean_url = url.strip()
-        if clean_url:
-            was_added = await add_new_job(clean_url, source="extension")
-            if was_added:
-                added += 1
-            else:
-                skipped += 1
-                # נבדוק מתי הלינק נסרק
-                existing = await get_job_by_url(clean_url)
-                if existing:
-                    original_date = existing.get("analyzed_at") or existing.get(
-                        "created_at"
-                    )
-                    date_str = (
-                        original_date.strftime("%d/%m/%Y")
-                        if original_date
-                        else "לא ידוע"
-                    )
-                    skipped_urls.append(
-                        {
-                            "url": clean_url,
-                            "date": date_str,
-                            "company": existing.get("company", "Unknown"),
-                        }
-                    )
+    # לינק בודד = המשתמש מחכה לו; רשימה = ייבוא בכמויות בעדיפות נמוכה
+    priority = JobPriority.NORMAL if len(submission.urls) == 1 else JobPriority.LOW
+
+    for url in urls:
+        clean_url = resolved_urls.get(url, url)
+        was_added = await add_new_job(clean_url, source="extension", priority=priority)
+        if was_added:
+            added += 1
+        else:
+            skipped += 1
+            # נבדוק מתי הלינק נסרק
+            existing = await find_existing_job(clean_url)
+            if existing:
+                original_date = existing.get("analyzed_at") or existing.get("created_at")
+                date_str = (
+                    original_date.strftime("%d/%m/%Y") if original_date else "לא ידוע"
+                )
+                skipped_urls.append(
+                    {
+                        "url": clean_url,
+                        "date": date_str,
+                        "company": existing.get("company", "Unknown"),
+                    }
+                )
 
     return {
         "message": f"Processed {added + skipped} jobs",
         "added": added,
         "skipped": skipped,
         "skipped_urls": skipped_urls,  # מידע על לינקים שדולגו
+        "resolution_cache": {
+            "lookups": len(to_resolve),
+            "hits": len(resolved_urls),
+            "hit_rate": (
+                round(len(resolved_urls) / len(to_resolve), 3) if to_resolve else None
+            ),
+        },
     }
 
 
@@ -103,6 +122,7 @@ async def add_text_job(submission: TextSubmission):
         source="manual",
         manual_text=submission.text,
         manual_meta=manual_meta,
+        priority=JobPriority.HIGH,
     )
     return {"message": "Manual job added to AI queue"}
 
@@ -153,6 +173,18 @@ async def retry_endpoint(url: str):
     return {"message": "Job queued for retry"}
 
 
+@router.post("/jobs/force-analysis")
+async def force_analysis_endpoint(url: str):
+    """ניתוח AI מלא למשרה שסוננה ב-Pre-screen או שנעצרה בטריאז' (נקרא גם בפתיחת המשרה)"""
+    if await force_analysis(url):
+        return {"message": "Job queued for full analysis"}
+    # כבר בתור / בניתוח (למשל פתיחה חוזרת של המשרה) - אין מה לעשות
+    job = await get_job_by_url(url)
+    if job and job["status"] in ("WAITING_FOR_AI", "ANALYZING"):
+        return {"message": "Job is already queued for analysis"}
+    raise HTTPException(status_code=404, detail="Job not found or has no description")
+
+
 @router.post("/jobs/application-status")
 async def update_job_status(req: ApplicationStatusUpdateRequest):
     """עדכון סטטוס אפליקציה (pending, applied, וכו')"""
@@ -0,0 +1,43 @@
+# src/routes/stats_routes.py
+import logging
+
+from fastapi import APIRouter
+
+from services.metrics import get_stats
+
+logger = logging.getLogger("JobMatchServer")
+router = APIRouter(tags=["stats"])
+
+
+def _cascade_summary(counters: dict) -> dict:
+    """
+    What the triage -> full analysis cascade saved: full analyses avoided,
+    and the estimated net token saving (avoided full-analysis tokens, at the
+    observed average per full analysis, minus everything spent on triage).
+    """
+    triaged = counters.get("analysis.cascade.triaged", 0)
+    stopped = counters.get("analysis.cascade.stopped", 0)
+    full_jobs = counters.get("analysis.full", 0)
+    full_tokens = counters.get("gemini.tokens.full", 0)
+    triage_tokens = counters.get("gemini.tokens.triage", 0)
+    avg_full_tokens = full_tokens / full_jobs if full_jobs else None
+    return {
+        "triaged": triaged,
+        "stopped_at_triage": stopped,
+        "escalated": counters.get("analysis.cascade.escalated", 0),
+        "full_analyses": full_jobs,
+        "full_analyses_avoided_pct": round(100 * stopped / triaged, 1) if triaged else None,
+        "avg_tokens_per_full_analysis": round(avg_full_tokens) if avg_full_tokens else None,
+        "triage_tokens": triage_tokens,
+        "est_tokens_saved": (
+            round(stopped * avg_full_tokens - triage_tokens) if avg_full_tokens else None
+        ),
+    }
+
+
+@router.get("/stats")
+async def pipeline_stats():
+    """מוני ה-Pipeline (Hedging, מטמונים, זמני תגובה, Cascade) מכל התהליכים"""
+    stats = await get_stats()
+    stats["cascade"] = _cascade_summary(stats["counters"])
+    return stats
@@ -1,19 +1,30 @@
+import asyncio
 import logging
 import os
 import time
-from typing import Optional
+from typing import Optional, Tuple
 
-import requests
+import httpx
 from dotenv import load_dotenv
 
 from scraper_service.resolvers import URLResolver
+from services.upstream_errors import (
+    UPSTREAM_FAILURE_STATUSES,
+    UpstreamError,
+    parse_retry_after,
+)
 
 # Import utility functions from the new modular structure
 from scraper_service.utils import clean_text, is_content_valid
+from services.http_client import get_http_client, new_http_client
+
+from scraper_service.browser_pool import BrowserPool, get_browser_pool
+from scraper_service.extractors import extract_job
+from services import metrics
 
 try:
     from markdownify import markdownify as md
-    from playwright.sync_api import sync_playwright
+    from playwright.async_api import Error as PlaywrightError
 
     HAS_PLAYWRIGHT = True
 except ImportError:
@@ -27,6 +38,24 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Extractors ייעודיים (LinkedIn, Greenhouse, Lever, Comeet, JSON-LD) לפני Jina
+SCRAPE_EXTRACTORS_ENABLED = (
+    os.getenv("SCRAPE_EXTRACTORS_ENABLED", "true").lower() == "true"
+)
+
+# Hedging: אם Jina לא ענה תוך ה-Delay, הדפדפן המקומי מתחיל במקביל והמהיר מנצח.
+# "auto" = p90 של זמני התגובה האחרונים של Jina (עד שיש מספיק מדידות: ברירת המחדל)
+SCRAPE_HEDGE_ENABLED = os.getenv("SCRAPE_HEDGE_ENABLED", "true").lower() == "true"
+SCRAPE_HEDGE_DELAY = os.getenv("SCRAPE_HEDGE_DELAY_SECONDS", "auto")
+SCRAPE_HEDGE_DEFAULT_DELAY_SECONDS = 8.0
+
+
+def _hedge_delay() -> float:
+    if SCRAPE_HEDGE_DELAY != "auto":
+        return float(SCRAPE_HEDGE_DELAY)
+    p90 = metrics.recent_percentile("scrape.jina.latency", 0.9)
+    return p90 if p90 is not None else SCRAPE_HEDGE_DEFAULT_DELAY_SECONDS
+
 
 class Scraper:
     """
@@ -34,8 +63,7 @@ class Scraper:
     Now uses modular components from scraper_service package.
     """
 
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, resolution_cache=None, scrape_cache=None):
         self.api_key = os.getenv("JINA_API_KEY")
         self.hireme_token = os.getenv("HIRE_ME_TECH_TOKEN")
 
@@ -50,83 +78,303 @@ class Scraper:
         }
 
         # Initialize the URL resolver with tokens
-        self.resolver = URLResolver(hireme_token=self.hireme_token)
+        self.resolver = URLResolver(
+            hireme_token=self.hireme_token, cache=resolution_cache
+        )
+        # מטמון סריקות (services.scrape_cache.ScrapeCache) - אופציונלי, רק בוורקרים
+        self.scrape_cache = scrape_cache
 
-    def _scrape_with_playwright(self, url: str) -> Optional[str]:
-        """Backup local scraper if Jina fails"""
+    async def _scrape_with_playwright(
+        self, url: str, browser_pool: Optional[BrowserPool] = None
+    ) -> Tuple[Optional[str], Optional[Tuple[Optional[str], Optional[str]]]]:
+        """
+        Backup local scraper if Jina fails - uses a page from the shared browser pool.
+        Returns the page as markdown + the page's (ETag, Last-Modified).
+        """
         if not HAS_PLAYWRIGHT:
-            return None
+            return None, None
+        pool = browser_pool or get_browser_pool()
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                page = browser.new_page()
-                page.goto(url, timeout=60000, wait_until="networkidle")
-                content = md(page.content())
-                browser.close()
-                return content
-        except Exception:
-            return None
+            async with pool.page() as page:
+                response = await page.goto(
+                    url, timeout=30000, wait_until="domcontentloaded"
+                )
+                validators = None
+                if response is not None and response.ok:
+                    # Playwright מחזיר שמות Headers באותיות קטנות
+                    validators = (
+                        response.headers.get("etag"),
+                        response.headers.get("last-modified"),
+                    )
+                # SPA שממשיכות לטעון - מחכים קצת לשקט ברשת, אבל לא תלויים בזה
+                try:
+                    await page.wait_for_load_state("networkidle", timeout=5000)
+                except PlaywrightError:
+                    pass
+                html = await page.content()
+            return await asyncio.to_thread(md, html), validators
+        except Exception as e:
+            logger.warning(f"Local browser scrape failed: {e}")
+            return None, None
 
-    def scrape(self, url: str, retries: int = 2) -> Optional[dict]:
+    async def scrape_async(
+        self,
+        url: str,
+        retries: int = 2,
+        raise_upstream_errors: bool = False,
+        client: Optional[httpx.AsyncClient] = None,
+        browser_pool: Optional[BrowserPool] = None,
+        resolver: Optional[URLResolver] = None,
+        origin_client: Optional[httpx.AsyncClient] = None,
+        jina_limiter=None,
+    ) -> Optional[dict]:
         """
         The entry point. Detects if specific site handling is needed,
         resolves the real URL, and then scrapes the content.
+        Talks to Jina over a shared async connection pool, so one worker
+        process can keep many scrapes in flight without threads.
 
         Args:
             url: The URL to scrape
             retries: Number of retry attempts for Jina scraping
+            raise_upstream_errors: If Jina was throttled/unavailable and the
+                local fallback also failed, raise UpstreamError instead of
+                returning None (used by the workers' rate limiter)
+            client: httpx client to use (defaults to the shared "jina" client)
+            browser_pool: pool for the local fallback (defaults to the shared pool)
+            resolver: URL resolver to use (defaults to self.resolver)
+            origin_client: httpx client for the site extractors (defaults to
+                the shared "origin" client)
+            jina_limiter: rate limiter acquired right before each Jina request,
+                so cache hits and extractor matches don't spend Jina quota
 
         Returns:
             Dict with scraping results or None if failed:
             {
-                "source": "jina" or "local_browser",
+                "source": "extractor", "jina", "local_browser" or "cache",
                 "original_url": original input URL,
                 "resolved_url": final URL that was scraped,
-                "full_description": cleaned text content
+                "full_description": cleaned text content,
+                "job_title" / "company": only when a site extractor matched
             }
         """
 
         # --- STEP 1: RESOLVE (Special Handling) ---
         # Use the URLResolver to handle special sites like HireMeTech
-        target_url = self.resolver.resolve(url)
+        target_url = await (resolver or self.resolver).resolve_async(url)
 
         if target_url != url:
             logger.info(f"URL Resolved: {url} → {target_url}")
 
-        # --- STEP 2: SCRAPE WITH JINA ---
+        if self.scrape_cache is not None:
+            cached = await self.scrape_cache.get(target_url)
+            if cached:
+                logger.info(f"💾 Serving cached scrape: {target_url}")
+                return {**cached, "original_url": url}
+
+        result = None
+        if SCRAPE_EXTRACTORS_ENABLED:
+            result = await self._fetch_structured(url, target_url, origin_client)
+        if result is None:
+            result = await self._fetch(
+                url,
+                target_url,
+                retries,
+                raise_upstream_errors,
+                client,
+                browser_pool,
+                jina_limiter,
+            )
+        if result and self.scrape_cache is not None:
+            await self.scrape_cache.set(target_url, result)
+        return result
+
+    async def _fetch_structured(
+        self, url: str, target_url: str, client: Optional[httpx.AsyncClient]
+    ) -> Optional[dict]:
+        """Fast path: the job board's own endpoint, with title and company"""
+        started = time.monotonic()
+        job = await extract_job(target_url, client or get_http_client("origin"))
+        if not job:
+            return None
+        logger.info(f"⚡ Extracted via {job['extractor']}: {target_url}")
+        metrics.observe("scrape.extractor.latency", time.monotonic() - started)
+        metrics.incr(f"scrape.source.extractor.{job['extractor']}")
+        return {
+            "source": "extractor",
+            "original_url": url,
+            "resolved_url": target_url,
+            "full_description": clean_text(job["full_description"]),
+            "job_title": job.get("job_title") or "Unknown",
+            "company": job.get("company") or "Unknown",
+            "validators": job.get("validators"),
+        }
+
+    async def _fetch(
+        self,
+        url: str,
+        target_url: str,
+        retries: int,
+        raise_upstream_errors: bool,
+        client: Optional[httpx.AsyncClient],
+        browser_pool: Optional[BrowserPool],
+        jina_limiter=None,
+    ) -> Optional[dict]:
+        """
+        Jina first. In hedged mode, if Jina hasn't answered after the hedge
+        delay the local browser starts in parallel and the first valid result
+        wins (the loser is cancelled); otherwise the browser only runs after
+        Jina has failed.
+        """
+        hedge_delay = _hedge_delay() if SCRAPE_HEDGE_ENABLED else None
+        tasks = {
+            asyncio.create_task(
+                self._fetch_jina(url, target_url, retries, client, jina_limiter)
+            )
+        }
+        browser_started = hedged = False
+        jina_error = None
+        try:
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done:
+                    logger.info(
+                        f"⏱️ Jina slower than {hedge_delay:.1f}s, hedging with local browser"
+                    )
+                    metrics.incr("scrape.hedge.started")
+                    browser_started = hedged = True
+                    tasks.add(
+                        asyncio.create_task(
+                            self._fetch_browser(url, target_url, browser_pool)
+                        )
+                    )
+
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    result, error = task.result()
+                    jina_error = jina_error or error
+                    if result:
+                        if hedged:
+                            metrics.incr(f"scrape.hedge.won.{result['source']}")
+                        metrics.incr(f"scrape.source.{result['source']}")
+                        return result
+                # Jina נכשל לפני שה-Hedge התחיל - עכשיו תורו של הדפדפן המקומי
+                if not tasks and not browser_started:
+                    logger.warning("🚨 Jina failed, falling back to local Playwright...")
+                    browser_started = True
+                    tasks.add(
+                        asyncio.create_task(
+                            self._fetch_browser(url, target_url, browser_pool)
+                        )
+                    )
+        finally:
+            # המפסיד במרוץ מבוטל (הדף שלו נסגר וחוזר ל-Pool)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if hedged:
+            metrics.incr("scrape.hedge.both_failed")
+        if raise_upstream_errors and jina_error:
+            raise jina_error
+        return None
+
+    async def _fetch_jina(
+        self,
+        url: str,
+        target_url: str,
+        retries: int,
+        client: Optional[httpx.AsyncClient],
+        jina_limiter=None,
+    ) -> Tuple[Optional[dict], Optional[UpstreamError]]:
+        """Returns (result, upstream error) - Jina throttling is reported, not raised."""
         jina_url = f"https://r.jina.ai/{target_url}"
         logger.info(f"📡 Scraping via Jina: {target_url}")
+        client = client or get_http_client("jina")
 
+        jina_error = None
         for attempt in range(retries):
             try:
                 headers = self.headers.copy()
                 if attempt > 0:
                     headers["X-No-Cache"] = "true"
 
-                res = self.session.get(jina_url, headers=headers, timeout=40)
+                if jina_limiter is not None:
+                    await jina_limiter.acquire()
+                started = time.monotonic()
+                try:
+                    res = await client.get(jina_url, headers=headers)
+                except asyncio.CancelledError:
+                    # הפסיד ב-Hedge: זמן התגובה האמיתי ארוך לפחות מזה. בלי הדגימה (חסם
+                    # תחתון) רק התשובות המהירות נמדדות וה-p90 מתכווץ עם הזמן
+                    metrics.observe("scrape.jina.latency", time.monotonic() - started)
+                    raise
                 if res.status_code == 200 and is_content_valid(res.text):
+                    metrics.observe("scrape.jina.latency", time.monotonic() - started)
                     return {
                         "source": "jina",
                         "original_url": url,
                         "resolved_url": target_url,
                         "full_description": clean_text(res.text),
-                    }
+                    }, None
+                if res.status_code in UPSTREAM_FAILURE_STATUSES:
+                    jina_error = UpstreamError(
+                        "jina",
+                        res.status_code,
+                        parse_retry_after(res.headers.get("Retry-After")),
+                    )
             except Exception as e:
+                if isinstance(e, httpx.TransportError):
+                    jina_error = UpstreamError("jina", message=str(e))
                 logger.warning(f"Jina attempt {attempt + 1} failed: {e}")
-            time.sleep(1)
+            if attempt < retries - 1:
+                await asyncio.sleep(1)
+        return None, jina_error
 
-        # --- STEP 3: BACKUP SCRAPER (Local Playwright) ---
-        logger.warning("🚨 Jina failed, falling back to local Playwright...")
-        local_content = self._scrape_with_playwright(target_url)
+    async def _fetch_browser(
+        self, url: str, target_url: str, browser_pool: Optional[BrowserPool]
+    ) -> Tuple[Optional[dict], None]:
+        started = time.monotonic()
+        local_content, validators = await self._scrape_with_playwright(
+            target_url, browser_pool
+        )
         if local_content and is_content_valid(local_content):
+            metrics.observe("scrape.browser.latency", time.monotonic() - started)
             return {
                 "source": "local_browser",
                 "original_url": url,
                 "resolved_url": target_url,
                 "full_description": clean_text(local_content),
-            }
+                "validators": validators,
+            }, None
+        return None, None
 
-        return None
+    def scrape(self, url: str, retries: int = 2) -> Optional[dict]:
+        """עטיפה סינכרונית ל-scrape_async (עבור main.py והרצה ישירה)"""
+
+        async def _run():
+            # Client, Browser pool ו-Resolver זמניים - המשותפים קשורים ל-Event loop שבו נוצרו
+            browser_pool = BrowserPool(max_pages=1)
+            resolver = URLResolver(self.hireme_token, browser_pool=browser_pool)
+            try:
+                async with new_http_client("jina") as client, new_http_client(
+                    "origin"
+                ) as origin_client:
+                    return await self.scrape_async(
+                        url,
+                        retries,
+                        client=client,
+                        browser_pool=browser_pool,
+                        resolver=resolver,
+                        origin_client=origin_client,
+                    )
+            finally:
+                await browser_pool.close()
+
+        return asyncio.run(_run())
 
 
 if __name__ == "__main__":
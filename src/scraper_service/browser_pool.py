@@ -0,0 +1,144 @@
+# src/scraper_service/browser_pool.py
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+try:
+    from playwright.async_api import async_playwright
+
+    HAS_PLAYWRIGHT = True
+except ImportError:
+    HAS_PLAYWRIGHT = False
+
+logger = logging.getLogger(__name__)
+
+# כמה דפים במקביל, ואחרי כמה שימושים Context ממוחזר (דליפות זיכרון / מצב מצטבר)
+BROWSER_POOL_PAGES = int(os.getenv("BROWSER_POOL_PAGES", 3))
+BROWSER_POOL_MAX_USES = int(os.getenv("BROWSER_POOL_MAX_USES", 50))
+
+# משאבים שלא צריך בשביל טקסט המשרה
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+)
+
+
+class _PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.uses = 0
+
+
+class BrowserPool:
+    """
+    Long-lived headless Chromium shared by all fallback scrapes.
+    Hands out pages from a bounded set of reusable contexts; a context is
+    recycled after `max_uses` pages or as soon as one of its pages fails,
+    and the browser itself is relaunched if it disconnects (crash).
+    """
+
+    def __init__(
+        self, max_pages: int = BROWSER_POOL_PAGES, max_uses: int = BROWSER_POOL_MAX_USES
+    ):
+        self.max_pages = max_pages
+        self.max_uses = max_uses
+        self._slots = asyncio.Semaphore(max_pages)
+        self._launch_lock = asyncio.Lock()
+        self._idle: List[_PooledContext] = []
+        self._playwright = None
+        self._browser = None
+
+    async def get_browser(self):
+        """מחזיר את הדפדפן המשותף (מפעיל אותו מחדש אם קרס / עוד לא עלה)"""
+        async with self._launch_lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                logger.info("🌐 Launching pooled Chromium")
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                # Contexts של דפדפן שקרס כבר לא שמישים
+                self._idle.clear()
+            return self._browser
+
+    async def _new_context(self) -> _PooledContext:
+        browser = await self.get_browser()
+        context = await browser.new_context(
+            viewport={"width": 1280, "height": 800}, user_agent=USER_AGENT
+        )
+        await context.route("**/*", block_heavy_resources)
+        return _PooledContext(context)
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        Usage:
+            async with pool.page() as page:
+                await page.goto(url)
+        """
+        async with self._slots:
+            pooled = self._idle.pop() if self._idle else await self._new_context()
+            page = await pooled.context.new_page()
+            healthy = False
+            try:
+                yield page
+                healthy = True
+            finally:
+                pooled.uses += 1
+                try:
+                    await page.close()
+                except Exception:
+                    healthy = False
+                if healthy and pooled.uses < self.max_uses and self._browser_alive():
+                    self._idle.append(pooled)
+                else:
+                    await _close_quietly(pooled.context)
+
+    def _browser_alive(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def close(self):
+        for pooled in self._idle:
+            await _close_quietly(pooled.context)
+        self._idle.clear()
+        if self._browser is not None:
+            await _close_quietly(self._browser)
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+async def block_heavy_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def _close_quietly(closable):
+    try:
+        await closable.close()
+    except Exception:
+        pass
+
+
+_shared_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """Pool אחד לכל תהליך. הדפדפן עצמו עולה רק בשימוש הראשון."""
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = BrowserPool()
+    return _shared_pool
+
+
+async def close_browser_pool():
+    global _shared_pool
+    if _shared_pool is not None:
+        pool, _shared_pool = _shared_pool, None
+        await pool.close()
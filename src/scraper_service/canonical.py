@@ -0,0 +1,177 @@
+# src/scraper_service/canonical.py
+"""
+URL canonicalization: maps the many spellings of one posting (tracking
+parameters, search-page URLs, slugs, www/no-www) to one stable job key.
+
+    canonical_url("https://www.linkedin.com/jobs/search/?currentJobId=123&trk=x")
+    -> "https://www.linkedin.com/jobs/view/123/"
+    canonical_key(...) -> "linkedin:123"
+
+Sites with a known job id get a `<site>:<id>` key; every other URL is keyed by
+its normalized form (lowercase host, no www / fragment / tracking params,
+sorted query).
+"""
+import re
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+# פרמטרים שלא משנים את המשרה עצמה
+TRACKING_PARAMS = {
+    "trk",
+    "trkinfo",
+    "refid",
+    "trackingid",
+    "ref",
+    "src",
+    "source",
+    "gclid",
+    "fbclid",
+    "msclkid",
+    "lipi",
+    "originalsubdomain",
+}
+TRACKING_PREFIXES = ("utm_", "mc_", "_hs")
+
+_LINKEDIN_JOB_ID_PATTERNS = (
+    re.compile(r"/jobs/view/(?:[^/?]*-)?(\d+)"),
+    re.compile(r"[?&]currentJobId=(\d+)"),
+)
+_GREENHOUSE_PATH = re.compile(r"^/([\w-]+)/jobs/(\d+)")
+_LEVER_PATH = re.compile(r"^/([\w.-]+)/([0-9a-f-]{36})")
+_COMEET_PATH = re.compile(r"^/jobs/([\w.-]+)/([\w.]+)/[^/]*/([\w.]+)")
+_HIREME_PATH = re.compile(r"/job/(\d+)")
+
+
+def _host(parsed) -> str:
+    return parsed.netloc.lower().removeprefix("www.")
+
+
+def linkedin_job_id(url: str) -> Optional[str]:
+    for pattern in _LINKEDIN_JOB_ID_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def greenhouse_ids(url: str) -> Optional[Tuple[str, str]]:
+    """(board, job id) מלינק boards / job-boards / embed של Greenhouse"""
+    parsed = urlparse(url)
+    match = _GREENHOUSE_PATH.match(parsed.path)
+    if match:
+        return match.group(1), match.group(2)
+    query = dict(parse_qsl(parsed.query))
+    if "for" in query and "token" in query:
+        return query["for"], query["token"]
+    return None
+
+
+# --- כללים לפי דומיין: (url מפורסר) -> (key, canonical url) או None ---
+
+
+def _linkedin(parsed) -> Optional[Tuple[str, str]]:
+    job_id = linkedin_job_id(urlunparse(parsed))
+    if not job_id:
+        return None
+    return f"linkedin:{job_id}", f"https://www.linkedin.com/jobs/view/{job_id}/"
+
+
+def _greenhouse(parsed) -> Optional[Tuple[str, str]]:
+    ids = greenhouse_ids(urlunparse(parsed))
+    if not ids:
+        return None
+    board, job_id = ids
+    return (
+        f"greenhouse:{board.lower()}:{job_id}",
+        f"https://boards.greenhouse.io/{board}/jobs/{job_id}",
+    )
+
+
+def _lever(parsed) -> Optional[Tuple[str, str]]:
+    match = _LEVER_PATH.match(parsed.path)
+    if not match:
+        return None
+    company, posting_id = match.groups()
+    return (
+        f"lever:{company.lower()}:{posting_id.lower()}",
+        f"https://{_host(parsed)}/{company}/{posting_id}",
+    )
+
+
+def _comeet(parsed) -> Optional[Tuple[str, str]]:
+    # ה-Slug (שם המשרה) משתנה - המזהים של החברה והמשרה לא
+    match = _COMEET_PATH.match(parsed.path)
+    if not match:
+        return None
+    company, company_uid, position_uid = match.groups()
+    return (
+        f"comeet:{company_uid.upper()}:{position_uid.upper()}",
+        urlunparse(parsed._replace(query="", fragment="")),
+    )
+
+
+def _hiremetech(parsed) -> Optional[Tuple[str, str]]:
+    match = _HIREME_PATH.search(parsed.path)
+    if not match:
+        return None
+    job_id = match.group(1)
+    return f"hiremetech:{job_id}", f"https://hiremetech.com/job/{job_id}"
+
+
+DOMAIN_RULES: List[Tuple[str, Callable]] = [
+    ("linkedin.com", _linkedin),
+    ("greenhouse.io", _greenhouse),
+    ("lever.co", _lever),
+    ("comeet.com", _comeet),
+    ("comeet.co", _comeet),
+    ("hiremetech.com", _hiremetech),
+]
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def _normalize(parsed):
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    )
+    path = parsed.path.rstrip("/") or "/"
+    return parsed._replace(
+        scheme=parsed.scheme.lower() or "https",
+        netloc=parsed.netloc.lower(),
+        path=path,
+        query=urlencode(query),
+        fragment="",
+    )
+
+
+def _canonicalize(url: str) -> Tuple[str, str]:
+    url = url.strip()
+    parsed = urlparse(url)
+    # לא לינק (למשל משרות ידניות "manual-...") - נשאר כמו שהוא
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        return url, url
+    host = _host(parsed)
+    for domain, rule in DOMAIN_RULES:
+        if host == domain or host.endswith("." + domain):
+            result = rule(parsed)
+            if result:
+                return result
+            break
+    normalized = _normalize(parsed)
+    key = _host(normalized) + urlunparse(normalized._replace(scheme="", netloc=""))
+    return key, urlunparse(normalized)
+
+
+def canonical_key(url: str) -> str:
+    """Stable identity of the posting behind a URL (used for dedup)."""
+    return _canonicalize(url)[0]
+
+
+def canonical_url(url: str) -> str:
+    """The clean URL to store and scrape for a posting."""
+    return _canonicalize(url)[1]
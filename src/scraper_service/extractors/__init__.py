@@ -0,0 +1,92 @@
+# src/scraper_service/extractors/__init__.py
+"""
+Site-specific fast paths: structured title / company / description straight
+from a job board's lightweight public endpoint, tried before Jina.
+
+Each site module registers a fetch coroutine for its domains:
+
+    @register("jobs.lever.co")
+    async def fetch(url: str, client: httpx.AsyncClient) -> Optional[dict]:
+        ...
+
+and keeps the parsing in a pure `parse(...)` function, so it can be run
+against a saved fixture page. A fetch returns
+{"job_title", "company", "full_description"} or None (-> generic scrape).
+Extractors that GET the job page itself also return its "validators"
+(ETag, Last-Modified), so the scrape cache needs no extra HEAD.
+"""
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from scraper_service.utils import is_content_valid
+
+logger = logging.getLogger(__name__)
+
+# JSON-LD JobPosting גם לאתרים בלי Extractor ייעודי (בקשת GET אחת לדף עצמו)
+EXTRACTOR_JSONLD_ANY_SITE = (
+    os.getenv("EXTRACTOR_JSONLD_ANY_SITE", "true").lower() == "true"
+)
+
+Extractor = Callable[[str, httpx.AsyncClient], Awaitable[Optional[dict]]]
+
+_REGISTRY: Dict[str, Extractor] = {}
+
+
+def register(*domains: str):
+    """Decorator: registers an extractor for the given domains (and their subdomains)."""
+
+    def decorator(func: Extractor) -> Extractor:
+        for domain in domains:
+            _REGISTRY[domain] = func
+        return func
+
+    return decorator
+
+
+def get_extractor(url: str) -> Optional[Extractor]:
+    host = urlparse(url).netloc.lower().removeprefix("www.")
+    for domain, extractor in _REGISTRY.items():
+        if host == domain or host.endswith("." + domain):
+            return extractor
+    return None
+
+
+def page_validators(res: httpx.Response) -> Tuple[Optional[str], Optional[str]]:
+    """ETag / Last-Modified של דף המשרה, מהתשובה שכבר הורדה"""
+    return res.headers.get("ETag"), res.headers.get("Last-Modified")
+
+
+async def extract_job(url: str, client: httpx.AsyncClient) -> Optional[dict]:
+    """
+    Runs the extractor registered for the URL's domain (or the generic
+    JSON-LD one). Returns None on any failure or thin content, so the caller
+    falls back to the generic scrape.
+    """
+    extractor = get_extractor(url)
+    if extractor is None and EXTRACTOR_JSONLD_ANY_SITE:
+        extractor = jsonld.fetch
+    if extractor is None:
+        return None
+    try:
+        job = await extractor(url, client)
+    except Exception as e:
+        logger.warning(f"Extractor failed for {url}: {e}")
+        return None
+    if not job or not is_content_valid(job.get("full_description")):
+        return None
+    job["extractor"] = extractor.__module__.rsplit(".", 1)[-1]
+    return job
+
+
+# ייבוא המודולים רושם אותם ב-Registry
+from scraper_service.extractors import (  # noqa: E402,F401
+    comeet,
+    greenhouse,
+    jsonld,
+    lever,
+    linkedin,
+)
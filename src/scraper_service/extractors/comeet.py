@@ -0,0 +1,58 @@
+# src/scraper_service/extractors/comeet.py
+import json
+import re
+from typing import Any, Optional
+
+import httpx
+
+from scraper_service.extractors import page_validators, register
+from scraper_service.utils import html_to_text
+
+_DECODER = json.JSONDecoder()
+
+
+def _embedded_object(html: str, name: str) -> Optional[Any]:
+    """דפי Comeet מטמיעים את המשרה כ-JS: `POSITION_DATA = {...};`"""
+    match = re.search(rf"\b{name}\s*=\s*", html)
+    if not match:
+        return None
+    try:
+        value, _ = _DECODER.raw_decode(html, match.end())
+    except ValueError:
+        return None
+    return value
+
+
+def parse(html: str) -> Optional[dict]:
+    """Extracts POSITION_DATA / COMPANY_DATA from a Comeet position page."""
+    position = _embedded_object(html, "POSITION_DATA")
+    if not isinstance(position, dict):
+        return None
+    company = _embedded_object(html, "COMPANY_DATA")
+    company_name = position.get("company_name") or (
+        company.get("name") if isinstance(company, dict) else None
+    )
+
+    parts = []
+    location = (position.get("location") or {}).get("name")
+    if location:
+        parts.append(f"Location: {location}")
+    for detail in position.get("details") or []:
+        value = html_to_text(detail.get("value", ""))
+        parts.append(f"{detail.get('name', '')}\n{value}")
+    return {
+        "job_title": position.get("name"),
+        "company": company_name,
+        "full_description": "\n\n".join(part.strip() for part in parts if part),
+    }
+
+
+@register("comeet.com", "comeet.co")
+async def fetch(url: str, client: httpx.AsyncClient) -> Optional[dict]:
+    res = await client.get(url, follow_redirects=True)
+    if res.status_code != 200:
+        return None
+    job = parse(res.text)
+    if job:
+        job["validators"] = page_validators(res)
+    return job
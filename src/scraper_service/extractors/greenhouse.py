@@ -0,0 +1,35 @@
+# src/scraper_service/extractors/greenhouse.py
+from typing import Optional
+
+import httpx
+
+from scraper_service.canonical import greenhouse_ids
+from scraper_service.extractors import register
+from scraper_service.utils import html_to_text
+
+API_URL = "https://boards-api.greenhouse.io/v1/boards/{board}/jobs/{job_id}"
+
+
+def parse(payload: dict, board: str) -> dict:
+    """Maps a boards-api job payload to our scrape fields."""
+    description = html_to_text(payload.get("content", ""))
+    location = (payload.get("location") or {}).get("name")
+    if location:
+        description = f"Location: {location}\n\n{description}"
+    return {
+        "job_title": payload.get("title"),
+        "company": payload.get("company_name") or board.replace("-", " ").title(),
+        "full_description": description,
+    }
+
+
+@register("boards.greenhouse.io", "job-boards.greenhouse.io")
+async def fetch(url: str, client: httpx.AsyncClient) -> Optional[dict]:
+    ids = greenhouse_ids(url)
+    if not ids:
+        return None
+    board, job_id = ids
+    res = await client.get(API_URL.format(board=board, job_id=job_id))
+    if res.status_code != 200:
+        return None
+    return parse(res.json(), board)
@@ -0,0 +1,62 @@
+# src/scraper_service/extractors/jsonld.py
+import json
+from typing import Any, Optional
+
+import httpx
+from bs4 import BeautifulSoup
+
+from scraper_service.extractors import page_validators
+from scraper_service.utils import html_to_text
+
+
+def _find_job_posting(data: Any) -> Optional[dict]:
+    """מחפש אובייקט JobPosting (גם בתוך @graph / רשימות)"""
+    if isinstance(data, list):
+        for item in data:
+            posting = _find_job_posting(item)
+            if posting:
+                return posting
+    elif isinstance(data, dict):
+        types = data.get("@type")
+        types = types if isinstance(types, list) else [types]
+        if "JobPosting" in types:
+            return data
+        if "@graph" in data:
+            return _find_job_posting(data["@graph"])
+    return None
+
+
+def _organization_name(organization: Any) -> Optional[str]:
+    if isinstance(organization, dict):
+        return organization.get("name")
+    if isinstance(organization, str):
+        return organization
+    return None
+
+
+def parse(html: str) -> Optional[dict]:
+    """Extracts the schema.org JobPosting embedded in a page, if any."""
+    soup = BeautifulSoup(html, "html.parser")
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string or "")
+        except ValueError:
+            continue
+        posting = _find_job_posting(data)
+        if posting:
+            return {
+                "job_title": posting.get("title"),
+                "company": _organization_name(posting.get("hiringOrganization")),
+                "full_description": html_to_text(posting.get("description", "")),
+            }
+    return None
+
+
+async def fetch(url: str, client: httpx.AsyncClient) -> Optional[dict]:
+    res = await client.get(url, follow_redirects=True)
+    if res.status_code != 200:
+        return None
+    job = parse(res.text)
+    if job:
+        job["validators"] = page_validators(res)
+    return job
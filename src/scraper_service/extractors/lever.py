@@ -0,0 +1,50 @@
+# src/scraper_service/extractors/lever.py
+import re
+from typing import Optional
+
+import httpx
+
+from scraper_service.extractors import register
+from scraper_service.utils import html_to_text
+
+# jobs.lever.co/<company>/<posting id>  (ו-jobs.eu.lever.co לחשבונות באירופה)
+_URL_PATTERN = re.compile(r"jobs\.(eu\.)?lever\.co/([\w.-]+)/([0-9a-f-]{36})")
+
+
+def parse(payload: dict, company_slug: str) -> dict:
+    """Maps a Lever postings-API payload to our scrape fields."""
+    parts = []
+    categories = payload.get("categories") or {}
+    meta = " | ".join(
+        value
+        for value in (categories.get("location"), categories.get("commitment"))
+        if value
+    )
+    if meta:
+        parts.append(meta)
+    parts.append(
+        payload.get("descriptionPlain") or html_to_text(payload.get("description", ""))
+    )
+    for section in payload.get("lists") or []:
+        content = html_to_text(section.get("content", ""))
+        parts.append(f"{section.get('text', '')}\n{content}")
+    if payload.get("additionalPlain"):
+        parts.append(payload["additionalPlain"])
+    return {
+        "job_title": payload.get("text"),
+        "company": company_slug.replace("-", " ").title(),
+        "full_description": "\n\n".join(part.strip() for part in parts if part),
+    }
+
+
+@register("jobs.lever.co", "jobs.eu.lever.co")
+async def fetch(url: str, client: httpx.AsyncClient) -> Optional[dict]:
+    match = _URL_PATTERN.search(url)
+    if not match:
+        return None
+    region, company, posting_id = match.groups()
+    api_host = "api.eu.lever.co" if region else "api.lever.co"
+    res = await client.get(f"https://{api_host}/v0/postings/{company}/{posting_id}")
+    if res.status_code != 200:
+        return None
+    return parse(res.json(), company)
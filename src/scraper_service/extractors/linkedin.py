@@ -0,0 +1,46 @@
+# src/scraper_service/extractors/linkedin.py
+from typing import Optional
+
+import httpx
+from bs4 import BeautifulSoup
+
+from scraper_service.canonical import linkedin_job_id
+from scraper_service.extractors import register
+from scraper_service.utils import html_to_text
+
+# ה-Endpoint הציבורי (guest) שמזין את דף המשרה למשתמשים לא מחוברים
+API_URL = "https://www.linkedin.com/jobs-guest/jobs/api/jobPosting/{job_id}"
+
+
+def _text(soup: BeautifulSoup, *selectors: str) -> Optional[str]:
+    for selector in selectors:
+        tag = soup.select_one(selector)
+        if tag and tag.get_text(strip=True):
+            return tag.get_text(" ", strip=True)
+    return None
+
+
+def parse(html: str) -> Optional[dict]:
+    """Parses the guest jobPosting HTML fragment."""
+    soup = BeautifulSoup(html, "html.parser")
+    description = soup.select_one(
+        ".show-more-less-html__markup, .description__text"
+    )
+    if description is None:
+        return None
+    return {
+        "job_title": _text(soup, ".top-card-layout__title", ".topcard__title", "h2"),
+        "company": _text(soup, ".topcard__org-name-link", ".topcard__flavor"),
+        "full_description": html_to_text(description.decode_contents()),
+    }
+
+
+@register("linkedin.com")
+async def fetch(url: str, client: httpx.AsyncClient) -> Optional[dict]:
+    job_id = linkedin_job_id(url)
+    if not job_id:
+        return None
+    res = await client.get(API_URL.format(job_id=job_id))
+    if res.status_code != 200:
+        return None
+    return parse(res.text)
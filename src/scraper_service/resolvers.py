@@ -1,18 +1,107 @@
 # src/scraper_service/resolvers.py
+import asyncio
+import json
 import logging
 import os
-from typing import Optional
+import re
+from typing import Any, Optional
+from urllib.parse import urlparse
 
 from dotenv import load_dotenv
-from playwright.sync_api import sync_playwright
+
+from scraper_service import utils
+from scraper_service.canonical import canonical_url
+from scraper_service.browser_pool import (
+    HAS_PLAYWRIGHT,
+    USER_AGENT,
+    BrowserPool,
+    block_heavy_resources,
+    get_browser_pool,
+)
+
+if HAS_PLAYWRIGHT:
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
 # טעינת משתני סביבה מהקובץ .env
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# כמה רזולוציות HireMeTech רצות במקביל (כל אחת בדף נפרד באותו Context מחובר)
+HIREME_MAX_CONCURRENT = int(os.getenv("HIREME_MAX_CONCURRENT", 2))
+
+APPLY_BUTTON_TEXT = re.compile("הגש מועמדות|Apply Now", re.IGNORECASE)
+
+# intercept = שולפים את לינק החברה מתשובות ה-API של הדף (בלי קליק), click = הדרך הישנה.
+# גם ב-intercept, אם לא נמצא לינק - נופלים לקליק.
+HIREME_RESOLVE_MODE = os.getenv("HIREME_RESOLVE_MODE", "intercept").lower()
+HIREME_INTERCEPT_TIMEOUT_SECONDS = float(
+    os.getenv("HIREME_INTERCEPT_TIMEOUT_SECONDS", 8)
+)
+
+# רק שדות שהם בוודאות לינק ההגשה (לא linkedin_url / company_url / source וכו')
+_APPLY_URL_KEYS = (
+    "apply_url",
+    "applyUrl",
+    "external_apply_url",
+    "externalApplyUrl",
+)
+# שדות מזהה של אובייקט משרה
+_JOB_ID_KEYS = ("id", "job_id", "jobId")
+_ASSET_EXTENSIONS = (".png", ".jpg", ".jpeg", ".svg", ".gif", ".webp", ".css", ".js")
+
+
+def _is_outbound_url(value: Any) -> bool:
+    if not isinstance(value, str) or not value.startswith(("http://", "https://")):
+        return False
+    parsed = urlparse(value)
+    return "hiremetech" not in parsed.netloc and not parsed.path.lower().endswith(
+        _ASSET_EXTENSIONS
+    )
+
+
+def find_outbound_url(data: Any, job_id: Optional[str]) -> Optional[str]:
+    """
+    Searches a HireMeTech API/page JSON payload for this job's apply URL.
+    Only exact apply-URL keys of the object whose id is job_id count, so
+    similar jobs, company profiles and social links are never picked up.
+    None when the URL can't be attributed to the job (the caller falls back
+    to clicking the apply button).
+    """
+    if not job_id:
+        return None
+    found = set()
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, list):
+            stack.extend(value)
+        elif isinstance(value, dict):
+            if any(str(value.get(key)) == job_id for key in _JOB_ID_KEYS):
+                found.update(
+                    value[key]
+                    for key in _APPLY_URL_KEYS
+                    if _is_outbound_url(value.get(key))
+                )
+            stack.extend(value.values())
+    # כמה לינקים שונים לאותה משרה - לא ברור איזה נכון
+    return found.pop() if len(found) == 1 else None
+
 
-HAS_PLAYWRIGHT = True
+def _capture_navigation(request, found):
+    # רק ניווט של הדף עצמו - iframe של פרסומות/אנליטיקס גם "מנווט" לדומיינים חיצוניים
+    if (
+        not found.done()
+        and request.is_navigation_request()
+        and request.frame.parent_frame is None
+        and _is_outbound_url(request.url)
+    ):
+        found.set_result(request.url)
+
+
+def _hireme_job_id(url: str) -> Optional[str]:
+    match = re.search(r"/job/(\d+)", url)
+    return match.group(1) if match else None
 
 
 class URLResolver:
@@ -21,27 +110,94 @@ class URLResolver:
     Currently supports HireMeTech.
     """
 
-    def __init__(self, hireme_token: Optional[str] = None):
+    def __init__(
+        self,
+        hireme_token: Optional[str] = None,
+        browser_pool: Optional[BrowserPool] = None,
+        cache=None,
+    ):
         """
         Initialize the resolver with authentication tokens.
         If no token is provided, it attempts to fetch from HIRE_ME_TECH_TOKEN env var.
+        `cache` (async get/set, e.g. services.resolution_cache.ResolutionCache)
+        is checked before opening a browser and filled on successful resolutions.
         """
         # אם לא התקבל טוקן, נסה למשוך מה-env
         self.hireme_token = hireme_token or os.getenv("HIRE_ME_TECH_TOKEN")
+        self._browser_pool = browser_pool
+        self.cache = cache
+        # Context מחובר אחד שנשמר בין רזולוציות (headless, מתחבר פעם אחת)
+        self._hireme_context = None
+        self._hireme_browser = None
+        self._context_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(HIREME_MAX_CONCURRENT)
 
-    def resolve(self, url: str) -> str:
+    needs_resolution = staticmethod(utils.needs_resolution)
+
+    async def resolve_async(self, url: str) -> str:
         """
         Resolves a URL to its final destination.
         """
-        if "hiremetech.com" in url:
-            return self._resolve_hiremetech(url)
+        if not self.needs_resolution(url):
+            return url
+
+        if self.cache is not None:
+            cached = await self.cache.get(url)
+            if cached:
+                logger.info(f"CACHE HIT: {url} -> {cached}")
+                return cached
+
+        resolved = await self._resolve_hiremetech(url)
+        # שומרים רק הצלחות - כישלון מחזיר את הלינק המקורי
+        if resolved != url:
+            resolved = canonical_url(resolved)
+        if self.cache is not None and resolved != url:
+            await self.cache.set(url, resolved)
+        return resolved
 
-        return url
+    def resolve(self, url: str) -> str:
+        """עטיפה סינכרונית ל-resolve_async (עבור main.py והרצה ישירה)"""
+        if not self.needs_resolution(url):
+            return url
+
+        async def _run():
+            # Resolver ו-Browser pool זמניים - ה-Context המחובר קשור ל-Event loop שבו נוצר
+            browser_pool = BrowserPool(max_pages=1)
+            try:
+                resolver = URLResolver(self.hireme_token, browser_pool=browser_pool)
+                return await resolver.resolve_async(url)
+            finally:
+                await browser_pool.close()
+
+        return asyncio.run(_run())
+
+    async def _get_hireme_context(self):
+        """
+        Returns the warm, authenticated HireMeTech context, creating it once.
+        The token is injected by an init script, so every page in the context
+        is logged in from its first load - no reload, no fixed sleeps.
+        """
+        async with self._context_lock:
+            pool = self._browser_pool or get_browser_pool()
+            browser = await pool.get_browser()
+            # הדפדפן הופעל מחדש (קריסה) - ה-Context הישן כבר לא קיים
+            if self._hireme_context is None or browser is not self._hireme_browser:
+                logger.info("🔐 Creating authenticated HireMeTech session")
+                context = await browser.new_context(
+                    viewport={"width": 1280, "height": 800}, user_agent=USER_AGENT
+                )
+                await context.add_init_script(
+                    f"window.localStorage.setItem('auth_token', {json.dumps(self.hireme_token)});"
+                )
+                await context.route("**/*", block_heavy_resources)
+                self._hireme_context = context
+                self._hireme_browser = browser
+            return self._hireme_context
 
-    def _resolve_hiremetech(self, url: str) -> str:
+    async def _resolve_hiremetech(self, url: str) -> str:
         """
         Resolves HireMeTech job URLs to actual company URLs.
-        Matches the logic of the successful standalone script.
+        Each resolution opens its own page in the shared authenticated context.
         """
         if not HAS_PLAYWRIGHT:
             logger.warning("Playwright is not installed!")
@@ -53,75 +209,123 @@ class URLResolver:
 
         logger.info(f"INIT: Starting VIP resolution for HireMeTech: {url}")
 
-        try:
-            with sync_playwright() as p:
-                # שינוי ל-headless=False כדי שתוכל לראות את התהליך במידת הצורך
-                browser = p.chromium.launch(headless=False)
-                context = browser.new_context(
-                    viewport={"width": 1280, "height": 800},
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-                )
-                page = context.new_page()
-
-                # 1. Access the job page
-                logger.info(f"Navigating to: {url}")
-                page.goto(url, wait_until="domcontentloaded")
+        async with self._slots:
+            try:
+                context = await self._get_hireme_context()
+                page = await context.new_page()
+            except Exception as e:
+                logger.error(f"FATAL in _resolve_hiremetech: {e}")
+                return url
 
-                # 2. Inject token into local storage
-                page.evaluate(
-                    f"window.localStorage.setItem('auth_token', '{self.hireme_token}');"
-                )
-
-                # 3. Reload and wait for session to apply
-                page.reload(wait_until="networkidle")
-                page.wait_for_timeout(4000)
+            try:
+                # 0. Intercept mode: listen to the page's own API responses
+                found = asyncio.get_running_loop().create_future()
+                job_id = _hireme_job_id(url)
+                if HIREME_RESOLVE_MODE == "intercept":
+                    page.on(
+                        "response",
+                        lambda response: self._inspect_response(response, job_id, found),
+                    )
+                    # הדף עצמו מנווט לאתר החברה - מספיק לראות את הבקשה היוצאת
+                    page.on("request", lambda request: _capture_navigation(request, found))
 
-                # 4. Smart Button Detection
-                apply_button = None
-                for text in ["הגש מועמדות", "Apply Now"]:
-                    btn = page.get_by_role("button", name=text, exact=False)
-                    if btn.is_visible():
-                        apply_button = btn
-                        logger.info(f"MATCH: Found button with text '{text}'")
-                        break
+                # 1. Access the job page (already authenticated via the init script)
+                logger.info(f"Navigating to: {url}")
+                await page.goto(url, wait_until="domcontentloaded")
 
-                if not apply_button:
-                    # Fallback to CSS
-                    apply_button = page.locator("button.bg-gradient-to-r").first
+                if HIREME_RESOLVE_MODE == "intercept":
+                    final_url = await self._wait_for_intercepted_url(page, found, job_id)
+                    if final_url:
+                        logger.info(f"SUCCESS: Intercepted company URL: {final_url}")
+                        return final_url
+                    logger.info("No company URL in API responses, falling back to click")
 
-                if not apply_button or not apply_button.is_visible():
+                # 2. Smart Button Detection - waits for the button itself, not a fixed delay
+                apply_button = (
+                    page.get_by_role("button", name=APPLY_BUTTON_TEXT)
+                    .or_(page.locator("button.bg-gradient-to-r"))
+                    .first
+                )
+                try:
+                    await apply_button.wait_for(state="visible", timeout=15000)
+                except PlaywrightTimeoutError:
                     logger.error(
                         "STEP FAILED: Could not find visible Apply button. Taking screenshot."
                     )
-                    page.screenshot(path="debug_missing_button.png")
-                    browser.close()
+                    await page.screenshot(path="debug_missing_button.png")
                     return url
 
-                # 5. Execute Click and Capture Final URL
-                final_url = url
-                try:
-                    logger.info("Clicking apply button...")
-                    with context.expect_page(timeout=10000) as new_page_info:
-                        apply_button.click(force=True, delay=300)
-
-                    new_page = new_page_info.value
-                    new_page.wait_for_load_state("networkidle")
-                    final_url = new_page.url
-                    logger.info(f"SUCCESS: Resolved to company URL: {final_url}")
-                except Exception:
-                    # Check for direct redirect
-                    page.wait_for_timeout(4000)
-                    if page.url != url:
-                        final_url = page.url
-                        logger.info(
-                            f"SUCCESS: Resolved via direct redirect: {final_url}"
-                        )
-                    else:
-                        logger.warning("No redirect detected after click.")
-
-                browser.close()
-                return final_url
-
-        except Exception as e:
-            logger.error(f"FATAL in _resolve_hiremetech: {e}")
-            return url
+                # 3. Execute Click and Capture Final URL
+                return await self._click_and_capture(context, page, apply_button, url)
+
+            except Exception as e:
+                logger.error(f"FATAL in _resolve_hiremetech: {e}")
+                return url
+            finally:
+                await page.close()
+
+    async def _inspect_response(self, response, job_id: Optional[str], found):
+        """בודק תשובת XHR/fetch של הדף ומחפש בה את לינק החברה"""
+        if found.done() or response.request.resource_type not in ("xhr", "fetch"):
+            return
+        # רק תשובות של המשרה הזו (ולא "משרות דומות" וכו')
+        if job_id and job_id not in response.url:
+            return
+        try:
+            data = await response.json()
+        except Exception:
+            return
+        final_url = find_outbound_url(data, job_id)
+        if final_url and not found.done():
+            found.set_result(final_url)
+
+    async def _wait_for_intercepted_url(
+        self, page, found, job_id: Optional[str]
+    ) -> Optional[str]:
+        # דף SSR (Next.js) - הנתונים כבר מוטמעים ב-HTML, אין צורך לחכות ל-API
+        try:
+            embedded = await page.evaluate(
+                "() => document.getElementById('__NEXT_DATA__')?.textContent || null"
+            )
+            if embedded:
+                final_url = find_outbound_url(json.loads(embedded), job_id)
+                if final_url:
+                    return final_url
+        except Exception:
+            pass
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(found), HIREME_INTERCEPT_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            return None
+
+    async def _click_and_capture(self, context, page, apply_button, url: str) -> str:
+        """לוחץ על כפתור ההגשה ומחכה לאירוע (טאב חדש או ניווט) במקום זמן קבוע"""
+        try:
+            logger.info("Clicking apply button...")
+            async with context.expect_page(timeout=10000) as new_page_info:
+                await apply_button.click(force=True)
+
+            new_page = await new_page_info.value
+            try:
+                # מספיק שהניווט התחיל - לא צריך לטעון את דף החברה
+                await new_page.wait_for_url(
+                    lambda u: u != "about:blank", wait_until="commit", timeout=15000
+                )
+                final_url = new_page.url
+            finally:
+                await new_page.close()
+            logger.info(f"SUCCESS: Resolved to company URL: {final_url}")
+            return final_url
+        except PlaywrightTimeoutError:
+            # Check for direct redirect
+            try:
+                await page.wait_for_url(
+                    lambda u: u != url, wait_until="commit", timeout=5000
+                )
+                logger.info(f"SUCCESS: Resolved via direct redirect: {page.url}")
+                return page.url
+            except PlaywrightTimeoutError:
+                logger.warning("No redirect detected after click.")
+                return url
@@ -1,6 +1,17 @@
 # src/scraper_service/utils.py
+import html
 import re
 
+from bs4 import BeautifulSoup
+
+# אתרים שצריך לפענח לפני סריקה (לינק ביניים -> לינק החברה)
+RESOLVABLE_DOMAINS = ("hiremetech.com",)
+
+
+def needs_resolution(url: str) -> bool:
+    """True if the URL belongs to a site that must be resolved before scraping."""
+    return any(domain in url for domain in RESOLVABLE_DOMAINS)
+
 
 def is_content_valid(text: str) -> bool:
     """
@@ -36,3 +47,27 @@ def clean_text(text: str) -> str:
     text = re.sub(r"!\[.*?\]\(.*?\)", "", text)
     text = re.sub(r"\n{3,}", "\n\n", text)
     return text.strip()
+
+
+def html_to_text(markup: str) -> str:
+    """
+    Converts an HTML job description (or an HTML-escaped one, as some board
+    APIs return) to plain text, one block per line.
+
+    Args:
+        markup: HTML fragment
+
+    Returns:
+        Plain text
+    """
+    if not markup:
+        return ""
+    if "&lt;" in markup:
+        markup = html.unescape(markup)
+    soup = BeautifulSoup(markup, "html.parser")
+    for br in soup.find_all("br"):
+        br.replace_with("\n")
+    text = soup.get_text("\n")
+    text = re.sub(r"[ \t\xa0]+\n", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
@@ -7,9 +7,11 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from db.postgres import close_pool
 from routes.jobs_routes import router as jobs_router
 from routes.profile_routes import router as profile_router
-from workers.worker_manager import start_background_workers
+from routes.stats_routes import router as stats_router
+from workers.worker_manager import start_background_workers, stop_background_workers
 
 # --- לוגינג ---
 logging.basicConfig(
@@ -19,16 +21,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger("Server")
 
+# false = ה-API עולה בלי וורקרים, והם רצים בתהליך נפרד (python -m workers)
+RUN_WORKERS_IN_API = os.getenv("RUN_WORKERS_IN_API", "true").lower() == "true"
+
 
 # --- Lifespan (מחליף את startup event) ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # קוד שרץ בעליית השרת
-    logger.info("🚀 Starting JobMatch Server & Workers...")
-    await start_background_workers()
+    if RUN_WORKERS_IN_API:
+        logger.info("🚀 Starting JobMatch Server & Workers...")
+        await start_background_workers()
+    else:
+        logger.info("🚀 Starting JobMatch Server (workers run separately)...")
     yield
-    # קוד שרץ בירידת השרת (אם נצטרך בעתיד לסגור חיבורים)
+    # קוד שרץ בירידת השרת - מחזירים לתור משרות שבעבודה וסוגרים חיבורים
     logger.info("🛑 Shutting down server...")
+    if RUN_WORKERS_IN_API:
+        await stop_background_workers()
+    await close_pool()
 
 
 app = FastAPI(title="JobMatch SQL API", version="2.0", lifespan=lifespan)
@@ -43,6 +54,7 @@ app.add_middleware(
 
 app.include_router(jobs_router, prefix="/api")
 app.include_router(profile_router, prefix="/api/profile")
+app.include_router(stats_router, prefix="/api")
 
 if __name__ == "__main__":
     from services.file_utils import DATA_DIR
@@ -0,0 +1,68 @@
+# src/services/http_client.py
+import logging
+import os
+from typing import Dict
+
+import httpx
+
+logger = logging.getLogger("HttpClient")
+
+try:
+    import h2  # noqa: F401
+
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+# הגדרות חיבור לכל upstream (ניתן לשנות דרך .env).
+# Client נפרד לכל upstream = מגבלת חיבורים וטיימאאוטים נפרדים לכל Host.
+CLIENT_SETTINGS = {
+    "gemini": {
+        "max_connections": int(os.getenv("GEMINI_MAX_CONNECTIONS", 20)),
+        "timeout": float(os.getenv("GEMINI_TIMEOUT_SECONDS", 60)),
+    },
+    # Jina עצמו מוגבל ל-X-Timeout: 40, ולכן הטיימאאוט שלנו מעט גבוה יותר
+    "jina": {
+        "max_connections": int(os.getenv("JINA_MAX_CONNECTIONS", 20)),
+        "timeout": float(os.getenv("JINA_TIMEOUT_SECONDS", 45)),
+    },
+    # בקשות קטנות ישירות לאתרי המשרות (אימות מטמון הסריקה)
+    "origin": {
+        "max_connections": int(os.getenv("ORIGIN_MAX_CONNECTIONS", 20)),
+        "timeout": float(os.getenv("ORIGIN_TIMEOUT_SECONDS", 10)),
+    },
+}
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def new_http_client(name: str) -> httpx.AsyncClient:
+    """
+    Creates a pooled keep-alive client for the given upstream.
+    Prefer get_http_client(); use this only for a short-lived event loop
+    (e.g. the sync wrappers), since a client is bound to the loop it runs on.
+    """
+    settings = CLIENT_SETTINGS[name]
+    return httpx.AsyncClient(
+        http2=HAS_HTTP2,
+        timeout=httpx.Timeout(settings["timeout"], connect=10),
+        limits=httpx.Limits(
+            max_connections=settings["max_connections"],
+            max_keepalive_connections=settings["max_connections"],
+            keepalive_expiry=60,
+        ),
+    )
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """Client משותף לכל התהליך - חיבורי TLS נשמרים בין בקשות"""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = new_http_client(name)
+    return client
+
+
+async def close_http_clients():
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
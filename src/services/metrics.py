@@ -0,0 +1,107 @@
+# src/services/metrics.py
+import asyncio
+import logging
+import os
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional
+
+from db.metrics_repository import add_metrics, get_metrics
+
+logger = logging.getLogger("Metrics")
+
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", 30))
+
+# גבולות ה-Histogram של זמנים (שניות). השורה ב-DB: "<metric>|le=<bucket>"
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 45, 60, float("inf"))
+# כמה מדידות אחרונות נשמרות בזיכרון לכל מדד (לחישוב p90 מקומי - Hedging)
+RECENT_WINDOW = 200
+
+# דלתאות שעוד לא נכתבו ל-DB: metric -> [count, total]
+_pending: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+_recent: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=RECENT_WINDOW))
+
+
+def incr(metric: str, count: int = 1):
+    """מונה פשוט (למשל scrape.source.jina)"""
+    _pending[metric][0] += count
+
+
+def observe(metric: str, seconds: float):
+    """מדידת זמן: count/total + Histogram מצטבר"""
+    _pending[metric][0] += 1
+    _pending[metric][1] += seconds
+    bucket = next(b for b in LATENCY_BUCKETS if seconds <= b)
+    _pending[f"{metric}|le={bucket:g}"][0] += 1
+    _recent[metric].append(seconds)
+
+
+def recent_percentile(metric: str, q: float, min_samples: int = 20) -> Optional[float]:
+    """אחוזון מהמדידות האחרונות של התהליך הזה, או None אם אין מספיק"""
+    samples = _recent.get(metric)
+    if not samples or len(samples) < min_samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def flush_metrics():
+    """כותב ל-DB את מה שנצבר מאז הכתיבה הקודמת"""
+    if not _pending:
+        return
+    rows = [(metric, int(count), float(total)) for metric, (count, total) in _pending.items()]
+    _pending.clear()
+    try:
+        await add_metrics(rows)
+    except Exception as e:
+        # מחזירים את הדלתאות - ננסה שוב בפעם הבאה
+        for metric, count, total in rows:
+            _pending[metric][0] += count
+            _pending[metric][1] += total
+        logger.warning(f"⚠️ Could not flush metrics: {e}")
+
+
+async def metrics_flusher():
+    """לולאת רקע בוורקרים"""
+    while True:
+        await asyncio.sleep(METRICS_FLUSH_SECONDS)
+        await flush_metrics()
+
+
+def _percentile_from_buckets(buckets: Dict[float, int], q: float) -> Optional[float]:
+    total = sum(buckets.values())
+    if not total:
+        return None
+    seen = 0
+    for bound in sorted(buckets):
+        seen += buckets[bound]
+        if seen >= q * total:
+            # inf = מעל הגבול העליון של ה-Histogram
+            return bound if bound != float("inf") else None
+    return None
+
+
+async def get_stats() -> dict:
+    """
+    Aggregated stats across all processes: plain counters as numbers,
+    timings as {count, avg, p50, p90} (percentiles are histogram upper bounds).
+    """
+    counters: Dict[str, int] = {}
+    timings: Dict[str, dict] = {}
+    histograms: Dict[str, Dict[float, int]] = defaultdict(dict)
+    for row in await get_metrics():
+        metric = row["metric"]
+        if "|le=" in metric:
+            name, bound = metric.split("|le=")
+            histograms[name][float(bound)] = row["count"]
+        elif row["total"]:
+            timings[metric] = {
+                "count": row["count"],
+                "avg": round(row["total"] / row["count"], 3) if row["count"] else None,
+            }
+        else:
+            counters[metric] = row["count"]
+    for name, buckets in histograms.items():
+        timing = timings.setdefault(name, {"count": sum(buckets.values()), "avg": None})
+        timing["p50"] = _percentile_from_buckets(buckets, 0.5)
+        timing["p90"] = _percentile_from_buckets(buckets, 0.9)
+    return {"counters": counters, "timings": timings}
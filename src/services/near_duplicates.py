@@ -0,0 +1,70 @@
+# src/services/near_duplicates.py
+import hashlib
+import os
+import re
+from typing import List
+
+# SimHash של 64 ביט, מחולק ל-4 רצועות של 16 ביט (עמודה מאונדקסת לכל רצועה).
+# לפי עקרון שובך היונים: מרחק Hamming של עד 3 ביטים => לפחות רצועה אחת זהה,
+# כך שחיפוש באינדקסים מוצא את כל הכפילויות עד המרחק הזה.
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+
+NEAR_DUPLICATE_ENABLED = os.getenv("NEAR_DUPLICATE_ENABLED", "true").lower() == "true"
+NEAR_DUPLICATE_MAX_DISTANCE = min(
+    int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", 3)), SIMHASH_BANDS - 1
+)
+# תיאור קצר מדי נותן טביעת אצבע לא אמינה
+NEAR_DUPLICATE_MIN_WORDS = int(os.getenv("NEAR_DUPLICATE_MIN_WORDS", 80))
+
+_SHINGLE_SIZE = 3
+_MASK = (1 << SIMHASH_BITS) - 1
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over 3-word shingles of the normalized text."""
+    words = tokenize(text)
+    shingles = [
+        " ".join(words[i : i + _SHINGLE_SIZE])
+        for i in range(max(1, len(words) - _SHINGLE_SIZE + 1))
+    ]
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        value = int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def bands(fingerprint: int) -> List[int]:
+    mask = (1 << BAND_BITS) - 1
+    return [fingerprint >> (i * BAND_BITS) & mask for i in range(SIMHASH_BANDS)]
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK).count("1")
+
+
+def to_signed(fingerprint: int) -> int:
+    """Postgres BIGINT הוא signed"""
+    if fingerprint >> (SIMHASH_BITS - 1):
+        return fingerprint - (1 << SIMHASH_BITS)
+    return fingerprint
+
+
+def from_signed(value: int) -> int:
+    return value & _MASK
+
+
+def fingerprint_for(text: str):
+    """SimHash אם התיאור ארוך מספיק, אחרת None (אין השוואה)"""
+    if len(tokenize(text)) < NEAR_DUPLICATE_MIN_WORDS:
+        return None
+    return simhash(text)
@@ -0,0 +1,299 @@
+# src/services/prescreen.py
+"""
+Local pre-screen before Gemini: hard showstopper phrases, plus (opt-in)
+TF-IDF cosine similarity between the resume and each job description. Jobs
+that clearly don't match get a cheap "pre-screened out" result instead of a
+paid call.
+
+Scoring works on flat (doc, term) index arrays with NumPy - no per-document
+Python loops after tokenization - so a batch of thousands of descriptions
+scores in well under a second. NumPy is in requirements.txt; if it is
+missing anyway the pre-screen is skipped (with a warning) and every job goes
+to Gemini as before.
+"""
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from db.jobs_repository import get_recent_descriptions
+
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+load_dotenv()
+
+logger = logging.getLogger("Workers")
+
+PRESCREEN_ENABLED = os.getenv("PRESCREEN_ENABLED", "true").lower() == "true"
+# מתחת לסף הזה (דמיון TF-IDF בין 0 ל-1) המשרה לא נשלחת ל-Gemini. 0 = כבוי -
+# רק חוסמים דוחים אוטומטית
+PRESCREEN_MIN_SCORE = float(os.getenv("PRESCREEN_MIN_SCORE", 0))
+# משרה בשפה אחרת מקו"ח מקבלת דמיון ~0 גם כשהיא מתאימה. אם פחות מהחלק הזה של
+# המונחים שלה מוכר (מהקורפוס/קו"ח) - לא סומכים על הדמיון והיא עוברת
+PRESCREEN_MIN_KNOWN_TERMS = float(os.getenv("PRESCREEN_MIN_KNOWN_TERMS", 0.5))
+# תיאורים קצרים מדי לא מספיקים להחלטה - תמיד עוברים לניתוח
+PRESCREEN_MIN_WORDS = int(os.getenv("PRESCREEN_MIN_WORDS", 80))
+# חוסמים קשיחים (מופרדים בפסיקים), בנוסף לשורת "showstoppers:" / "חוסמים:" בהקשר האישי
+PRESCREEN_SHOWSTOPPERS = os.getenv("PRESCREEN_SHOWSTOPPERS", "")
+# ה-IDF נלמד מהתיאורים האחרונים ב-DB ומתרענן מדי פעם
+PRESCREEN_CORPUS_SIZE = int(os.getenv("PRESCREEN_CORPUS_SIZE", 500))
+PRESCREEN_REFRESH_SECONDS = float(os.getenv("PRESCREEN_REFRESH_SECONDS", 600))
+
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9+#]*(?:\.[a-z0-9]+)*|[\u0590-\u05FF]{2,}")
+_SHOWSTOPPER_LINE_RE = re.compile(
+    r"^\s*(?:showstoppers?|חוסמים)\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE
+)
+# מילות שלילה לפני חוסם ("no relocation required", "ללא ניסיון ב...") - לא נחשב חוסם
+_NEGATION_WORDS = frozenset(
+    """no not non without never don't doesn't isn't aren't won't nor
+    לא ללא בלי אין""".split()
+)
+_NEGATION_WINDOW = 3
+# שלילה אחרי החוסם: "relocation is not required", "clearance not needed", "רילוקיישן לא נדרש"
+_NEGATED_AFTER_RE = re.compile(
+    r"[\s,:()-]*(?:"
+    r"(?:(?:is|are|will\s+be)\s+)?(?:not|never)\s+(?:be\s+)?"
+    r"|(?:isn't|aren't|won't\s+be)\s+"
+    r")(?:required|needed|necessary|mandatory|a\s+must|expected)"
+    r"|[\s,:()-]*(?:(?:is|are)\s+)?optional"
+    r"|[\s,:()-]*(?:לא|אינו|אינה|אין)\s+(?:נדרש|נדרשת|נדרשים|חובה|הכרחי|צורך)",
+    re.IGNORECASE,
+)
+_STOP_WORDS = frozenset(
+    """a an and are as at be by for from has have in is it of on or our the this
+    to we will with you your who what all any can more their they us not but
+    את של על עם או גם כל אם זה זו לא יש אנו אנחנו""".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token
+        for token in _TOKEN_RE.findall((text or "").lower())
+        if token not in _STOP_WORDS
+    ]
+
+
+def parse_showstoppers(context: str) -> List[str]:
+    """Showstopper phrases from PRESCREEN_SHOWSTOPPERS and `showstoppers: a, b` context lines."""
+    sources = [PRESCREEN_SHOWSTOPPERS, *_SHOWSTOPPER_LINE_RE.findall(context or "")]
+    phrases = {
+        phrase.strip().lower()
+        for source in sources
+        for phrase in source.split(",")
+        if phrase.strip()
+    }
+    return sorted(phrases)
+
+
+class PreScreener:
+    """
+    Scores job descriptions against one resume. The IDF comes from a
+    reference corpus (recent descriptions), so common boilerplate words
+    weigh little and stack/domain terms dominate the similarity.
+    """
+
+    def __init__(self, resume: str, showstoppers: List[str], corpus: List[str]):
+        self._vocab: Dict[str, int] = {}
+        doc_ids, term_ids, _ = self._index([tokenize(doc) for doc in corpus], grow=True)
+        # df לכל מונח: זוגות (מסמך, מונח) ייחודיים
+        pairs = np.unique(doc_ids * len(self._vocab) + term_ids)
+        df = np.bincount(pairs % max(len(self._vocab), 1), minlength=len(self._vocab))
+        self._corpus_size = len(corpus)
+        self._df = df.astype(np.float64)
+
+        resume_terms, resume_weights = self._weights([tokenize(resume)], grow=True)[1:3]
+        self._resume = np.zeros(len(self._vocab))
+        self._resume[resume_terms] = resume_weights
+        self._resume_norm = float(np.linalg.norm(self._resume))
+        # מונחים עם מזהה קטן מזה הופיעו בקורפוס או בקו"ח
+        self._reference_size = len(self._vocab)
+
+        self.showstoppers = showstoppers
+        self._showstopper_re = (
+            re.compile(
+                r"(?<!\w)(?:" + "|".join(map(re.escape, showstoppers)) + r")(?!\w)",
+                re.IGNORECASE,
+            )
+            if showstoppers
+            else None
+        )
+
+    def _index(self, docs: List[List[str]], grow: bool = False):
+        """
+        מילון משותף - כל טוקן הופך למספר; מחזיר מערכים שטוחים של (מסמך, מונח) ואת גודל
+        המילון. רק הקורפוס וקו"ח (grow=True) נכנסים למילון הקבוע - מונחים חדשים של משרות
+        שנבדקות מקבלים מזהים זמניים, כדי שהמילון לא יגדל עם כל קריאה ל-screen()
+        """
+        vocab = self._vocab
+        extra: Dict[str, int] = {}
+        doc_ids, term_ids = [], []
+        for doc_id, tokens in enumerate(docs):
+            for token in tokens:
+                term_id = vocab.get(token)
+                if term_id is None:
+                    if grow:
+                        term_id = vocab.setdefault(token, len(vocab))
+                    else:
+                        term_id = extra.setdefault(token, len(vocab) + len(extra))
+                term_ids.append(term_id)
+            doc_ids.extend([doc_id] * len(tokens))
+        return (
+            np.asarray(doc_ids, dtype=np.int64),
+            np.asarray(term_ids, dtype=np.int64),
+            len(vocab) + len(extra),
+        )
+
+    def _idf(self, size: int) -> "np.ndarray":
+        # מונחים חדשים (לא הופיעו בקורפוס) מקבלים את ה-IDF המקסימלי
+        df = np.zeros(size)
+        df[: len(self._df)] = self._df
+        return np.log((1 + self._corpus_size) / (1 + df)) + 1
+
+    def _weights(self, docs: List[List[str]], grow: bool = False):
+        """TF-IDF דליל: (מסמך, מונח, משקל) לכל זוג ייחודי, עם TF לוגריתמי, וגודל המילון"""
+        doc_ids, term_ids, size = self._index(docs, grow)
+        size = max(size, 1)
+        keys, tf = np.unique(doc_ids * size + term_ids, return_counts=True)
+        docs_of, terms_of = keys // size, keys % size
+        weights = (1 + np.log(tf)) * self._idf(size)[terms_of]
+        return docs_of, terms_of, weights, size
+
+    def scores(self, descriptions: List[str]) -> "np.ndarray":
+        """Cosine similarity (0-1) of each description to the resume."""
+        return self._score(descriptions)[0]
+
+    def _score(self, descriptions: List[str]) -> Tuple["np.ndarray", "np.ndarray"]:
+        """(דמיון לקו"ח, חלק המונחים הייחודיים שמוכרים מהקורפוס/קו"ח) לכל תיאור"""
+        count = len(descriptions)
+        if not descriptions or not self._resume_norm:
+            return np.zeros(count), np.zeros(count)
+        docs, terms, weights, size = self._weights([tokenize(d) for d in descriptions])
+        resume = np.zeros(size)
+        resume[: len(self._resume)] = self._resume
+        dots = np.bincount(docs, weights=weights * resume[terms], minlength=count)
+        norms = np.sqrt(np.bincount(docs, weights=weights**2, minlength=count))
+        distinct = np.bincount(docs, minlength=count)
+        is_known = (terms < self._reference_size).astype(np.float64)
+        known = np.bincount(docs, weights=is_known, minlength=count)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            similarity = np.where(norms > 0, dots / (norms * self._resume_norm), 0.0)
+            familiar = np.where(distinct > 0, known / distinct, 0.0)
+        return similarity, familiar
+
+    def showstoppers_in(self, description: str) -> List[str]:
+        if not self._showstopper_re:
+            return []
+        text = description or ""
+        found = set()
+        for match in self._showstopper_re.finditer(text):
+            # "no relocation required" / "ללא ..." - אזכור בשלילה אינו חוסם
+            start = match.start()
+            before = re.findall(r"[\w']+", text[max(0, start - 60) : start].lower())
+            if not _NEGATION_WORDS.isdisjoint(before[-_NEGATION_WINDOW:]):
+                continue
+            if _NEGATED_AFTER_RE.match(text, match.end()):
+                continue
+            found.add(match.group(0).lower())
+        return sorted(found)
+
+    def screen(self, jobs: List[dict]) -> List[Optional[dict]]:
+        """
+        Returns, per job, a "pre-screened out" analysis result, or None when
+        the job should go to Gemini (passed, too short to judge, or forced).
+        """
+        results: List[Optional[dict]] = [None] * len(jobs)
+        candidates = [
+            index
+            for index, job in enumerate(jobs)
+            if not job.get("force_analysis")
+            and len((job.get("full_description") or "").split()) >= PRESCREEN_MIN_WORDS
+        ]
+        if not candidates:
+            return results
+        scores, familiar = self._score(
+            [jobs[i]["full_description"] for i in candidates]
+        )
+        for index, score, known in zip(candidates, scores.tolist(), familiar.tolist()):
+            blockers = self.showstoppers_in(jobs[index]["full_description"])
+            # שפה/כתב אחרים מקו"ח - דמיון נמוך לא אומר כלום, רק חוסמים נבדקים
+            dissimilar = (
+                PRESCREEN_MIN_SCORE > 0
+                and known >= PRESCREEN_MIN_KNOWN_TERMS
+                and score < PRESCREEN_MIN_SCORE
+            )
+            if blockers or dissimilar:
+                results[index] = _screened_out_result(jobs[index], score, blockers)
+        return results
+
+
+def _screened_out_result(job: dict, score: float, blockers: List[str]) -> dict:
+    # אותו מבנה כמו תשובת Gemini, כדי שהדשבורד יציג אותו כרגיל
+    reason = (
+        f"נמצאו חוסמים: {', '.join(blockers)}"
+        if blockers
+        else f"דמיון נמוך לקורות החיים ({score:.2f} < {PRESCREEN_MIN_SCORE:.2f})"
+    )
+    return {
+        "company": job.get("company"),
+        "job_title": job.get("job_title"),
+        "suitability_score": 0,
+        "acceptance_probability": 0,
+        "job_summary_hebrew": f"המשרה סוננה מקומית ולא נשלחה לניתוח AI. {reason}",
+        "showstoppers": blockers,
+        "gap_analysis": [],
+        "recommendation": "לא להגיש",
+        "formatted_message": "",
+        "prescreened": True,
+        "prescreen_score": round(score, 4),
+        "url": job.get("url"),
+    }
+
+
+_screener: Optional[PreScreener] = None
+_screener_key: Optional[str] = None
+_screener_built_at = 0.0
+_warned_no_numpy = False
+
+
+async def get_prescreener(resume: str, context: str) -> Optional[PreScreener]:
+    """
+    Shared screener for the current profile, rebuilt when the resume/context
+    change or the IDF corpus is older than PRESCREEN_REFRESH_SECONDS.
+    None when the pre-screen is disabled, NumPy is missing or there is no resume.
+    """
+    global _screener, _screener_key, _screener_built_at, _warned_no_numpy
+    if not PRESCREEN_ENABLED or not (resume or "").strip():
+        return None
+    if not HAS_NUMPY:
+        if not _warned_no_numpy:
+            logger.warning(
+                "⚠️ PRESCREEN_ENABLED but NumPy is not installed - "
+                "pre-screen is off (pip install numpy)"
+            )
+            _warned_no_numpy = True
+        return None
+    key = hashlib.sha256(f"{resume}\0{context}".encode("utf-8")).hexdigest()
+    now = time.monotonic()
+    if (
+        _screener is None
+        or _screener_key != key
+        or now - _screener_built_at > PRESCREEN_REFRESH_SECONDS
+    ):
+        corpus = await get_recent_descriptions(PRESCREEN_CORPUS_SIZE)
+        _screener = PreScreener(resume, parse_showstoppers(context), corpus)
+        _screener_key, _screener_built_at = key, now
+        logger.info(
+            f"🔎 Pre-screen ready ({len(corpus)} reference descriptions, "
+            f"{len(_screener.showstoppers)} showstopper phrase(s))"
+        )
+    return _screener
@@ -0,0 +1,124 @@
+# src/services/rate_limiter.py
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from db.limits_repository import (
+    get_block_status,
+    record_failure,
+    record_success,
+    try_acquire,
+)
+
+logger = logging.getLogger("RateLimiter")
+
+# --- מכסות (ניתן לשנות דרך .env). 0 = ללא הגבלה ---
+UPSTREAM_QUOTAS = {
+    "gemini": {
+        "requests_per_minute": float(os.getenv("GEMINI_RPM", 15)),
+        "tokens_per_minute": float(os.getenv("GEMINI_TPM", 250000)),
+    },
+    "jina": {
+        "requests_per_minute": float(os.getenv("JINA_RPM", 200)),
+        "tokens_per_minute": float(os.getenv("JINA_TPM", 0)),
+    },
+}
+# Circuit breaker: אחרי כמה כישלונות רצופים עוצרים את השלב, ולכמה זמן
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", 60))
+# כל כמה זמן לכל היותר בודקים ב-DB אם ה-breaker נפתח (מתהליך אחר)
+BREAKER_REFRESH_SECONDS = 5
+# המתנה מקסימלית בין ניסיונות acquire - כדי להגיב מהר כשהדלי מתמלא
+MAX_WAIT_STEP_SECONDS = 5
+
+
+class UpstreamLimiter:
+    """
+    Token bucket + circuit breaker for one upstream API.
+    State lives in Postgres (see db.limits_repository), so every worker pool
+    and every worker process shares the same quota.
+    """
+
+    def __init__(
+        self, name: str, requests_per_minute: float, tokens_per_minute: float = 0
+    ):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._blocked_until = 0.0  # time.monotonic() מקומי
+        self._checked_at = 0.0
+        self._consecutive_failures = 0
+
+    @property
+    def blocked_for(self) -> float:
+        """שניות עד שה-upstream שוב זמין (Retry-After / breaker פתוח), לפי המצב המקומי"""
+        return max(0.0, self._blocked_until - time.monotonic())
+
+    @property
+    def is_unlimited(self) -> bool:
+        return self.requests_per_minute <= 0 and self.tokens_per_minute <= 0
+
+    async def acquire(self, tokens: float = 0):
+        """Waits until the shared bucket has room for one request of `tokens` tokens."""
+        if self.is_unlimited:
+            await self.wait_until_healthy()
+            return
+        while True:
+            wait = await try_acquire(
+                self.name, self.requests_per_minute, self.tokens_per_minute, tokens
+            )
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, MAX_WAIT_STEP_SECONDS))
+
+    async def wait_until_healthy(self):
+        """
+        Blocks while the upstream is throttled (Retry-After) or the breaker is open.
+        Workers call this before claiming, so no jobs are burned on a dead upstream.
+        """
+        while True:
+            now = time.monotonic()
+            if now - self._checked_at >= BREAKER_REFRESH_SECONDS:
+                failures, blocked_for = await get_block_status(self.name)
+                self._consecutive_failures = failures
+                self._blocked_until = now + blocked_for
+                self._checked_at = now
+            remaining = self._blocked_until - now
+            if remaining <= 0:
+                return
+            logger.warning(
+                f"⏸️ {self.name} unavailable, pausing for {remaining:.0f}s "
+                f"({self._consecutive_failures} consecutive failures)"
+            )
+            await asyncio.sleep(min(remaining, BREAKER_COOLDOWN_SECONDS))
+
+    async def record_success(self):
+        if self._consecutive_failures:
+            self._consecutive_failures = 0
+            await record_success(self.name)
+
+    async def record_failure(self, retry_after: Optional[float] = None):
+        failures, blocked_for = await record_failure(
+            self.name, retry_after, BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SECONDS
+        )
+        now = time.monotonic()
+        self._consecutive_failures = failures
+        self._blocked_until = now + blocked_for
+        self._checked_at = now
+        if failures >= BREAKER_FAILURE_THRESHOLD:
+            logger.error(
+                f"🔌 Circuit open for {self.name}: {failures} consecutive failures, "
+                f"pausing for {blocked_for:.0f}s"
+            )
+
+
+_limiters: Dict[str, UpstreamLimiter] = {}
+
+
+def get_limiter(name: str) -> UpstreamLimiter:
+    """Limiter אחד לכל upstream בתהליך - משותף לכל ה-Pools"""
+    if name not in _limiters:
+        _limiters[name] = UpstreamLimiter(name, **UPSTREAM_QUOTAS[name])
+    return _limiters[name]
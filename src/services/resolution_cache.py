@@ -0,0 +1,103 @@
+# src/services/resolution_cache.py
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from db.resolutions_repository import get_resolution, get_resolutions, save_resolution
+
+logger = logging.getLogger("ResolutionCache")
+
+# כמה זמן לינק מפוענח נחשב תקף, וכמה לינקים נשמרים בזיכרון התהליך
+URL_RESOLUTION_TTL_DAYS = float(os.getenv("URL_RESOLUTION_TTL_DAYS", 30))
+URL_RESOLUTION_LRU_SIZE = int(os.getenv("URL_RESOLUTION_LRU_SIZE", 1000))
+
+
+class ResolutionCache:
+    """
+    original URL -> resolved URL, checked before any browser resolution.
+    An in-process LRU sits in front of the `url_resolutions` table, which is
+    shared by every worker process and survives restarts.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = URL_RESOLUTION_TTL_DAYS * 86400,
+        max_size: int = URL_RESOLUTION_LRU_SIZE,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._lru: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_local(self, url: str) -> Optional[str]:
+        entry = self._lru.get(url)
+        if entry is None:
+            return None
+        resolved, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._lru[url]
+            return None
+        self._lru.move_to_end(url)
+        return resolved
+
+    def _put_local(self, url: str, resolved: str):
+        self._lru[url] = (resolved, time.monotonic() + self.ttl_seconds)
+        self._lru.move_to_end(url)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    async def get(self, url: str) -> Optional[str]:
+        resolved = self._get_local(url)
+        if resolved is None:
+            resolved = await get_resolution(url)
+            if resolved:
+                self._put_local(url, resolved)
+        if resolved:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return resolved
+
+    async def get_many(self, urls: List[str]) -> Dict[str, str]:
+        """Bulk lookup - one query for everything the LRU doesn't have."""
+        found = {}
+        missing = []
+        for url in urls:
+            resolved = self._get_local(url)
+            if resolved:
+                found[url] = resolved
+            else:
+                missing.append(url)
+        for url, resolved in (await get_resolutions(missing)).items():
+            self._put_local(url, resolved)
+            found[url] = resolved
+        self.hits += len(found)
+        self.misses += len(urls) - len(found)
+        return found
+
+    async def set(self, url: str, resolved: str):
+        self._put_local(url, resolved)
+        try:
+            await save_resolution(url, resolved, self.ttl_seconds)
+        except Exception as e:
+            # המטמון הוא אופטימיזציה - כישלון בשמירה לא מפיל את הרזולוציה
+            logger.warning(f"⚠️ Could not persist resolution for {url}: {e}")
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+_shared_cache: Optional[ResolutionCache] = None
+
+
+def get_resolution_cache() -> ResolutionCache:
+    """Cache אחד לכל תהליך"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ResolutionCache()
+    return _shared_cache
@@ -0,0 +1,174 @@
+# src/services/scrape_cache.py
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Optional, Set, Tuple
+
+import httpx
+
+from db.scrape_cache_repository import (
+    get_cached_scrape,
+    mark_scrape_validated,
+    save_scrape,
+    save_scrape_validators,
+)
+from services.http_client import get_http_client
+
+logger = logging.getLogger("ScrapeCache")
+
+# רשומה "טרייה" מוגשת בלי שום בקשה; ישנה יותר - מאמתים מול האתר (HEAD מותנה).
+# אחרי SCRAPE_CACHE_MAX_AGE_DAYS סורקים מחדש בכל מקרה.
+SCRAPE_CACHE_FRESH_HOURS = float(os.getenv("SCRAPE_CACHE_FRESH_HOURS", 24))
+SCRAPE_CACHE_MAX_AGE_DAYS = float(os.getenv("SCRAPE_CACHE_MAX_AGE_DAYS", 30))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ScrapeCache:
+    """
+    Scrape results keyed by the resolved URL, stored in the `scrape_cache` table.
+    Fresh entries are served without any network call; stale ones are
+    revalidated with a conditional HEAD against the job page itself
+    (ETag / Last-Modified), which costs no Jina credits.
+    The validators come from the response the scrape already fetched; when
+    there was none (Jina), they are fetched with a HEAD in the background.
+    """
+
+    def __init__(
+        self,
+        fresh_seconds: float = SCRAPE_CACHE_FRESH_HOURS * 3600,
+        max_age_seconds: float = SCRAPE_CACHE_MAX_AGE_DAYS * 86400,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.fresh_seconds = fresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self._client = client
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        # מחזיקים הפניה למשימות הרקע, אחרת ה-GC עלול לאסוף אותן באמצע
+        self._background: Set[asyncio.Task] = set()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_http_client("origin")
+
+    async def get(self, url: str) -> Optional[dict]:
+        """מחזיר תוצאת סריקה מהמטמון אם היא עדיין תקפה, אחרת None"""
+        try:
+            entry = await get_cached_scrape(url)
+        except Exception as e:
+            logger.warning(f"⚠️ Scrape cache lookup failed for {url}: {e}")
+            return None
+
+        if entry is None or entry["fetched_age"] > self.max_age_seconds:
+            self.misses += 1
+            return None
+
+        if entry["age"] > self.fresh_seconds:
+            if not await self._not_modified(url, entry):
+                self.misses += 1
+                return None
+            await mark_scrape_validated(url)
+            self.revalidated += 1
+        else:
+            self.hits += 1
+
+        result = {
+            "source": "cache",
+            "original_url": url,
+            "resolved_url": url,
+            "full_description": entry["full_description"],
+            "content_hash": entry["content_hash"],
+        }
+        # כותרת/חברה קיימות רק אם הסריקה המקורית הגיעה מ-Extractor
+        if entry["company"]:
+            result["company"] = entry["company"]
+        if entry["job_title"]:
+            result["job_title"] = entry["job_title"]
+        return result
+
+    async def set(self, url: str, result: dict):
+        """
+        שומר תוצאת סריקה + ה-Validators של האתר. אם הסריקה לא הביאה אותם
+        (Jina) - HEAD ברקע, בלי לעכב את ה-Worker.
+        """
+        description = result["full_description"]
+        digest = result.get("content_hash") or content_hash(description)
+        validators = result.get("validators")
+        etag, last_modified = validators or (None, None)
+        try:
+            await save_scrape(
+                url,
+                description,
+                digest,
+                result.get("source", "unknown"),
+                etag,
+                last_modified,
+                result.get("company"),
+                result.get("job_title"),
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not store scrape cache for {url}: {e}")
+            return
+        if validators is None:
+            task = asyncio.create_task(self._store_validators(url, digest))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _store_validators(self, url: str, digest: str):
+        etag, last_modified = await self._fetch_validators(url)
+        if not etag and not last_modified:
+            return
+        try:
+            await save_scrape_validators(url, digest, etag, last_modified)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not store validators for {url}: {e}")
+
+    async def _fetch_validators(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        try:
+            res = await self.client.head(url, follow_redirects=True)
+        except httpx.HTTPError:
+            return None, None
+        if res.status_code != 200:
+            return None, None
+        return res.headers.get("ETag"), res.headers.get("Last-Modified")
+
+    async def _not_modified(self, url: str, entry: dict) -> bool:
+        # בלי Validators אין דרך זולה לדעת - סורקים מחדש
+        if not entry["etag"] and not entry["last_modified"]:
+            return False
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            res = await self.client.head(url, headers=headers, follow_redirects=True)
+        except httpx.HTTPError:
+            return False
+        if res.status_code == 304:
+            return True
+        # יש שרתים שמתעלמים מבקשה מותנית ב-HEAD - משווים את ה-Validators בעצמנו
+        if res.status_code == 200:
+            if entry["etag"] and res.headers.get("ETag") == entry["etag"]:
+                return True
+            if entry["last_modified"] and (
+                res.headers.get("Last-Modified") == entry["last_modified"]
+            ):
+                return True
+        return False
+
+
+_shared_cache: Optional[ScrapeCache] = None
+
+
+def get_scrape_cache() -> ScrapeCache:
+    """Cache אחד לכל תהליך"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ScrapeCache()
+    return _shared_cache
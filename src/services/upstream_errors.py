@@ -0,0 +1,43 @@
+# src/services/upstream_errors.py
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# סטטוסים שמעידים שה-API החיצוני עמוס / לא זמין (ולא שהבקשה שלנו שגויה)
+UPSTREAM_FAILURE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """An external API (Gemini / Jina) throttled us or is unavailable."""
+
+    def __init__(
+        self,
+        upstream: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        message: str = "",
+    ):
+        self.upstream = upstream
+        self.status_code = status_code
+        self.retry_after = retry_after
+        super().__init__(
+            message or f"{upstream} unavailable (HTTP {status_code or 'n/a'})"
+        )
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header (delta-seconds or HTTP-date) into seconds.
+    Returns None if the header is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
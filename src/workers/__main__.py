@@ -0,0 +1,106 @@
+# src/workers/__main__.py
+"""
+Standalone worker process: runs the resolve/scrape/AI pools without the API.
+
+    cd src
+    python -m workers                      # pool sizes from .env
+    python -m workers --scrape-workers 4 --ai-workers 2
+    python -m workers --resolve-workers 2 --scrape-workers 0 --ai-workers 0
+    python -m workers --processes 3        # several worker processes on this host
+
+Start the API with RUN_WORKERS_IN_API=false so it stays thin.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+
+from db.postgres import close_pool
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()],
+)
+logger = logging.getLogger("WorkerProcess")
+
+
+async def run_workers(scrape_workers=None, ai_workers=None, resolve_workers=None):
+    # ייבוא בתוך התהליך עצמו - WORKER_ID נגזר מה-PID בזמן הייבוא
+    from workers.worker_manager import (
+        start_background_workers,
+        stop_background_workers,
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: אין add_signal_handler, Ctrl+C יבטל את asyncio.run וה-finally ינקה
+            pass
+
+    await start_background_workers(scrape_workers, ai_workers, resolve_workers)
+    try:
+        await stop.wait()
+    finally:
+        await stop_background_workers()
+        await close_pool()
+
+
+def _run_process(scrape_workers, ai_workers, resolve_workers, index=None):
+    # WORKER_ID מפורש חייב להיות ייחודי לכל תהליך, אחרת תהליך אחד ישחרר משרות של אחר
+    if index is not None and os.getenv("WORKER_ID"):
+        os.environ["WORKER_ID"] = f"{os.environ['WORKER_ID']}-{index}"
+    try:
+        asyncio.run(run_workers(scrape_workers, ai_workers, resolve_workers))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JobMatch background workers")
+    parser.add_argument(
+        "--resolve-workers",
+        type=int,
+        help="HireMeTech resolve workers per process (default: RESOLVE_WORKERS)",
+    )
+    parser.add_argument(
+        "--scrape-workers", type=int, help="scrape workers per process (default: SCRAPE_WORKERS)"
+    )
+    parser.add_argument(
+        "--ai-workers", type=int, help="AI workers per process (default: AI_WORKERS)"
+    )
+    parser.add_argument(
+        "--processes", type=int, default=1, help="number of worker processes to run"
+    )
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        logger.info("🚀 Starting JobMatch workers...")
+        _run_process(args.scrape_workers, args.ai_workers, args.resolve_workers)
+        return
+
+    logger.info(f"🚀 Starting {args.processes} JobMatch worker processes...")
+    processes = [
+        multiprocessing.Process(
+            target=_run_process,
+            args=(args.scrape_workers, args.ai_workers, args.resolve_workers, i),
+        )
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,138 +1,824 @@
 # src/workers/worker_manager.py
 import asyncio
 import logging
+import os
+import random
+import socket
+from collections import defaultdict
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
 
+from db.analysis_cache_repository import get_cached_analysis, save_analysis
 from db.jobs_repository import (
-    fetch_next_job,
+    age_waiting_jobs,
+    JobPriority,
+    claim_jobs,
+    complete_resolution,
+    count_ready_jobs,
+    extend_leases,
+    find_near_duplicate,
     finish_analysis,
     finish_scrape,
+    link_duplicate,
     mark_failed,
-    reset_stuck_jobs,
+    release_jobs,
+    requeue_expired_leases,
+    schedule_retry,
 )
+from db.notifications import get_stage_signal, start_listener, stop_listener
+from scraper_service.browser_pool import close_browser_pool
+from scraper_service.resolvers import URLResolver
 from services.file_utils import CONTEXT_PATH, RESUME_PATH, read_text_file
+from services.http_client import close_http_clients
+from services import metrics
+from services.metrics import flush_metrics, metrics_flusher
+from services.near_duplicates import (
+    NEAR_DUPLICATE_ENABLED,
+    NEAR_DUPLICATE_MAX_DISTANCE,
+    fingerprint_for,
+)
+from services.prescreen import get_prescreener
+from services.rate_limiter import get_limiter
+from services.resolution_cache import get_resolution_cache
+from services.scrape_cache import get_scrape_cache
+from services.upstream_errors import UpstreamError
 
 # נסה לייבא את המנועים
 try:
-    from engine import JobAnalyzer
+    from engine import PROMPT_VERSION, JobAnalyzer, triage_result
     from scraper import Scraper
 except ImportError:
-    from src.engine import JobAnalyzer
+    from src.engine import PROMPT_VERSION, JobAnalyzer, triage_result
     from src.scraper import Scraper
 
 logger = logging.getLogger("Workers")
 
+# --- הגדרות ה-Pools (ניתן לשנות דרך .env) ---
+RESOLVE_WORKERS = int(os.getenv("RESOLVE_WORKERS", 1))
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", 1))
+AI_WORKERS = int(os.getenv("AI_WORKERS", 1))
+# כמה משימות רצות במקביל בכל שלב (ברירת מחדל: כמספר הוורקרים)
+RESOLVE_CONCURRENCY = int(os.getenv("RESOLVE_CONCURRENCY", RESOLVE_WORKERS))
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", SCRAPE_WORKERS))
+AI_CONCURRENCY = int(os.getenv("AI_CONCURRENCY", AI_WORKERS))
+# כמה סריקות במקביל מותרות לאותו דומיין (כדי לא להיחסם)
+SCRAPE_PER_DOMAIN_LIMIT = int(os.getenv("SCRAPE_PER_DOMAIN_LIMIT", 2))
+# כמה משרות כל וורקר תופס בטרנזקציה אחת
+RESOLVE_BATCH_SIZE = int(os.getenv("RESOLVE_BATCH_SIZE", 1))
+SCRAPE_BATCH_SIZE = int(os.getenv("SCRAPE_BATCH_SIZE", 1))
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", 1))
+
+# --- Backlog: כשיש הרבה משרות שממתינות ל-AI, משרות לא-אינטראקטיביות מנותחות כמה בקריאה אחת ---
+AI_BULK_QUEUE_THRESHOLD = int(os.getenv("AI_BULK_QUEUE_THRESHOLD", 50))  # 0 = כבוי
+AI_BULK_BATCH_SIZE = int(os.getenv("AI_BULK_BATCH_SIZE", 10))
+# טוקני תשובה לכל משרה ב-Batch (להערכת המכסה)
+AI_BULK_OUTPUT_TOKENS_PER_JOB = 800
+
+# --- Cascade: טריאז' זול קודם, וניתוח מלא רק מעל הסף (או כשהמשתמש פותח את המשרה) ---
+# כבוי כברירת מחדל: כש-TRIAGE_MODEL ו-FULL_MODEL זהים, כל משרה מעל הסף עולה שתי קריאות
+ANALYSIS_CASCADE_ENABLED = (
+    os.getenv("ANALYSIS_CASCADE_ENABLED", "false").lower() == "true"
+)
+TRIAGE_MIN_SCORE = int(os.getenv("TRIAGE_MIN_SCORE", 60))
+# הוורקרים מתעוררים מ-NOTIFY; זהו רק פולינג ביטחון למקרה שהתראה אבדה
+QUEUE_SAFETY_POLL_SECONDS = float(os.getenv("QUEUE_SAFETY_POLL_SECONDS", 30))
+
+# --- Leases: כל תהליך מזהה את עצמו, מאריך את ה-Lease של המשרות שלו ומחזיר לתור Leases שפגו ---
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 120))
+HEARTBEAT_SECONDS = LEASE_SECONDS / 3
+REAPER_INTERVAL_SECONDS = float(os.getenv("LEASE_REAPER_INTERVAL_SECONDS", 60))
+
+# --- Retry: כישלון מחזיר את המשרה לתור עם Backoff אקספוננציאלי, ואחרי N ניסיונות ל-Dead-letter ---
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 4))
+RETRY_BASE_SECONDS = float(os.getenv("RETRY_BASE_SECONDS", 30))
+RETRY_MAX_SECONDS = float(os.getenv("RETRY_MAX_SECONDS", 1800))
+
+# --- Aging: משרה בעדיפות נמוכה עולה דרגה אחת על כל פרק זמן כזה שהיא ממתינה ---
+PRIORITY_AGING_AFTER_SECONDS = float(os.getenv("PRIORITY_AGING_AFTER_SECONDS", 300))
+
+_resolve_slots = None
+_scrape_slots = None
+_ai_slots = None
+_worker_tasks = []
+_held_job_ids = set()
+_domain_slots = defaultdict(lambda: asyncio.Semaphore(SCRAPE_PER_DOMAIN_LIMIT))
+
+
+def _domain_of(url: str) -> str:
+    return urlparse(url).netloc.lower().removeprefix("www.")
+
+
+def _backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, so a failing batch doesn't retry in lockstep."""
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2**attempts)
+    return random.uniform(delay / 2, delay)
+
+
+def _error_class(error: Exception) -> str:
+    # השגיאה המקורית (למשל HTTPError) ולא העטיפה של "failed after N attempts"
+    return type(error.__cause__ or error).__name__
+
+
+def _upstream_error(error: Exception) -> Optional[UpstreamError]:
+    for candidate in (error, error.__cause__):
+        if isinstance(candidate, UpstreamError):
+            return candidate
+    return None
+
+
+def _upstream_delay(limiter, upstream_error: Optional[UpstreamError]) -> Optional[float]:
+    """עד מתי לדחות משרה שנכשלה בגלל ה-upstream: Retry-After או עד שה-breaker נסגר"""
+    if upstream_error is None:
+        return None
+    return max(upstream_error.retry_after or 0, limiter.blocked_for)
+
+
+def _estimate_tokens(*texts: Optional[str]) -> int:
+    # הערכה גסה (~4 תווים לטוקן) + תקורת פרומפט ותשובה
+    return sum(len(text or "") for text in texts) // 4 + 1500
+
+
+def _log_lost_lease(job: dict):
+    # ה-Lease פג והמשרה נתפסה מחדש (או כבר טופלה) - התוצאה שלנו נזרקת
+    logger.warning(
+        f"⚠️ Lost lease on Job ID {job['id']} before writing its result, dropping it"
+    )
+
+
+async def _fail_or_retry(
+    job: dict,
+    waiting_status: str,
+    dead_status: str,
+    error: str,
+    error_class: Optional[str] = None,
+    upstream_delay: Optional[float] = None,
+):
+    """
+    מתזמן ניסיון חוזר עם Backoff, או מעביר ל-Dead-letter אחרי JOB_MAX_ATTEMPTS.
+    upstream_delay - ה-upstream נפל (429/5xx/רשת) ולא המשרה: היא חוזרת לתור כשה-upstream
+    שוב זמין, בלי לספור ניסיון - כך הפסקה ארוכה של Gemini/Jina לא שולחת את כל התור ל-Dead-letter.
+    """
+    attempts = job.get("attempts", 0)
+    if upstream_delay is not None:
+        delay = max(upstream_delay, RETRY_BASE_SECONDS)
+        logger.warning(
+            f"⏸️ Job ID {job['id']} hit an upstream error, requeued for {delay:.0f}s "
+            f"(not counted as an attempt)"
+        )
+        if not await schedule_retry(
+            job["id"],
+            WORKER_ID,
+            waiting_status,
+            error,
+            error_class,
+            delay,
+            count_attempt=False,
+        ):
+            _log_lost_lease(job)
+            return
+        asyncio.get_running_loop().call_later(
+            delay, get_stage_signal(waiting_status).fire
+        )
+        return
 
-async def scrape_worker():
-    logger.info("🕷️ Scraper Worker started")
-    scraper = Scraper()
+    if attempts + 1 >= JOB_MAX_ATTEMPTS:
+        logger.error(
+            f"☠️ Job ID {job['id']} failed {attempts + 1} times, moving to {dead_status}"
+        )
+        if not await mark_failed(job["id"], WORKER_ID, dead_status, error, error_class):
+            _log_lost_lease(job)
+        return
+
+    delay = _backoff_delay(attempts)
+    logger.warning(
+        f"🔁 Job ID {job['id']} failed (attempt {attempts + 1}/{JOB_MAX_ATTEMPTS}), "
+        f"retrying in {delay:.0f}s"
+    )
+    if not await schedule_retry(
+        job["id"], WORKER_ID, waiting_status, error, error_class, delay
+    ):
+        _log_lost_lease(job)
+        return
+    # מעירים את הוורקרים המקומיים כשהמשרה תהיה זמינה (תהליכים אחרים - פולינג הביטחון)
+    asyncio.get_running_loop().call_later(
+        delay, get_stage_signal(waiting_status).fire
+    )
+
+
+async def resolve_worker(worker_id: int, resolver: URLResolver):
+    logger.info(f"🔍 Resolve Worker #{worker_id} started")
+    signal = get_stage_signal("WAITING_FOR_RESOLVE")
+
+    while True:
+        seen = signal.generation
+        jobs = await claim_jobs(
+            "WAITING_FOR_RESOLVE",
+            "RESOLVING",
+            RESOLVE_BATCH_SIZE,
+            WORKER_ID,
+            LEASE_SECONDS,
+        )
+        _held_job_ids.update(job["id"] for job in jobs)
+        if jobs:
+            await asyncio.gather(*(_run_resolve_job(resolver, job) for job in jobs))
+        else:
+            await signal.wait(seen, QUEUE_SAFETY_POLL_SECONDS)
+
+
+async def _run_resolve_job(resolver: URLResolver, job: dict):
+    try:
+        async with _resolve_slots:
+            await _process_resolve_job(resolver, job)
+    finally:
+        _held_job_ids.discard(job["id"])
+
+
+async def _process_resolve_job(resolver: URLResolver, job: dict):
+    original_url = job["url"]
+    try:
+        logger.info(f"🔍 Resolving: {original_url}")
+        resolved_url = await resolver.resolve_async(original_url)
+        if resolved_url == original_url:
+            await _fail_or_retry(
+                job,
+                "WAITING_FOR_RESOLVE",
+                "FAILED_SCRAPE",
+                "Could not resolve company URL",
+            )
+            return
+
+        # עדכון הלינק + בדיקת כפילות + מעבר לסריקה - בטרנזקציה אחת
+        owned, duplicate_of = await complete_resolution(
+            job["id"], WORKER_ID, resolved_url
+        )
+        if not owned:
+            _log_lost_lease(job)
+        elif duplicate_of:
+            logger.warning(
+                f"⏭️ DUPLICATE DETECTED: Resolved URL '{resolved_url}' "
+                f"already exists in DB (Job ID: {duplicate_of}). "
+                f"Deleted duplicate job ID {job['id']}."
+            )
+        else:
+            logger.info(f"✅ Resolved: {original_url} → {resolved_url}")
+    except Exception as e:
+        logger.error(f"❌ Resolve error for {original_url}: {e}")
+        await _fail_or_retry(
+            job, "WAITING_FOR_RESOLVE", "FAILED_SCRAPE", str(e), _error_class(e)
+        )
+
+
+async def scrape_worker(worker_id: int, scraper: Scraper):
+    logger.info(f"🕷️ Scraper Worker #{worker_id} started")
+    signal = get_stage_signal("WAITING_FOR_SCRAPE")
+    jina = get_limiter("jina")
 
     while True:
-        job = await fetch_next_job("WAITING_FOR_SCRAPE", "SCRAPING")
-        if job:
-            try:
-                original_url = job["url"]
-                logger.info(f"🕷️ Processing: {original_url}")
-
-                # --- STEP 1: PRE-SCRAPE URL RESOLUTION CHECK ---
-                # Check if this is a special URL (e.g., HireMeTech) that needs resolution
-                resolved_url = original_url
-
-                if "hiremetech" in original_url:
-                    logger.info("🔍 Detected HireMeTech URL, resolving...")
-                    # Use the resolver to get the actual company URL
-                    resolved_url = await asyncio.to_thread(
-                        scraper.resolver.resolve, original_url
-                    )
-
-                    # --- STEP 2: UPDATE URL IN DATABASE IF RESOLVED ---
-                    if resolved_url != original_url:
-                        logger.info(f"✅ Resolved: {original_url} → {resolved_url}")
-
-                        # Import here to avoid circular dependency
-                        from db.jobs_repository import (
-                            delete_job_by_id,
-                            get_job_by_url,
-                            update_job_url,
-                        )
-
-                        # Check if the resolved URL already exists in our database
-                        existing_job = await get_job_by_url(resolved_url)
-
-                        if existing_job:
-                            logger.warning(
-                                f"⏭️ DUPLICATE DETECTED: Resolved URL '{resolved_url}' "
-                                f"already exists in DB (Job ID: {existing_job['id']}). "
-                                f"Deleting duplicate job ID {job['id']}."
-                            )
-                            # Delete the duplicate job
-                            await delete_job_by_id(job["id"])
-                            # Skip to next job without scraping
-                            continue
-                        else:
-                            # Update the job URL in the database
-                            logger.info(
-                                f"📝 Updating job URL in database: {original_url} → {resolved_url}"
-                            )
-                            await update_job_url(job["id"], resolved_url)
-                            # Let the next iteration pick up the updated URL
-                            logger.info(
-                                "✓ URL updated. Continuing to next job - worker will pick this up again with new URL."
-                            )
-                            continue
-
-                # --- STEP 3: SCRAPE THE URL ---
-                # Only reach here if URL doesn't need resolution or is already resolved
-                logger.info(f"🕷️ Scraping: {original_url}")
-                data = await asyncio.to_thread(scraper.scrape, original_url)
-
-                if data:
-                    # Use the resolved URL for database storage
-                    final_url = data.get("resolved_url", original_url)
-
-                    await finish_scrape(
-                        job["id"],
-                        data.get("company", "Unknown"),
-                        data.get("job_title", "Unknown"),
-                        data.get("full_description", ""),
-                    )
-                    logger.info(f"✅ Scrape complete for: {final_url}")
-                else:
-                    await mark_failed(
-                        job["id"], "NO_DATA", "Scraper returned empty data"
-                    )
-            except Exception as e:
-                logger.error(f"❌ Scrape error for {job['url']}: {e}")
-                await mark_failed(job["id"], "FAILED_SCRAPE", str(e))
+        # לא תופסים משרות כש-Jina חסום / ה-breaker פתוח
+        await jina.wait_until_healthy()
+        seen = signal.generation
+        jobs = await claim_jobs(
+            "WAITING_FOR_SCRAPE",
+            "SCRAPING",
+            SCRAPE_BATCH_SIZE,
+            WORKER_ID,
+            LEASE_SECONDS,
+        )
+        _held_job_ids.update(job["id"] for job in jobs)
+        if jobs:
+            await asyncio.gather(*(_run_scrape_job(scraper, job) for job in jobs))
+        else:
+            await signal.wait(seen, QUEUE_SAFETY_POLL_SECONDS)
+
+
+async def _run_scrape_job(scraper: Scraper, job: dict):
+    try:
+        # קודם מקום בדומיין ורק אז מקום גלובלי - אחרת משרות של אותו דומיין תופסות
+        # מקומות גלובליים בזמן ההמתנה ומשרות של דומיינים אחרים נתקעות מאחוריהן
+        async with _domain_slots[_domain_of(job["url"])], _scrape_slots:
+            await _process_scrape_job(scraper, job)
+    finally:
+        _held_job_ids.discard(job["id"])
+
+
+async def _process_scrape_job(scraper: Scraper, job: dict):
+    try:
+        original_url = job["url"]
+        # לינקים שצריכים רזולוציה כבר עברו בשלב RESOLVING (resolve_worker)
+        logger.info(f"🕷️ Scraping: {original_url}")
+        # ניסיון אחד בלבד - ניסיונות חוזרים עוברים דרך התור במקום לתפוס Thread.
+        # המכסה של Jina נלקחת רק אם באמת פונים ל-Jina (לא במטמון / Extractor)
+        jina = get_limiter("jina")
+        data = await scraper.scrape_async(
+            original_url, retries=1, raise_upstream_errors=True, jina_limiter=jina
+        )
+        if data and data.get("source") == "jina":
+            await jina.record_success()
+
+        if data:
+            # Use the resolved URL for database storage
+            final_url = data.get("resolved_url", original_url)
+
+            if not await finish_scrape(
+                job["id"],
+                WORKER_ID,
+                data.get("company", "Unknown"),
+                data.get("job_title", "Unknown"),
+                data.get("full_description", ""),
+            ):
+                _log_lost_lease(job)
+                return
+            logger.info(f"✅ Scrape complete for: {final_url}")
         else:
-            await asyncio.sleep(2)
+            await _fail_or_retry(
+                job, "WAITING_FOR_SCRAPE", "NO_DATA", "Scraper returned empty data"
+            )
+    except Exception as e:
+        logger.error(f"❌ Scrape error for {job['url']}: {e}")
+        upstream_error = _upstream_error(e)
+        if upstream_error:
+            await get_limiter("jina").record_failure(upstream_error.retry_after)
+        await _fail_or_retry(
+            job,
+            "WAITING_FOR_SCRAPE",
+            "FAILED_SCRAPE",
+            str(e),
+            _error_class(e),
+            upstream_delay=_upstream_delay(get_limiter("jina"), upstream_error),
+        )
 
 
-async def ai_worker():
-    logger.info("🤖 AI Worker started")
-    analyzer = JobAnalyzer()
+async def ai_worker(worker_id: int, analyzer: JobAnalyzer):
+    logger.info(f"🤖 AI Worker #{worker_id} started")
+    signal = get_stage_signal("WAITING_FOR_AI")
+    gemini = get_limiter("gemini")
 
     while True:
-        job = await fetch_next_job("WAITING_FOR_AI", "ANALYZING")
-        if job:
-            try:
-                logger.info(f"🤖 Analyzing Job ID: {job['id']}")
-                resume = read_text_file(RESUME_PATH)
-                context = read_text_file(CONTEXT_PATH)
-
-                # הרצת הניתוח
-                result = await asyncio.to_thread(analyzer.analyze, resume, context, job)
-                await finish_analysis(job["id"], result)
-                logger.info(f"✅ Analysis complete for Job ID: {job['id']}")
-            except Exception as e:
-                logger.error(f"❌ AI error for Job ID {job['id']}: {e}")
-                await mark_failed(job["id"], "FAILED_ANALYSIS", str(e))
+        # לא תופסים משרות כש-Gemini חסום / ה-breaker פתוח
+        await gemini.wait_until_healthy()
+        seen = signal.generation
+        backlog = await _in_backlog_mode()
+        jobs = await claim_jobs(
+            "WAITING_FOR_AI",
+            "ANALYZING",
+            AI_BULK_BATCH_SIZE if backlog else AI_BATCH_SIZE,
+            WORKER_ID,
+            LEASE_SECONDS,
+        )
+        _held_job_ids.update(job["id"] for job in jobs)
+        if jobs:
+            # משרות שהמשתמש מחכה להן ממשיכות במסלול המהיר גם בזמן ייבוא גדול.
+            # לפי עדיפות הכניסה - Aging מעלה את priority אבל לא הופך ייבוא לאינטראקטיבי
+            bulk = [
+                job
+                for job in jobs
+                if backlog and job["intake_priority"] < JobPriority.HIGH
+            ]
+            single = [job for job in jobs if job not in bulk]
+            tasks = [_run_ai_job(analyzer, job) for job in single]
+            if bulk:
+                tasks.append(_run_ai_batch(analyzer, bulk))
+            await asyncio.gather(*tasks)
         else:
-            await asyncio.sleep(2)
+            await signal.wait(seen, QUEUE_SAFETY_POLL_SECONDS)
+
+
+async def _in_backlog_mode() -> bool:
+    if AI_BULK_QUEUE_THRESHOLD <= 0 or AI_BULK_BATCH_SIZE <= 1:
+        return False
+    try:
+        depth = await count_ready_jobs("WAITING_FOR_AI", AI_BULK_QUEUE_THRESHOLD)
+    except Exception as e:
+        logger.error(f"❌ Could not check AI queue depth: {e}")
+        return False
+    return depth >= AI_BULK_QUEUE_THRESHOLD
+
+
+async def _run_ai_job(analyzer: JobAnalyzer, job: dict):
+    try:
+        async with _ai_slots:
+            await _process_ai_job(analyzer, job)
+    finally:
+        _held_job_ids.discard(job["id"])
+
+
+async def _run_ai_batch(analyzer: JobAnalyzer, jobs: List[dict]):
+    try:
+        async with _ai_slots:
+            await _process_ai_batch(analyzer, jobs)
+    finally:
+        for job in jobs:
+            _held_job_ids.discard(job["id"])
+
+
+async def _reuse_analysis(
+    analyzer: JobAnalyzer, job: dict, resume: str, context: str, profile_hash: str
+) -> Tuple[bool, Optional[int], str]:
+    """
+    Finishes the job from an existing analysis when possible (near-duplicate
+    posting analyzed against the same profile, or the analysis cache).
+    Returns (handled, fingerprint, cache_key); the last two are needed to
+    finish the job after a fresh analysis.
+    """
+    # אותה משרה שכבר נותחה (לוח אחר / פרסום מחדש) - מעתיקים את הניתוח בלי Gemini
+    fingerprint = None
+    if NEAR_DUPLICATE_ENABLED:
+        fingerprint = fingerprint_for(job.get("full_description"))
+    if fingerprint is not None:
+        original_id = await find_near_duplicate(
+            job["id"], fingerprint, NEAR_DUPLICATE_MAX_DISTANCE, profile_hash
+        )
+        if original_id and await link_duplicate(
+            job["id"], WORKER_ID, original_id, fingerprint
+        ):
+            metrics.incr("analysis.near_duplicate.hit")
+            logger.info(
+                f"🧬 Job ID {job['id']} is a near-duplicate of Job ID {original_id}, "
+                f"reusing its analysis"
+            )
+            return True, fingerprint, ""
+        metrics.incr("analysis.near_duplicate.miss")
+
+    # אותו פרופיל + אותו תיאור + אותו מודל/פרומפט = אותה תשובה
+    cache_key = analyzer.cache_key(resume, context, job)
+    cached = await get_cached_analysis(cache_key)
+    if cached:
+        metrics.incr("analysis.cache.hit")
+        cached["url"] = job.get("url")
+        if await finish_analysis(
+            job["id"], WORKER_ID, cached, fingerprint, profile_hash
+        ):
+            logger.info(f"💾 Analysis cache hit for Job ID: {job['id']}")
+        else:
+            _log_lost_lease(job)
+        return True, fingerprint, cache_key
+    metrics.incr("analysis.cache.miss")
+    return False, fingerprint, cache_key
+
+
+async def _prescreen(jobs: List[dict], resume: str, context: str) -> List[bool]:
+    """
+    Local pre-screen (services/prescreen.py): finishes jobs that clearly don't
+    match with a cheap result. Returns, per job, whether it was screened out.
+    """
+    try:
+        screener = await get_prescreener(resume, context)
+        results = screener.screen(jobs) if screener else [None] * len(jobs)
+    except Exception as e:
+        # ה-Pre-screen הוא אופטימיזציה - כישלון שלו לא עוצר את הניתוח
+        logger.error(f"❌ Pre-screen failed, sending to Gemini: {e}")
+        return [False] * len(jobs)
+    screened = []
+    for job, result in zip(jobs, results):
+        if result is None:
+            metrics.incr("analysis.prescreen.pass")
+            screened.append(False)
+            continue
+        # בלי Fingerprint - תוצאה מקומית לא משמשת מקור לכפילויות קרובות
+        screened.append(True)
+        if not await finish_analysis(job["id"], WORKER_ID, result):
+            _log_lost_lease(job)
+            continue
+        metrics.incr("analysis.prescreen.out")
+        logger.info(
+            f"🚫 Job ID {job['id']} pre-screened out "
+            f"(score {result['prescreen_score']:.2f}, showstoppers {result['showstoppers']})"
+        )
+    return screened
+
+
+async def _triage(
+    analyzer: JobAnalyzer, jobs: List[dict], resume: str, context: str
+) -> List[bool]:
+    """
+    First tier of the cascade. Jobs scoring below TRIAGE_MIN_SCORE are
+    finished with the triage answer; returns, per job, whether it stopped
+    here. Forced jobs (the user asked for the full analysis) skip triage.
+    Triage is only a cost optimisation: an upstream error propagates (the
+    jobs are requeued), any other error escalates the jobs to the full analysis.
+    """
+    candidates = [job for job in jobs if not job.get("force_analysis")]
+    if not ANALYSIS_CASCADE_ENABLED or not candidates:
+        return [False] * len(jobs)
+
+    gemini = get_limiter("gemini")
+    await gemini.acquire(
+        _estimate_tokens(
+            resume, context, *(job.get("full_description") for job in candidates)
+        )
+    )
+    try:
+        if len(candidates) == 1:
+            answers = [await analyzer.triage_async(resume, context, candidates[0])]
+        else:
+            answers = await analyzer.analyze_batch_async(
+                resume, context, candidates, triage=True
+            )
+    except Exception as e:
+        if _upstream_error(e):
+            raise
+        # תשובה לא תקינה / סכמה חסרה - לא סיבה להכשיל משרות, פשוט מדלגים על הטריאז'
+        logger.error(f"❌ Triage failed, escalating {len(candidates)} job(s): {e}")
+        metrics.incr("analysis.cascade.error")
+        return [False] * len(jobs)
+    await gemini.record_success()
+    metrics.incr("analysis.cascade.triaged", len(candidates))
+
+    stopped = {}
+    for job, answer in zip(candidates, answers):
+        # בלי תשובה תקינה מהטריאז' - ממשיכים לניתוח המלא
+        score = answer.get("suitability_score") if answer else None
+        if not isinstance(score, (int, float)) or score >= TRIAGE_MIN_SCORE:
+            metrics.incr("analysis.cascade.escalated")
+            continue
+        stopped[job["id"]] = True
+        if not await finish_analysis(job["id"], WORKER_ID, triage_result(job, answer)):
+            _log_lost_lease(job)
+            continue
+        metrics.incr("analysis.cascade.stopped")
+        logger.info(
+            f"🪜 Job ID {job['id']} stopped at triage "
+            f"(score {answer.get('suitability_score')} < {TRIAGE_MIN_SCORE})"
+        )
+    return [job["id"] in stopped for job in jobs]
+
+
+async def _finish_ai_job(
+    analyzer: JobAnalyzer,
+    job: dict,
+    result: dict,
+    fingerprint: Optional[int],
+    cache_key: str,
+    profile_hash: str,
+):
+    if not await finish_analysis(
+        job["id"], WORKER_ID, result, fingerprint, profile_hash
+    ):
+        _log_lost_lease(job)
+        return
+    try:
+        await save_analysis(
+            cache_key,
+            analyzer.model_name,
+            PROMPT_VERSION,
+            {k: v for k, v in result.items() if k != "url"},
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not cache analysis for Job ID {job['id']}: {e}")
+    metrics.incr("analysis.full")
+    logger.info(f"✅ Analysis complete for Job ID: {job['id']}")
+
+
+async def _fail_ai_job(job: dict, error: Exception, record_upstream: bool = True):
+    logger.error(f"❌ AI error for Job ID {job['id']}: {error}")
+    upstream_error = _upstream_error(error)
+    if upstream_error and record_upstream:
+        await get_limiter("gemini").record_failure(upstream_error.retry_after)
+    await _fail_or_retry(
+        job,
+        "WAITING_FOR_AI",
+        "FAILED_ANALYSIS",
+        str(error),
+        _error_class(error),
+        upstream_delay=_upstream_delay(get_limiter("gemini"), upstream_error),
+    )
+
+
+async def _fail_ai_batch(jobs: List[dict], error: Exception):
+    # כישלון אחד של ה-upstream - נספר פעם אחת ב-breaker, לא פעם לכל משרה
+    upstream_error = _upstream_error(error)
+    if upstream_error:
+        await get_limiter("gemini").record_failure(upstream_error.retry_after)
+    for job in jobs:
+        await _fail_ai_job(job, error, record_upstream=False)
+
+
+async def _process_ai_job(analyzer: JobAnalyzer, job: dict):
+    try:
+        logger.info(f"🤖 Analyzing Job ID: {job['id']}")
+
+        resume = read_text_file(RESUME_PATH)
+        context = read_text_file(CONTEXT_PATH)
+        profile_hash = analyzer.profile_key(resume, context)
+        handled, fingerprint, cache_key = await _reuse_analysis(
+            analyzer, job, resume, context, profile_hash
+        )
+        if handled:
+            return
+        if (await _prescreen([job], resume, context))[0]:
+            return
+        if (await _triage(analyzer, [job], resume, context))[0]:
+            return
+
+        # הרצת הניתוח - רק אחרי שיש מקום במכסה המשותפת
+        gemini = get_limiter("gemini")
+        await gemini.acquire(
+            _estimate_tokens(resume, context, job.get("full_description"))
+        )
+        result = await analyzer.analyze_async(resume, context, job, attempts=1)
+        await gemini.record_success()
+        await _finish_ai_job(
+            analyzer, job, result, fingerprint, cache_key, profile_hash
+        )
+    except Exception as e:
+        await _fail_ai_job(job, e)
+
+
+async def _process_ai_batch(analyzer: JobAnalyzer, jobs: List[dict]):
+    """Backlog mode: one Gemini request for all the claimed jobs that still need an analysis."""
+    resume = read_text_file(RESUME_PATH)
+    context = read_text_file(CONTEXT_PATH)
+    profile_hash = analyzer.profile_key(resume, context)
+
+    pending = []
+    for job in jobs:
+        try:
+            handled, fingerprint, cache_key = await _reuse_analysis(
+                analyzer, job, resume, context, profile_hash
+            )
+            if not handled:
+                pending.append((job, fingerprint, cache_key))
+        except Exception as e:
+            await _fail_ai_job(job, e)
+    if pending:
+        try:
+            screened = await _prescreen([job for job, _, _ in pending], resume, context)
+            pending = [item for item, out in zip(pending, screened) if not out]
+        except Exception as e:
+            logger.error(f"❌ Could not store pre-screen results, analyzing all: {e}")
+    if not pending:
+        return
+
+    try:
+        stopped = await _triage(
+            analyzer, [job for job, _, _ in pending], resume, context
+        )
+    except Exception as e:
+        await _fail_ai_batch([job for job, _, _ in pending], e)
+        return
+    pending = [item for item, out in zip(pending, stopped) if not out]
+    if not pending:
+        return
+
+    batch = [job for job, _, _ in pending]
+    logger.info(f"📦 Bulk-analyzing {len(batch)} job(s) in one request")
+    gemini = get_limiter("gemini")
+    try:
+        await gemini.acquire(
+            _estimate_tokens(
+                resume, context, *(job.get("full_description") for job in batch)
+            )
+            + AI_BULK_OUTPUT_TOKENS_PER_JOB * len(batch)
+        )
+        results = await analyzer.analyze_batch_async(resume, context, batch)
+        await gemini.record_success()
+    except Exception as e:
+        await _fail_ai_batch(batch, e)
+        return
+
+    metrics.incr("analysis.bulk.batches")
+    metrics.incr("analysis.bulk.jobs", len(batch))
+    for (job, fingerprint, cache_key), result in zip(pending, results):
+        try:
+            if result is None:
+                # המודל דילג על המשרה / החזיר רשומה לא תקינה - ניתוח בודד רק לה
+                metrics.incr("analysis.bulk.fallback")
+                await gemini.acquire(
+                    _estimate_tokens(resume, context, job.get("full_description"))
+                )
+                result = await analyzer.analyze_async(resume, context, job, attempts=1)
+                await gemini.record_success()
+            await _finish_ai_job(
+                analyzer, job, result, fingerprint, cache_key, profile_hash
+            )
+        except Exception as e:
+            await _fail_ai_job(job, e)
+
+
+async def lease_heartbeat():
+    """מאריך את ה-Lease של כל המשרות שהתהליך הזה מחזיק כרגע"""
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        held = list(_held_job_ids)
+        if not held:
+            continue
+        try:
+            extended = await extend_leases(held, WORKER_ID, LEASE_SECONDS)
+            if extended < len(held):
+                logger.warning(
+                    f"⚠️ Lost lease on {len(held) - extended} job(s) - "
+                    f"they were requeued after the lease expired, "
+                    f"their results will be dropped"
+                )
+        except Exception as e:
+            logger.error(f"❌ Lease heartbeat failed: {e}")
+
+
+async def lease_reaper():
+    """מחזיר לתור משרות שה-Lease שלהן פג (גם של תהליכים/שרתים אחרים)"""
+    while True:
+        await asyncio.sleep(REAPER_INTERVAL_SECONDS)
+        try:
+            requeued, failed = await requeue_expired_leases(JOB_MAX_ATTEMPTS)
+            if requeued:
+                logger.warning(f"♻️ Requeued {requeued} job(s) with expired leases")
+            if failed:
+                logger.error(
+                    f"☠️ {failed} job(s) lost their lease {JOB_MAX_ATTEMPTS} times, "
+                    f"moved to dead-letter"
+                )
+        except Exception as e:
+            logger.error(f"❌ Lease reaper failed: {e}")
+
+
+async def priority_aging():
+    """מעלה עדיפות למשרות שממתינות הרבה זמן כדי שלא יורעבו"""
+    while True:
+        await asyncio.sleep(PRIORITY_AGING_AFTER_SECONDS / 2)
+        try:
+            aged = await age_waiting_jobs(PRIORITY_AGING_AFTER_SECONDS)
+            if aged:
+                logger.info(f"⏫ Raised priority of {aged} long-waiting job(s)")
+        except Exception as e:
+            logger.error(f"❌ Priority aging failed: {e}")
+
+
+async def start_background_workers(
+    scrape_workers: Optional[int] = None,
+    ai_workers: Optional[int] = None,
+    resolve_workers: Optional[int] = None,
+):
+    """
+    מפעיל את ה-Pools של הוורקרים בלולאה הנוכחית.
+    נקרא מה-lifespan של השרת או מתהליך הוורקרים הנפרד (python -m workers).
+    """
+    global _resolve_slots, _scrape_slots, _ai_slots
+    resolve_workers = RESOLVE_WORKERS if resolve_workers is None else resolve_workers
+    scrape_workers = SCRAPE_WORKERS if scrape_workers is None else scrape_workers
+    ai_workers = AI_WORKERS if ai_workers is None else ai_workers
+
+    logger.info(f"🧹 Requeuing jobs with expired leases (worker id: {WORKER_ID})...")
+    await requeue_expired_leases(JOB_MAX_ATTEMPTS)
+
+    try:
+        await start_listener()
+    except Exception as e:
+        logger.error(
+            f"❌ Could not start queue listener, falling back to polling every "
+            f"{QUEUE_SAFETY_POLL_SECONDS}s: {e}"
+        )
+
+    _resolve_slots = asyncio.Semaphore(RESOLVE_CONCURRENCY)
+    _scrape_slots = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+    _ai_slots = asyncio.Semaphore(AI_CONCURRENCY)
+
+    logger.info(
+        f"👷 Starting worker pools: resolve={resolve_workers} "
+        f"(concurrency {RESOLVE_CONCURRENCY}), scrape={scrape_workers} "
+        f"(concurrency {SCRAPE_CONCURRENCY}, per-domain {SCRAPE_PER_DOMAIN_LIMIT}), "
+        f"ai={ai_workers} (concurrency {AI_CONCURRENCY}), "
+        f"batch sizes scrape={SCRAPE_BATCH_SIZE} ai={AI_BATCH_SIZE}, "
+        f"bulk ai={AI_BULK_BATCH_SIZE} when >= {AI_BULK_QUEUE_THRESHOLD} waiting"
+    )
+    _worker_tasks.append(asyncio.create_task(lease_heartbeat()))
+    _worker_tasks.append(asyncio.create_task(lease_reaper()))
+    _worker_tasks.append(asyncio.create_task(priority_aging()))
+    _worker_tasks.append(asyncio.create_task(metrics_flusher()))
+    # מופע אחד משותף לכל ה-Pool - כך גם ה-Session המחובר של HireMeTech משותף
+    if resolve_workers:
+        resolver = URLResolver(cache=get_resolution_cache())
+        for i in range(resolve_workers):
+            _worker_tasks.append(asyncio.create_task(resolve_worker(i, resolver)))
+    if scrape_workers:
+        scraper = Scraper(scrape_cache=get_scrape_cache())
+        for i in range(scrape_workers):
+            _worker_tasks.append(asyncio.create_task(scrape_worker(i, scraper)))
+    if ai_workers:
+        analyzer = JobAnalyzer()
+        for i in range(ai_workers):
+            _worker_tasks.append(asyncio.create_task(ai_worker(i, analyzer)))
+
+
+async def stop_background_workers():
+    """כיבוי מסודר: עוצר את הוורקרים ומחזיר לתור את המשרות שהיו בעבודה"""
+    # צילום לפני הביטול - ה-finally של כל משימה מוציא אותה מהסט
+    held = list(_held_job_ids)
+    for task in _worker_tasks:
+        task.cancel()
+    await asyncio.gather(*_worker_tasks, return_exceptions=True)
+    _worker_tasks.clear()
 
+    # release_jobs נוגע רק בשורות שעדיין בעבודה ורשומות על שמנו
+    if held:
+        try:
+            released = await release_jobs(held, WORKER_ID)
+            logger.info(f"↩️ Released {released} in-flight job(s) back to the queue")
+        except Exception as e:
+            logger.error(f"❌ Could not release in-flight jobs (reaper will): {e}")
 
-async def start_background_workers():
-    """פונקציה שתופעל כשהשרת עולה"""
-    logger.info("🧹 Cleaning up stuck jobs from previous run...")
-    await reset_stuck_jobs()
-    asyncio.create_task(scrape_worker())
-    asyncio.create_task(ai_worker())
+    await flush_metrics()
+    await stop_listener()
+    await close_http_clients()
+    await close_browser_pool()
+    logger.info("🛑 Workers stopped")
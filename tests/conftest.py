@@ -0,0 +1,6 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+# הקוד מיובא כמו בהרצה מתוך src (from scraper_service ...)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
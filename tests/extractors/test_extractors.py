@@ -0,0 +1,120 @@
+# tests/extractors/test_extractors.py
+"""
+Each extractor's parse() against a saved page / API payload, plus the
+thin-content path through extract_job (parsed, but too short -> None).
+"""
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+
+from scraper_service.extractors import (
+    comeet,
+    extract_job,
+    greenhouse,
+    jsonld,
+    lever,
+    linkedin,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _read(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def _extract(url: str, body: str, headers: dict = None):
+    """extract_job עם Client שמחזיר את ה-Fixture לכל בקשה"""
+
+    async def run():
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, text=body, headers=headers)
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await extract_job(url, client)
+
+    return asyncio.run(run())
+
+
+def test_linkedin_parse():
+    job = linkedin.parse(_read("linkedin_job_posting.html"))
+    assert job["job_title"] == "Senior Backend Engineer"
+    assert job["company"] == "Acme Robotics"
+    assert "warehouse robot fleets" in job["full_description"]
+    assert "PostgreSQL, Kafka and Kubernetes" in job["full_description"]
+    assert "Show more" not in job["full_description"]
+
+
+def test_linkedin_parse_without_description():
+    assert linkedin.parse("<section><h2>Senior Backend Engineer</h2></section>") is None
+
+
+def test_comeet_parse():
+    job = comeet.parse(_read("comeet_position.html"))
+    assert job["job_title"] == "Data Engineer"
+    assert job["company"] == "Globex"
+    assert job["full_description"].startswith("Location: Herzliya, IL")
+    assert "batch and streaming pipelines" in job["full_description"]
+    assert "Requirements\n" in job["full_description"]
+
+
+def test_comeet_parse_without_position_data():
+    assert comeet.parse("<html><script>var COMPANY_DATA = {};</script></html>") is None
+
+
+def test_greenhouse_parse():
+    job = greenhouse.parse(json.loads(_read("greenhouse_job.json")), "initech")
+    assert job["job_title"] == "Site Reliability Engineer"
+    assert job["company"] == "Initech"
+    assert job["full_description"].startswith("Location: Remote - Israel")
+    assert "Kubernetes clusters, Terraform modules" in job["full_description"]
+    assert "<li>" not in job["full_description"]
+
+
+def test_lever_parse():
+    job = lever.parse(json.loads(_read("lever_posting.json")), "hooli")
+    assert job["job_title"] == "Frontend Engineer"
+    assert job["company"] == "Hooli"
+    assert job["full_description"].startswith("Tel Aviv | Full-time")
+    assert "React and TypeScript" in job["full_description"]
+    assert "yearly learning budget" in job["full_description"]
+
+
+def test_jsonld_parse():
+    job = jsonld.parse(_read("jsonld_job_posting.html"))
+    assert job["job_title"] == "QA Automation Engineer"
+    assert job["company"] == "Umbrella"
+    assert "end-to-end test suites" in job["full_description"]
+    assert "<p>" not in job["full_description"]
+
+
+def test_extract_job_accepts_full_page():
+    job = _extract(
+        "https://www.linkedin.com/jobs/view/3901234567/",
+        _read("linkedin_job_posting.html"),
+    )
+    assert job["extractor"] == "linkedin"
+    assert job["company"] == "Acme Robotics"
+
+
+def test_extract_job_rejects_thin_linkedin_page():
+    url = "https://www.linkedin.com/jobs/view/3901234568/"
+    assert linkedin.parse(_read("linkedin_job_posting_thin.html")) is not None
+    assert _extract(url, _read("linkedin_job_posting_thin.html")) is None
+
+
+def test_extract_job_rejects_thin_comeet_page():
+    url = "https://www.comeet.com/jobs/globex/A1.00B/intern/C2.D3F"
+    assert _extract(url, _read("comeet_position_thin.html")) is None
+
+
+def test_page_extractor_returns_validators():
+    """Comeet מוריד את דף המשרה עצמו - ה-Validators נשמרים בלי HEAD נוסף"""
+    job = _extract(
+        "https://www.comeet.com/jobs/globex/A1.00B/data-engineer/C2.D3E",
+        _read("comeet_position.html"),
+        headers={"ETag": '"v1"', "Last-Modified": "Mon, 06 Jan 2025 10:00:00 GMT"},
+    )
+    assert job["validators"] == ('"v1"', "Mon, 06 Jan 2025 10:00:00 GMT")